@@ -0,0 +1,195 @@
+import functools
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# สถาบันหลัก (home institution) ของ dashboard
+HOME_INSTITUTION = "Chulalongkorn University"
+
+# ชื่อที่ดูเหมือน home institution แต่เป็นคนละสถาบัน (ไม่นับเป็นสมาชิก แม้จะผ่านเกณฑ์ความคล้าย)
+HOME_EXCLUDE = [
+    "Maha chulalongkorn rajavidhayalaya University",
+]
+
+# คำทั่วไปที่ไม่ใช้ระบุสถาบัน (ตัวพิมพ์เล็ก)
+GENERIC_TOKENS = {
+    "university", "universiti", "universidad", "universität", "université", "college", "institute", "institution",
+    "school", "faculty", "department", "center", "centre", "hospital", "academy",
+}
+
+# คำเชื่อมที่ข้ามเมื่อเทียบชื่อเป็นวลี
+STOP_TOKENS = {"of", "the", "and", "for", "at", "in"}
+
+# token สองตัวถือว่าตรงกันถ้า Dice ของ trigram >= ค่านี้ (เช่น "Universitqy" ~ "University")
+# หรือเป็นตัวย่อของคำทั่วไปยาวอย่างน้อย ABBREVIATION_MIN_LENGTH ตัวอักษร (เช่น "Univ" ~ "University")
+ALIAS_MIN_SIMILARITY = 0.8
+ABBREVIATION_MIN_LENGTH = 4
+
+# ชื่อสถานที่ (ประเทศ / เมือง) ใช้ร่วมกันหลายสถาบัน จึงไม่ใช้ระบุสถาบัน (ไฟล์เดียวกับ geocode.GAZETTEER_PATH)
+PLACES_PATH = os.path.join("raw_data", "gazetteer.csv")
+
+# ส่วนแรกของชื่อที่ขึ้นต้นด้วยคำเหล่านี้ถือเป็นหน่วยย่อย เช่น "Faculty of Medicine, Chulalongkorn University"
+SUBUNIT_PREFIXES = (
+    "faculty", "school", "department", "dept", "college", "institute", "center", "centre",
+    "division", "graduate", "laboratory", "lab", "unit", "program", "programme",
+)
+
+_TOKEN = re.compile(r"\w+")
+_MATCH_TOKEN = re.compile(r"(?!\d+\b)\w+")  # token ที่ไม่ใช่ตัวเลขล้วน
+
+
+# ปรับชื่อให้อยู่ในรูปเดียวกัน (unicode NFKC, ช่องว่างซ้ำ) โดยคงตัวพิมพ์ไว้
+# id_of จึงเป็น case-sensitive; การจับคู่แบบ fuzzy ใช้ match_tokens ที่เป็นตัวพิมพ์เล็ก
+def normalize_name(name):
+    return " ".join(unicodedata.normalize("NFKC", name).split())
+
+
+def tokenize(name):
+    return _TOKEN.findall(normalize_name(name))
+
+
+# token ตัวพิมพ์เล็กที่ใช้เทียบชื่อ (ไม่รวมคำเชื่อมและตัวเลข เช่น "Chulalongkorn 20 University")
+def match_tokens(name):
+    return [t for t in _MATCH_TOKEN.findall(normalize_name(name).casefold()) if t not in STOP_TOKENS]
+
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(max(len(token) - 2, 1))}
+
+
+def _similarity(a, b):
+    a, b = _trigrams(a), _trigrams(b)
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+# token ของชื่อสถานที่ใน gazetteer (อ่านครั้งเดียว; ไม่มีไฟล์ถือว่าไม่มีสถานที่)
+@functools.lru_cache(maxsize=None)
+def place_tokens(path=PLACES_PATH):
+    try:
+        names = pd.read_csv(path, usecols=["name"])["name"].dropna()
+    except (OSError, ValueError):
+        return frozenset()
+    return frozenset(t for name in names for t in match_tokens(name))
+
+
+# id ของแถวที่ไม่มีชื่อ และของชื่อที่ไม่อยู่ใน index
+MISSING_ID = -1
+UNKNOWN_ID = -2
+
+
+# Index ของชื่อ affiliation: ชื่อไม่ซ้ำแต่ละชื่อได้ id (int) และหน่วยย่อยชี้ไปที่ id ของสถาบันแม่
+# มี inverted index token -> ids และ trigram -> token สำหรับหาชื่อที่สะกดต่างจากชื่อสถาบัน
+class AffiliationIndex:
+    def __init__(self, names):
+        names = pd.Series(names, dtype=object)
+        codes, uniques = pd.factorize(names)
+        self.row_ids = codes.astype(np.int32)  # MISSING_ID = ไม่มีชื่อ
+        self.names = pd.Index(uniques)
+        normalized = [normalize_name(n) for n in self.names]
+        self._id_of = dict(zip(normalized, range(len(normalized))))
+        self.parent_ids = self._resolve_parents(normalized)
+
+        # เหมือน match_tokens แต่ทำทั้งคอลัมน์; posting list เรียงตาม id ไม่ซ้ำ
+        tokens = pd.Series(normalized, dtype=object).str.casefold().str.findall(_MATCH_TOKEN).explode().dropna()
+        tokens = tokens[~tokens.isin(STOP_TOKENS)]
+        codes, vocabulary = pd.factorize(tokens)
+        ids = tokens.index.to_numpy(np.int32)
+        order = np.lexsort((ids, codes))
+        codes, ids = codes[order], ids[order]
+        keep = np.ones(len(ids), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (ids[1:] != ids[:-1])
+        codes, ids = codes[keep], ids[keep]
+        starts = np.flatnonzero(np.diff(codes, prepend=-1))
+        self.postings = dict(zip(vocabulary[codes[starts]], np.split(ids, starts[1:])))
+        self._grams = {}
+        for token in self.postings:
+            for gram in _trigrams(token):
+                self._grams.setdefault(gram, []).append(token)
+
+    def id_of(self, name):
+        return self._id_of.get(normalize_name(name), UNKNOWN_ID)
+
+    # หน่วยย่อยแบบ "Faculty of X, <สถาบัน>" ชี้ไปที่ id ของ <สถาบัน> ถ้ามีชื่อนั้นใน index
+    def _resolve_parents(self, normalized):
+        parents = np.arange(len(self.names), dtype=np.int32)
+        for i, name in enumerate(normalized):
+            if "," not in name:
+                continue
+            parts = [p.strip() for p in name.split(",")]
+            if len(parts) < 2 or not parts[0].lower().startswith(SUBUNIT_PREFIXES):
+                continue
+            for part in parts[1:]:
+                parent = self._id_of.get(part, UNKNOWN_ID)
+                if parent >= 0:
+                    parents[i] = parent
+                    break
+        return parents
+
+    # token ใน index ที่ตรงกับ token (สะกดคล้าย หรือเป็นตัวย่อของคำทั่วไป)
+    def similar_tokens(self, token):
+        candidates = {t for gram in _trigrams(token) for t in self._grams.get(gram, ())}
+        similar = {t for t in candidates if _similarity(token, t) >= ALIAS_MIN_SIMILARITY}
+        if token in GENERIC_TOKENS:
+            similar.update(t for t in candidates if len(t) >= ABBREVIATION_MIN_LENGTH and token.startswith(t))
+        return similar
+
+    # ids ของชื่อที่มี token ตรงกับทุกชุดใน token_sets (intersection ของ posting lists)
+    def _containing(self, token_sets):
+        result = None
+        for tokens in token_sets:
+            postings = [self.postings[t] for t in tokens]
+            ids = np.unique(np.concatenate(postings)) if postings else np.empty(0, dtype=np.int32)
+            result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+        return result if result is not None else np.empty(0, dtype=np.int32)
+
+    # ชื่อที่ตรงกับสถาบันแบบ fuzzy:
+    # - มีชื่อสถาบันทั้งวลีเรียงต่อกัน เช่น "Chulalongkorn University Hospital", "Chulalongkorn Univ."
+    # - หรือมี token ระบุสถาบันครบทุกตัว (ไม่ใช่คำทั่วไปหรือชื่อสถานที่) เช่น "King Chulalongkorn Memorial Hospital"
+    #   ชื่อที่ token ทั้งหมดเป็นคำทั่วไป/สถานที่ (เช่น "University of Tokyo") ใช้แค่แบบวลี
+    def fuzzy_matches(self, institution, places=None):
+        places = place_tokens() if places is None else places
+        phrase = match_tokens(institution)
+        similar = [self.similar_tokens(t) for t in phrase]
+        matches = set()
+        for i in self._containing(similar).tolist():
+            tokens = match_tokens(self.names[i])
+            for start in range(len(tokens) - len(phrase) + 1):
+                if all(tokens[start + k] in similar[k] for k in range(len(phrase))):
+                    matches.add(i)
+                    break
+        identifying = [s for t, s in zip(phrase, similar) if t not in GENERIC_TOKENS and t not in places]
+        if identifying:
+            matches.update(self._containing(identifying).tolist())
+        return np.array(sorted(matches), dtype=np.int32)
+
+    # ids ของทุกชื่อที่เป็นส่วนหนึ่งของ institution: ชื่อที่ตรงแบบ fuzzy, aliases ที่ผู้เรียกระบุ (ชื่อตรงตัว)
+    # และหน่วยย่อยที่ resolve ไปหาชื่อเหล่านั้น; ชื่อใน exclude (และหน่วยย่อยของมัน) ไม่นับ
+    def institution_members(self, institution, aliases=(), exclude=(), places=None):
+        ids = [self.id_of(name) for name in [institution, *aliases]]
+        ids = np.union1d([i for i in ids if i >= 0], self.fuzzy_matches(institution, places)).astype(np.int32)
+        excluded = np.array([i for i in map(self.id_of, exclude) if i >= 0], dtype=np.int32)
+        ids = np.setdiff1d(ids, excluded)
+        members = np.isin(self.parent_ids, ids)
+        members[ids] = True
+        members[excluded] = False
+        return np.flatnonzero(members).astype(np.int32)
+
+    # id ที่ใช้แทน institution ทั้งกลุ่ม (ชื่อเต็มของสถาบัน ถ้าไม่มีใช้สมาชิกตัวแรก)
+    def home_parent_id(self, institution=HOME_INSTITUTION, aliases=(), exclude=(), places=None):
+        home = self.id_of(institution)
+        if home >= 0:
+            return home
+        members = self.institution_members(institution, aliases, exclude, places)
+        return int(members[0]) if len(members) else UNKNOWN_ID
+
+    # คอลัมน์ (Affiliation_id, Parent_id) ต่อแถว: สมาชิกทั้งหมดของ institution มี Parent_id = home_parent_id
+    # การกรอง "internal collaboration" จึงเป็นแค่การเทียบ int
+    def canonical_columns(self, institution=HOME_INSTITUTION, aliases=(), exclude=(), places=None):
+        parents = self.parent_ids.copy()
+        members = self.institution_members(institution, aliases, exclude, places)
+        parents[members] = self.home_parent_id(institution, aliases, exclude, places)
+        row_parents = np.where(self.row_ids >= 0, parents[self.row_ids], MISSING_ID).astype(np.int32)
+        return self.row_ids, row_parents
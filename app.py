@@ -1,47 +1,76 @@
+import collections
+import os
+import threading
+
 import streamlit as st
 import pandas as pd
-import pydeck as pdk
-import networkx as nx
-import plotly.express as px
-import folium
-from streamlit_folium import st_folium
-import plotly.graph_objects as go
-
-# Load data
-universities = pd.read_csv("universities_mock.csv")
-references = pd.read_csv("references_mock.csv")
-
-# Build the network graph
-G = nx.from_pandas_edgelist(
-    references,
-    source="source_id",
-    target="target_id",
-    edge_attr="weight"
+
+import startup
+import graph_analysis
+
+# library ของแต่ละมุมมองแผนที่ import เมื่อมุมมองนั้นถูกเลือกครั้งแรก
+pdk = startup.lazy_import("pydeck")
+px = startup.lazy_import("plotly.express")
+go = startup.lazy_import("plotly.graph_objects")
+folium = startup.lazy_import("folium")
+_streamlit_folium = startup.lazy_import("streamlit_folium")
+
+startup.checkpoint("imports")
+
+# เครือข่ายที่ coauthorship.py สร้างจากข้อมูล paper ถ้ามี ไม่มีก็ใช้ข้อมูล mock
+UNIVERSITIES_PATH = "universities.csv" if os.path.exists("universities.csv") else "universities_mock.csv"
+REFERENCES_PATH = "references.csv" if os.path.exists("references.csv") else "references_mock.csv"
+
+# Load data (สองไฟล์ไม่ขึ้นต่อกัน อ่านพร้อมกันบน thread pool)
+universities, references = startup.run_concurrently(
+    lambda: pd.read_csv(UNIVERSITIES_PATH),
+    lambda: pd.read_csv(REFERENCES_PATH),
 )
+startup.checkpoint("data_load")
+
+# Build the network graph (node attributes ใส่ทีเดียวทั้งตาราง) และ cache ตาม hash ของกราฟ
+@st.cache_resource
+def load_graph(graph_key, _universities, _references):
+    return graph_analysis.build_graph(_universities, _references)
+
+
+# จำนวนผล centrality (กราฟ, k) ที่เก็บไว้สูงสุด; เกินแล้วลบอันที่ใช้ล่าสุดนานที่สุด
+CENTRALITY_CACHE_SIZE = 8
+
+
+# ผล centrality ที่คำนวณแล้ว แยกตาม (hash ของกราฟ, k) ใช้ร่วมกันทุก session (LRU + lock)
+@st.cache_resource
+def centrality_store():
+    return collections.OrderedDict(), threading.Lock()
 
-# Add node attributes
-for _, row in universities.iterrows():
-    nx.set_node_attributes(G, {
-        row["id"]: {
-            "name": row["name"],
-            "latitude": row["latitude"],
-            "longitude": row["longitude"],
-            "research_count": row["research_count"],
-            "importance": row["importance"],
-        }
-    })
-
-# Network Analysis
-def calculate_centralities(G):
-    return {
-        "Degree Centrality": nx.degree_centrality(G),
-        "Betweenness Centrality": nx.betweenness_centrality(G),
-        "Closeness Centrality": nx.closeness_centrality(G),
-        "PageRank": nx.pagerank(G),
-    }
+
+# Network Analysis: คำนวณครั้งแรกพร้อม progress bar ครั้งต่อไปดึงจาก store
+def calculate_centralities(G, graph_key, k=None):
+    store, lock = centrality_store()
+    key = (graph_key, k)
+    with lock:
+        if key in store:
+            store.move_to_end(key)
+            return store[key]
+    bar = st.progress(0.0, text="Calculating centralities...")
+    result = graph_analysis.calculate_centralities(
+        G, k=k, progress=lambda fraction, text: bar.progress(min(fraction, 1.0), text=text)
+    )
+    bar.empty()
+    with lock:
+        store[key] = result
+        while len(store) > CENTRALITY_CACHE_SIZE:
+            store.popitem(last=False)
+    return result
+
+
+graph_key = graph_analysis.graph_hash(universities, references)
+G = load_graph(graph_key, universities, references)
+startup.checkpoint("graph")
 
 # 3D Visualization with Pydeck
 def create_3d_globe_view(universities, references):
+    universities = graph_analysis.located(universities)
     scatter_layer = pdk.Layer(
         "ScatterplotLayer",
         data=universities,
@@ -71,39 +100,35 @@ def create_3d_globe_view(universities, references):
     )
 
 # 2D Visualization with Folium
+# จุดทั้งหมดอยู่ใน GeoJson layer เดียว และเส้นแต่ละกลุ่ม weight เป็น PolyLine (multi-line) เส้นเดียว
 def create_2d_map_view(universities, references):
     map_2d = folium.Map(location=[0, 0], zoom_start=2)
 
-    # Add universities as markers
-    for _, row in universities.iterrows():
-        folium.CircleMarker(
-            location=[row["latitude"], row["longitude"]],
-            radius=row["importance"] * 5,  # Reduced scaling factor
-            color="blue",
-            fill=True,
-            fill_color="blue",
-            fill_opacity=0.6,
-            popup=folium.Popup(f"<b>{row['name']}</b><br>Research Count: {row['research_count']}", max_width=200),
-        ).add_to(map_2d)
-
     # Add references as lines
-    for _, row in references.iterrows():
-        source = universities[universities["id"] == row["source_id"]].iloc[0]
-        target = universities[universities["id"] == row["target_id"]].iloc[0]
+    lines = folium.FeatureGroup(name="References")
+    for bucket in graph_analysis.edge_lines(graph_analysis.edge_coordinates(universities, references)):
         folium.PolyLine(
-            locations=[
-                [source["latitude"], source["longitude"]],
-                [target["latitude"], target["longitude"]],
-            ],
+            locations=bucket["segments"],
             color="orange",
-            weight=row["weight"] * 0.5,
+            weight=bucket["weight"] * 0.5,
             opacity=0.6,
-        ).add_to(map_2d)
+        ).add_to(lines)
+    lines.add_to(map_2d)
+
+    # Add universities as markers
+    folium.GeoJson(
+        graph_analysis.university_features(universities),
+        name="Universities",
+        marker=folium.CircleMarker(color="blue", fill=True, fill_color="blue", fill_opacity=0.6),
+        style_function=lambda feature: {"radius": feature["properties"]["radius"]},  # Reduced scaling factor
+        popup=folium.GeoJsonPopup(fields=["name", "research_count"], aliases=["", "Research Count:"], max_width=200),
+    ).add_to(map_2d)
 
     return map_2d
 
 # 3D Realistic Globe Visualization with Plotly
 def create_realistic_globe_view(universities, references):
+    universities = graph_analysis.located(universities)
     fig = px.scatter_geo(
         universities,
         lat="latitude",
@@ -124,17 +149,17 @@ def create_realistic_globe_view(universities, references):
         showocean=True,
     )
     
-    # Add arcs for connections
-    for _, row in references.iterrows():
-        source = universities[universities["id"] == row["source_id"]].iloc[0]
-        target = universities[universities["id"] == row["target_id"]].iloc[0]
+    # Add arcs for connections (1 trace ต่อกลุ่ม weight เส้นคั่นด้วย None)
+    for bucket in graph_analysis.edge_lines(graph_analysis.edge_coordinates(universities, references)):
         fig.add_trace(
             go.Scattergeo(
-                lat=[source["latitude"], target["latitude"]],
-                lon=[source["longitude"], target["longitude"]],
+                lat=bucket["lat"],
+                lon=bucket["lon"],
                 mode="lines",
-                line=dict(width=row["weight"] * 0.5, color="orange"),
+                line=dict(width=bucket["weight"] * 0.5, color="orange"),
                 opacity=0.6,
+                hoverinfo="skip",
+                showlegend=False,
             )
         )
 
@@ -152,16 +177,35 @@ st.sidebar.header("Analysis Options")
 
 analysis_tab, visualization_tab = st.tabs(["Analysis", "Visualization"])
 
+# Betweenness / closeness แบบ sampling: 0 = คำนวณจากทุก node
+sample_size = st.sidebar.number_input(
+    "Centrality sample size (k)", min_value=0, max_value=G.number_of_nodes(), value=min(500, G.number_of_nodes()), step=50,
+    help="0 = exact (all nodes)",
+)
+
+# Analysis Tab
+with analysis_tab:
+    centralities = calculate_centralities(G, graph_key, k=int(sample_size) or None)
+    table = graph_analysis.centrality_table(G, centralities)
+    metric = st.selectbox("Rank by", list(centralities))
+    st.dataframe(table.sort_values(metric, ascending=False), hide_index=True, use_container_width=True)
+startup.checkpoint("analysis_tab")
+
 # Map view selection
 view_option = st.sidebar.radio("Choose Map View", ["3D Globe (Pydeck)", "2D Map", "3D Realistic Globe"])
 
-# Visualization Tab
+# Visualization Tab (แผนที่ใช้เฉพาะ universities ที่มีพิกัด; edge ที่ปลายด้านใดไม่มีพิกัดถูกตัดออก)
 with visualization_tab:
+    unlocated = len(universities) - len(graph_analysis.located(universities))
+    if unlocated:
+        st.caption(f"{unlocated:,} of {len(universities):,} universities have no coordinates and are shown in the Analysis tab only.")
     if view_option == "3D Globe (Pydeck)":
         st.pydeck_chart(create_3d_globe_view(universities, references))
     elif view_option == "2D Map":
         folium_map = create_2d_map_view(universities, references)
-        st_folium(folium_map, width=800, height=600)
+        _streamlit_folium.st_folium(folium_map, width=800, height=600)
     elif view_option == "3D Realistic Globe":
         st.plotly_chart(create_realistic_globe_view(universities, references), use_container_width=True)
+startup.checkpoint("visualization_tab")
+startup.report("app.py")
 
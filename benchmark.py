@@ -0,0 +1,432 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import affiliations
+import citation
+import coauthorship
+import data_cache
+import deck_data
+import graph_analysis
+import leaderboards
+import palette
+import pipeline
+import regions
+
+# เหมือน main.py: ข้อมูลที่แชร์ข้าม session ใช้ผ่าน view แบบ copy-on-write
+pd.set_option("mode.copy_on_write", True)
+
+# Benchmark ของเส้นทางข้อมูลใน main.py / app.py / clean_data.py / cleandata2.py ด้วยข้อมูลสังเคราะห์
+# ที่มี schema เดียวกับไฟล์จริง
+#   python benchmark.py --sizes 1000 10000 100000 --output benchmark_results.json
+#   python benchmark.py --compare old.json new.json
+DEFAULT_SIZES = [10**3, 10**4, 10**5]
+ALL_SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+
+# stage ที่หนักเกินจะรันที่ขนาดใหญ่ (serialize JSON ทั้งก้อน, centrality) จะถูกข้ามเมื่อเกินค่านี้
+MAX_ROWS = {
+    "deck_spec": 10**6,
+    "altair_spec": 10**6,
+    "plotly_animation": 10**6,
+    "centralities": 10**4,
+    "globe_edges": 10**6,
+}
+
+# stage ที่ช้าลงมากกว่าสัดส่วนนี้ถือว่า regression (ใช้กับ --compare)
+REGRESSION_RATIO = 1.2
+
+
+# ---------- ข้อมูลสังเคราะห์ ----------
+def _countries():
+    gazetteer = pd.read_csv(os.path.join("raw_data", "gazetteer.csv"), encoding="utf-8")
+    return gazetteer[gazetteer["kind"] == "country"].reset_index(drop=True)
+
+
+# colab_count.csv: Affiliation, Country, count, latitude, longitude
+# ~20% เป็นไทย, count แบบ long-tail, มีหน่วยย่อยของจุฬาฯ และมหาวิทยาลัย top 5 ปนอยู่
+def synthetic_collab(n, rng):
+    countries = _countries()
+    weights = np.where(countries["name"] == "Thailand", 0.2 * len(countries), 1.0)
+    picked = countries.iloc[rng.choice(len(countries), n, p=weights / weights.sum())]
+    names = np.array([f"Synthetic Institute {i}" for i in range(n)], dtype=object)
+    subunits = rng.random(n) < 0.02
+    names[subunits] = [f"Faculty {i}, {affiliations.HOME_INSTITUTION}" for i in np.flatnonzero(subunits)]
+    names[:1] = affiliations.HOME_INSTITUTION
+    names[1:1 + len(leaderboards.TOP_UNIVERSITIES)] = leaderboards.TOP_UNIVERSITIES
+    return pd.DataFrame({
+        "Affiliation": names,
+        "Country": picked["name"].to_numpy(),
+        "count": np.minimum(rng.zipf(1.8, n), 20000).astype(float),
+        "latitude": picked["latitude"].to_numpy() + rng.normal(0, 1.5, n),
+        "longitude": picked["longitude"].to_numpy() + rng.normal(0, 1.5, n),
+    })
+
+
+def synthetic_subjects():
+    return pd.read_csv("subject_area.csv", encoding="latin1", index_col=0)
+
+
+# aiml_data.csv + Cited_by.csv (input ของ cleandata2.py): 1-3 subject ต่อ paper ช่วงปี 2018-2023
+def synthetic_papers(n, rng, subjects):
+    codes = subjects["Subject_area_code"].astype(str).to_numpy()
+    abbrevs = subjects["Subject_area_abbrev"].to_numpy()
+    per_paper = rng.integers(1, 4, n)
+    picks = rng.integers(0, len(codes), per_paper.sum())
+    bounds = np.concatenate([[0], np.cumsum(per_paper)])
+    code_lists = ["#".join(codes[picks[a:b]]) + "#" for a, b in zip(bounds[:-1], bounds[1:])]
+    abbrev_lists = ["#".join(abbrevs[picks[a:b]]) + "#" for a, b in zip(bounds[:-1], bounds[1:])]
+    months = pd.date_range("2018-01-01", "2023-12-01", freq="MS")
+    ids = 201800000 + np.arange(n)
+    papers = pd.DataFrame({
+        "Id": ids,
+        "Author_amount": rng.integers(1, 30, n),
+        "Domestic_org_amount": rng.integers(0, 10, n),
+        "International_org_amount": rng.integers(0, 10, n),
+        "Ref_amount": rng.integers(0, 80, n).astype(float),
+        "Date_sort": months[rng.integers(0, len(months), n)].strftime("%Y-%m-%d"),
+        "Subject_area_code": code_lists,
+        "Subject_area_abbrev": abbrev_lists,
+    })
+    cited_by = pd.DataFrame({"paperID": ids, "Cited": rng.zipf(2.0, n)})
+    return papers, cited_by
+
+
+# affiliation_count.csv + affiliation_count(extra).csv (input ของ clean_data.py)
+def synthetic_raw_affiliations(collab, rng):
+    raw = collab[["Affiliation", "Country", "count"]].assign(count=lambda d: d["count"].astype(int))
+    raw.loc[0, "count"] = max(pipeline.CHULA_MIN_COUNT + 1, int(raw["count"].iloc[0]))
+    extra = raw.sample(frac=0.1, random_state=int(rng.integers(1 << 31)))
+    extra = pd.DataFrame({"Organization": extra["Affiliation"].to_numpy(), "CollabCount": rng.integers(1, 100, len(extra))})
+    return raw, extra
+
+
+# universities_mock.csv + references_mock.csv (input ของ app.py): n คือจำนวน edge
+def synthetic_network(n, rng):
+    nodes = max(10, n // 5)
+    universities = pd.DataFrame({
+        "id": np.arange(nodes),
+        "name": [f"University {i}" for i in range(nodes)],
+        "latitude": rng.uniform(-60, 70, nodes),
+        "longitude": rng.uniform(-180, 180, nodes),
+        "research_count": rng.integers(1, 1000, nodes),
+        "importance": rng.uniform(1, 10, nodes),
+    })
+    references = pd.DataFrame({
+        "source_id": rng.integers(0, nodes, n),
+        "target_id": rng.integers(0, nodes, n),
+        "weight": rng.integers(1, 10, n),
+    })
+    return universities, references
+
+
+# ตาราง (paper, affiliation) ของ coauthorship.py: n paper, paper ละ 1 + Poisson(2) affiliation
+# affiliation สุ่มแบบ Zipf (มีไม่กี่แห่งที่อยู่ในแทบทุก paper)
+def synthetic_paper_affiliations(n, rng):
+    sizes = 1 + rng.poisson(2, n)
+    pool = max(50, n // 20)
+    return pd.DataFrame({
+        "paper": np.repeat(np.arange(n), sizes),
+        "affiliation": [f"University {i}" for i in rng.zipf(1.5, sizes.sum()) % pool],
+    })
+
+
+# ---------- การจับเวลา ----------
+class Recorder:
+    def __init__(self, repeat=1):
+        self.repeat = repeat
+        self.results = []
+
+    # รัน func ซ้ำ repeat ครั้ง เก็บเวลาที่ดีที่สุด; measure(result) คืน dict ของค่าอื่นที่อยากบันทึก
+    def time(self, dataset, rows, stage, func, measure=None):
+        limit = MAX_ROWS.get(stage)
+        if limit is not None and rows > limit:
+            self.results.append({"dataset": dataset, "rows": rows, "stage": stage, "skipped": True})
+            return None
+        best = None
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        record = {"dataset": dataset, "rows": rows, "stage": stage, "seconds": round(best, 6)}
+        if measure is not None:
+            record.update(measure(result))
+        self.results.append(record)
+        print(f"{dataset:>10} {rows:>10,} {stage:<24} {best * 1000:10.1f} ms", file=sys.stderr)
+        return result
+
+
+def _json_bytes(spec):
+    return {"bytes": len(spec.encode("utf-8"))}
+
+
+def _frame_rows(df):
+    return {"output_rows": len(df)}
+
+
+def _frame_memory(df):
+    return {"output_rows": len(df), "memory_bytes": int(df.memory_usage(index=False, deep=True).sum())}
+
+
+# ---------- stage ของแต่ละชุดข้อมูล ----------
+def bench_collab(recorder, n, rng, workdir):
+    import pydeck as pdk
+    from pydeck.bindings.json_tools import default_serialize
+    import altair as alt
+
+    path = os.path.join(workdir, "colab_count.csv")
+    synthetic_collab(n, rng).to_csv(path, index=False, encoding="utf-8-sig")
+
+    recorder.time("collab", n, "csv_load", lambda: data_cache._read_csv_typed(path, "utf-8-sig"), _frame_rows)
+    recorder.time("collab", n, "columnar_build", lambda: data_cache.build_columnar(path, "utf-8-sig"))
+    df = recorder.time("collab", n, "columnar_load", lambda: data_cache.load_frame(path, "utf-8-sig"), _frame_memory)
+
+    df["Color"] = recorder.time("collab", n, "country_colors", lambda: palette.country_colors(df["Country"]))
+    index = recorder.time("collab", n, "spatial_index", lambda: regions.SpatialIndex(df["latitude"], df["longitude"]))
+    region_rows = recorder.time("collab", n, "region_rows", lambda: regions.region_rows(df, index))
+    names = recorder.time("collab", n, "affiliation_index", lambda: affiliations.AffiliationIndex(df["Affiliation"]))
+    df["Affiliation_id"], df["Parent_id"] = names.canonical_columns(exclude=affiliations.HOME_EXCLUDE)
+    home_id = names.id_of(affiliations.HOME_INSTITUTION)
+    home_parent_id = names.home_parent_id(exclude=affiliations.HOME_EXCLUDE)
+
+    # ตัวกรองใน main.py: exclude internal + region + ช่วง count
+    def filters():
+        without_chula = df[(df["Affiliation_id"] != home_id) & (df["Parent_id"] != home_parent_id)]
+        thailand = df.iloc[region_rows.get("Thailand", [])]
+        low, high = df["count"].quantile([0.1, 0.9])
+        in_range = df[(df["count"] >= low) & (df["count"] <= high)]
+        return without_chula, thailand, in_range
+    without_chula, _, in_range = recorder.time("collab", n, "filters", filters)
+
+    # leaderboards: LeaderboardStore แบบที่ main.py ใช้ (สร้างอันดับทั้งหมด + อ่าน top ของแต่ละส่วน)
+    def leaderboard_store():
+        store = leaderboards.LeaderboardStore(without_chula)
+        return store, store.countries.top(), store.thai.top(5), store.overseas.top(5), store.top_universities
+    store, _, _, _, top5 = recorder.time("collab", n, "leaderboards", leaderboard_store)
+    country_counts = store.countries.table
+
+    # อัปเดต count 100 แถวแบบ incremental (update_counts) แทนการสร้าง store ใหม่
+    changes = pd.Series(
+        rng.integers(1, 1000, min(100, len(store.data))).astype(store.data["count"].dtype),
+        index=rng.choice(len(store.data), min(100, len(store.data)), replace=False),
+    )
+    recorder.time("collab", n, "leaderboard_update", lambda: store.update_counts(changes))
+
+    pyramid = recorder.time("collab", n, "edge_pyramid", lambda: deck_data.build_edge_pyramid(in_range),
+                            lambda p: {"output_rows": sum(level["rows"] for level in p)})
+
+    def deck_json(layers):
+        deck = pdk.Deck(layers=layers, initial_view_state=pdk.ViewState(latitude=0, longitude=0, zoom=1))
+        return json.dumps(deck, sort_keys=True, default=default_serialize, separators=(",", ":"))
+
+    # เส้นของหน้าจอเริ่มต้น (Chula, zoom 7): รายตัวในหน้าจอ นอกหน้าจอรวมต่อประเทศ
+    def viewport_edges():
+        index = regions.SpatialIndex(in_range["latitude"], in_range["longitude"])
+        return deck_data.viewport_level(in_range, index.query_viewport(13.74, 100.53, 7), 7)
+    level = recorder.time("collab", n, "viewport_edges", viewport_edges, lambda l: {"output_rows": l["rows"]})
+
+    def deck_spec():
+        return deck_json([
+            pdk.Layer("ArcLayer", data=level["edges"], get_source_position=[100.53, 13.74], get_target_position="position"),
+            pdk.Layer("ScatterplotLayer", data=level["nodes"], get_position="position"),
+        ])
+    if level is not None:
+        recorder.time("collab", n, "deck_spec", deck_spec, _json_bytes)
+    heatmap = recorder.time("collab", n, "heatmap_pyramid", lambda: deck_data.build_heatmap_pyramid(in_range),
+                            lambda p: {"output_rows": sum(level["rows"] for level in p)})
+    if heatmap is not None:
+        recorder.time("collab", n, "heatmap_spec", lambda: deck_json([
+            pdk.Layer("HeatmapLayer", deck_data.pick_level(heatmap, 1)["bins"], get_position="position", get_weight="weight"),
+        ]), _json_bytes)
+
+    def altair_spec():
+        with alt.data_transformers.disable_max_rows():
+            top_countries = alt.Chart(country_counts.nlargest(5, "count")).mark_bar().encode(
+                x="Country:N", y="count:Q", tooltip=["Country", "count"]
+            )
+            top_universities = alt.Chart(top5).mark_bar().encode(x="Affiliation", y="count:Q", color="Country:N")
+            return top_countries.to_json() + top_universities.to_json()
+    recorder.time("collab", n, "altair_spec", altair_spec, _json_bytes)
+
+
+def bench_citation(recorder, n, rng, workdir):
+    import plotly.express as px
+    import altair as alt
+
+    subjects = synthetic_subjects()
+    papers, cited_by = synthetic_papers(n, rng, subjects)
+    papers_path = os.path.join(workdir, "aiml_data.csv")
+    subjects_path = os.path.join(workdir, "subject_area.csv")
+    cited_by_path = os.path.join(workdir, "Cited_by.csv")
+    exploded_path = os.path.join(workdir, "subject_exploded.csv")
+    cited_path = os.path.join(workdir, "Cited.csv")
+    papers.to_csv(papers_path, encoding="latin1")
+    subjects.to_csv(subjects_path, encoding="latin1")
+    cited_by.to_csv(cited_by_path, encoding="latin1")
+
+    # cleandata2.py (ทั้งแบบปกติและ streaming)
+    recorder.time("citation", n, "explode_subjects", lambda: pipeline.explode_subjects(papers_path, subjects_path, exploded_path))
+    recorder.time("citation", n, "join_citations", lambda: pipeline.join_citations(exploded_path, cited_by_path, cited_path))
+    recorder.time("citation", n, "stream_citations", lambda: pipeline.stream_citations(
+        papers_path, subjects_path, cited_by_path, f"{cited_path}.stream", chunksize=50000
+    ))
+
+    recorder.time("citation", n, "csv_load", lambda: data_cache._read_csv_typed(cited_path, "latin1"), _frame_rows)
+    recorder.time("citation", n, "columnar_build", lambda: data_cache.build_columnar(cited_path, "latin1"))
+    cited = recorder.time("citation", n, "columnar_load", lambda: data_cache.load_frame(cited_path, "latin1"), _frame_memory)
+
+    tables = recorder.time("citation", n, "citation_tables", lambda: citation.derive_citation_tables(cited))
+
+    # ต้นทุนต่อ session: st.cache_data คืนสำเนาที่ unpickle ใหม่ทุกครั้ง ส่วน cache_resource + session_view
+    # แชร์ buffer เดียวกัน session_bytes คือขนาดคอลัมน์ที่ session นั้นต้องถือเอง
+    def session_bytes(view):
+        return {"session_bytes": sum(data_cache.private_bytes(view[k], tables[k]) for k in view if isinstance(view[k], pd.DataFrame))}
+    recorder.time("citation", n, "session_copy", lambda: pickle.loads(pickle.dumps(tables)), session_bytes)
+    recorder.time("citation", n, "session_view", lambda: data_cache.session_view(tables), session_bytes)
+    windows = recorder.time("citation", n, "monthly_index", lambda: citation.MonthlyIndex(tables["cited"]))
+    recorder.time("citation", n, "window_query", lambda: windows.top(windows.labels[len(windows.labels) // 4], windows.labels[-1]))
+    frames = recorder.time("citation", n, "animation_frames", lambda: citation.animation_frames(tables["cited"]), _frame_rows)
+
+    # st.altair_chart ไม่ใช้ max_rows ของ altair (ส่งข้อมูลแยกเอง) จึงปิด limit ตอนวัด
+    def altair_spec():
+        with alt.data_transformers.disable_max_rows():
+            return alt.Chart(tables["cited"]).mark_circle().encode(x="Author_amount", y="Cited", tooltip=["Author_amount", "Cited"]).to_json()
+    recorder.time("citation", n, "altair_spec", altair_spec, _json_bytes)
+
+    def plotly_animation():
+        return px.scatter(
+            frames, x="ID_Cumsum", y="Cited_Cumsum", color="Subject_area_abbrev",
+            animation_frame="Month-Year", animation_group="Subject_area_abbrev",
+        ).to_json()
+    recorder.time("citation", n, "plotly_animation", plotly_animation, _json_bytes)
+
+
+def bench_affiliation_pipeline(recorder, n, rng, workdir):
+    raw, extra = synthetic_raw_affiliations(synthetic_collab(n, rng), rng)
+    raw_path = os.path.join(workdir, "affiliation_count.csv")
+    extra_path = os.path.join(workdir, "affiliation_count(extra).csv")
+    folded_path = os.path.join(workdir, "affiliation_folded.csv")
+    raw.to_csv(raw_path, index=False, encoding="utf-8")
+    extra.to_csv(extra_path, encoding="utf-8")
+
+    # clean_data.py
+    recorder.time("clean_data", n, "fold_chula_subunits", lambda: pipeline.fold_chula_subunits(raw_path, folded_path))
+    recorder.time("clean_data", n, "merge_extra_counts", lambda: pipeline.merge_extra_counts(
+        folded_path, extra_path, os.path.join(workdir, "updated_affiliation_count.csv")
+    ))
+
+
+def bench_coauthorship(recorder, n, rng, workdir):
+    pairs = synthetic_paper_affiliations(n, rng)
+    incidence, _ = recorder.time("coauthorship", n, "incidence_matrix", lambda: coauthorship.incidence_matrix(pairs))
+    matrix = recorder.time("coauthorship", n, "cooccurrence", lambda: coauthorship.cooccurrence(incidence))
+    recorder.time("coauthorship", n, "edge_list", lambda: coauthorship.edge_list(matrix), _frame_rows)
+
+
+def bench_network(recorder, n, rng, workdir):
+    import plotly.graph_objects as go
+
+    universities, references = synthetic_network(n, rng)
+    G = recorder.time("network", n, "build_graph", lambda: graph_analysis.build_graph(universities, references))
+    recorder.time("network", n, "centralities", lambda: graph_analysis.calculate_centralities(G, k=min(200, len(G))))
+    edges = recorder.time("network", n, "edge_coordinates", lambda: graph_analysis.edge_coordinates(universities, references), _frame_rows)
+
+    def globe_edges():
+        fig = go.Figure([
+            go.Scattergeo(lat=bucket["lat"], lon=bucket["lon"], mode="lines", line=dict(width=bucket["weight"] * 0.5))
+            for bucket in graph_analysis.edge_lines(edges)
+        ])
+        return fig.to_json()
+    recorder.time("network", n, "globe_edges", globe_edges, _json_bytes)
+
+
+BENCHMARKS = {
+    "collab": bench_collab,
+    "citation": bench_citation,
+    "clean_data": bench_affiliation_pipeline,
+    "network": bench_network,
+    "coauthorship": bench_coauthorship,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, datasets=tuple(BENCHMARKS), repeat=1, seed=0):
+    recorder = Recorder(repeat)
+    cache_dir = data_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as workdir:
+        # ไฟล์ Arrow ของข้อมูลสังเคราะห์ไม่ปนกับ cache จริง
+        data_cache.CACHE_DIR = os.path.join(workdir, ".cache")
+        try:
+            for n in sizes:
+                for name in datasets:
+                    BENCHMARKS[name](recorder, n, np.random.default_rng(seed), workdir)
+        finally:
+            data_cache.CACHE_DIR = cache_dir
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "sizes": list(sizes),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": recorder.results,
+    }
+
+
+# เทียบผลสองไฟล์: คืนรายการ stage ที่ช้าลงเกิน REGRESSION_RATIO
+def compare(old, new, ratio=REGRESSION_RATIO):
+    key = lambda r: (r["dataset"], r["rows"], r["stage"])
+    before = {key(r): r for r in old["results"] if "seconds" in r}
+    regressions = []
+    for record in new["results"]:
+        previous = before.get(key(record))
+        if previous is None or "seconds" not in record or previous["seconds"] <= 0:
+            continue
+        change = record["seconds"] / previous["seconds"]
+        print(f"{record['dataset']:>10} {record['rows']:>10,} {record['stage']:<24} x{change:6.2f}")
+        if change > ratio:
+            regressions.append({**record, "previous_seconds": previous["seconds"], "ratio": round(change, 3)})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data paths on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help=f"row counts (up to {ALL_SIZES[-1]:,})")
+    parser.add_argument("--datasets", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f_old, open(args.compare[1], encoding="utf-8") as f_new:
+            regressions = compare(json.load(f_old), json.load(f_new))
+        for r in regressions:
+            print(f"REGRESSION {r['dataset']} {r['rows']:,} {r['stage']}: {r['previous_seconds']}s -> {r['seconds']}s")
+        sys.exit(1 if regressions else 0)
+
+    report = run(args.sizes, args.datasets, args.repeat, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
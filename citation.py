@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+# คำนวณตารางที่ใช้ในแท็บ Citation_Analysis จากข้อมูล Cited.csv
+# ไม่แก้ไข DataFrame ต้นฉบับ (ทำงานบนสำเนาที่เรียงแล้ว)
+def derive_citation_tables(cited):
+    # จัดเรียงข้อมูลตามวันที่และ Subject_area_abbrev (sort_values คืนสำเนาใหม่)
+    cited = cited.sort_values(by=["Subject_area_abbrev", "Date_sort"])
+    if not pd.api.types.is_datetime64_any_dtype(cited["Date_sort"]):
+        cited["Date_sort"] = pd.to_datetime(cited["Date_sort"])
+
+    # คำนวณค่าที่สะสม
+    by_subject = cited.groupby("Subject_area_abbrev", observed=True)
+    cited["Cited_Cumsum"] = by_subject["Cited"].cumsum()  # Cited สะสม
+    cited["ID_Cumsum"] = by_subject.cumcount() + 1         # ID สะสม
+
+    # เพิ่มคอลัมน์ Month-Year (category เรียงตามเวลา เพราะรูปแบบ YYYY-MM) และ Year
+    cited["Month-Year"] = cited["Date_sort"].dt.to_period("M").astype(str).astype("category")
+    cited["Year"] = cited["Date_sort"].dt.year
+
+    by_year = cited.groupby(["Year", "Subject_area_name", "Subject_area_abbrev"], observed=True)
+
+    # Subject_area_name ที่มีจำนวน ID มากที่สุดในแต่ละปี
+    max_id_per_year = (
+        by_year["Id"]
+        .count()
+        .reset_index(name="ID_Count")
+        .sort_values(by=["Year", "ID_Count"], ascending=[True, False])
+        .drop_duplicates(subset=["Year"])
+        .rename(columns={"Subject_area_name": "Subject_area_name_ID"})
+    )
+
+    # Subject_area_name ที่มีจำนวน Cited มากที่สุดในแต่ละปี
+    max_cited_per_year = (
+        by_year["Cited"]
+        .sum()
+        .reset_index()
+        .sort_values(by=["Year", "Cited"], ascending=[True, False])
+        .drop_duplicates(subset=["Year"])
+        .rename(columns={"Subject_area_name": "Subject_area_name_Cited", "Cited": "Cited_Count"})
+    )
+
+    return {
+        "cited": cited,
+        "max_id": cited["ID_Cumsum"].max(),
+        "max_cited": cited["Cited_Cumsum"].max(),
+        "max_id_per_year": max_id_per_year,
+        "max_cited_per_year": max_cited_per_year,
+    }
+
+
+# ลดข้อมูล animation เหลือหนึ่งจุดต่อ subject ต่อเดือน (ค่าสะสม ณ สิ้นเดือน)
+# เดือนที่ไม่มี paper ใหม่ใช้ค่าล่าสุดของ subject นั้นต่อ (subject ไม่หายจาก frame)
+def animation_frames(cited):
+    monthly = cited.groupby(["Subject_area_abbrev", "Month-Year"], observed=True).agg(
+        ID_Cumsum=("ID_Cumsum", "max"),
+        Cited_Cumsum=("Cited_Cumsum", "max"),
+        Subject_area_name=("Subject_area_name", "last"),
+    )
+    months = sorted(cited["Month-Year"].unique())
+    subjects = monthly.index.get_level_values(0).unique()
+    grid = pd.MultiIndex.from_product([subjects, months], names=["Subject_area_abbrev", "Month-Year"])
+    frames = (
+        monthly.reindex(grid)
+        .groupby(level="Subject_area_abbrev", observed=True)
+        .ffill()
+        .dropna(subset=["ID_Cumsum"])
+        .reset_index()
+        .sort_values(["Month-Year", "Subject_area_abbrev"], ignore_index=True)
+    )
+    frames["ID_Cumsum"] = frames["ID_Cumsum"].astype(int)
+    frames["Cited_Cumsum"] = frames["Cited_Cumsum"].astype(int)
+    return frames
+
+
+# Prefix sum รายเดือนต่อ subject ของจำนวน paper และ Cited (สร้างครั้งเดียวต่อ dataset)
+# ผลรวมของช่วงเดือน [start, end] = prefix[:, end + 1] - prefix[:, start]
+# ใช้งานคงที่ต่อ subject ไม่ว่าช่วงจะยาวแค่ไหนหรือข้อมูลย้อนหลังกี่ปี
+class MonthlyIndex:
+    def __init__(self, cited):
+        dates = cited["Date_sort"]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        codes, subjects = pd.factorize(cited["Subject_area_abbrev"], sort=True)
+        valid = (codes >= 0) & dates.notna().to_numpy()
+        months = dates[valid].dt.to_period("M")
+        first, last = months.min(), months.max()
+        self.months = pd.period_range(first, last, freq="M")
+        self.labels = list(self.months.strftime("%Y-%m"))
+        self.subjects = pd.Index(subjects, name="Subject_area_abbrev")
+
+        n_months = len(self.months)
+        cell = codes[valid] * n_months + (months.dt.year * 12 + months.dt.month - (first.year * 12 + first.month)).to_numpy()
+        size = len(self.subjects) * n_months
+        papers = np.bincount(cell, minlength=size).reshape(len(self.subjects), n_months)
+        cites = np.bincount(cell, weights=cited["Cited"].to_numpy()[valid], minlength=size)
+        cites = np.rint(cites).astype(np.int64).reshape(len(self.subjects), n_months)
+        self.papers = self._prefix(papers)
+        self.cited = self._prefix(cites)
+
+    @staticmethod
+    def _prefix(counts):
+        prefix = np.zeros((counts.shape[0], counts.shape[1] + 1), dtype=np.int64)
+        np.cumsum(counts, axis=1, out=prefix[:, 1:])
+        return prefix
+
+    # ตำแหน่งของเดือน (รับ "YYYY-MM", Period หรือวันที่) ค่านอกช่วงถูกบีบให้อยู่ในช่วงข้อมูล
+    def position(self, month):
+        ordinal = pd.Period(month, freq="M").ordinal - self.months[0].ordinal
+        return min(max(ordinal, 0), len(self.months) - 1)
+
+    # จำนวน paper และ Cited ของแต่ละ subject ในช่วง [start, end] (รวมทั้งสองเดือน)
+    def window(self, start, end):
+        lo, hi = self.position(start), self.position(end)
+        if lo > hi:
+            lo, hi = hi, lo
+        return pd.DataFrame({
+            "Subject_area_abbrev": self.subjects,
+            "Papers": self.papers[:, hi + 1] - self.papers[:, lo],
+            "Cited": self.cited[:, hi + 1] - self.cited[:, lo],
+        })
+
+    # k subject แรกของช่วงเรียงตาม by ("Cited" หรือ "Papers") ไม่นับ subject ที่เป็น 0
+    def top(self, start, end, by="Cited", k=10):
+        window = self.window(start, end)
+        return window[window[by] > 0].nlargest(k, by).reset_index(drop=True)
@@ -0,0 +1,123 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import geocode
+
+# คอลัมน์ของไฟล์ paper: Id + list ของ affiliation ต่อ paper คั่นด้วย "#" (แบบเดียวกับ Subject_area_code)
+PAPER_COLUMN = "Id"
+AFFILIATION_COLUMN = "Affiliations"
+SEPARATOR = "#"
+
+# output ในรูปแบบที่ app.py อ่าน (เหมือน universities_mock.csv / references_mock.csv)
+UNIVERSITIES_PATH = "universities.csv"
+REFERENCES_PATH = "references.csv"
+UNIVERSITY_COLUMNS = ["id", "name", "latitude", "longitude", "research_count", "importance"]
+REFERENCE_COLUMNS = ["source_id", "target_id", "weight"]
+
+# ช่วงของ importance (app.py ใช้เป็นขนาดจุดบนแผนที่)
+MIN_IMPORTANCE = 1
+MAX_IMPORTANCE = 10
+
+
+# ตาราง (paper, affiliation) หนึ่งแถวต่อคู่ จากคอลัมน์ list แบบ "A#B#C#"
+def paper_affiliations(papers, paper=PAPER_COLUMN, column=AFFILIATION_COLUMN, sep=SEPARATOR):
+    lists = papers[[paper, column]].dropna(subset=[column])
+    pairs = lists.assign(**{column: lists[column].str.rstrip(sep).str.split(sep)}).explode(column)
+    names = pairs[column].str.strip()
+    pairs = pairs.assign(**{column: names})[(names.notna() & (names != "")).to_numpy()]
+    return pairs.rename(columns={paper: "paper", column: "affiliation"}).reset_index(drop=True)
+
+
+# incidence matrix (paper x affiliation) แบบ CSR: ช่อง (i, j) = 1 ถ้า paper i มี affiliation j
+# affiliation ซ้ำใน paper เดียวกันนับครั้งเดียว; คืน (matrix, ชื่อ affiliation ตาม column)
+def incidence_matrix(pairs):
+    paper_codes, papers = pd.factorize(pairs["paper"])
+    affiliation_codes, names = pd.factorize(pairs["affiliation"], sort=True)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (paper_codes, affiliation_codes)),
+        shape=(len(papers), len(names)),
+    )
+    incidence.data[:] = 1
+    return incidence, pd.Index(names, name="affiliation")
+
+
+# co-occurrence = Aᵀ A: ช่อง (j, k) = จำนวน paper ที่มีทั้ง j และ k, เส้นทแยง = จำนวน paper ของ j
+def cooccurrence(incidence):
+    return (incidence.T @ incidence).tocsr()
+
+
+# edge ของคู่ที่ร่วมงานกัน: สามเหลี่ยมบน (ไม่รวมเส้นทแยง) เรียงตาม (source_id, target_id)
+def edge_list(matrix, min_weight=1):
+    upper = sparse.triu(matrix, k=1, format="csr").tocoo()
+    keep = upper.data >= min_weight
+    return pd.DataFrame({
+        "source_id": upper.row[keep].astype(np.int64),
+        "target_id": upper.col[keep].astype(np.int64),
+        "weight": upper.data[keep].astype(np.int64),
+    })
+
+
+# importance: log ของ research_count สเกลเป็น MIN_IMPORTANCE..MAX_IMPORTANCE
+def importance(research_count):
+    scaled = np.log1p(research_count) / max(np.log1p(research_count.max(initial=0)), 1e-12)
+    return (MIN_IMPORTANCE + (MAX_IMPORTANCE - MIN_IMPORTANCE) * scaled).round(3)
+
+
+# พิกัดจากตารางที่ geocode แล้ว (เช่น colab_count.csv) จับคู่ด้วย geocode.name_key
+def locate(names, locations, name="Affiliation"):
+    located = locations.assign(key=geocode.name_keys(locations[name])).dropna(subset=["key", "latitude", "longitude"])
+    coordinates = located.drop_duplicates("key").set_index("key")[["latitude", "longitude"]]
+    return coordinates.reindex(geocode.name_keys(pd.Series(names, dtype=object))).reset_index(drop=True)
+
+
+# universities + references ของ app.py จากตาราง (paper, affiliation)
+# id ของ affiliation คือลำดับชื่อ (เรียงตามตัวอักษร); affiliation ที่ไม่มีพิกัดได้ latitude/longitude เป็น NaN
+def build_network(pairs, locations=None, min_weight=1):
+    incidence, names = incidence_matrix(pairs)
+    matrix = cooccurrence(incidence)
+    research_count = matrix.diagonal().astype(np.int64)
+    universities = pd.DataFrame({"id": np.arange(len(names)), "name": names.to_numpy()})
+    if locations is not None:
+        universities[["latitude", "longitude"]] = locate(names, locations).to_numpy()
+    else:
+        universities["latitude"] = np.nan
+        universities["longitude"] = np.nan
+    universities["research_count"] = research_count
+    universities["importance"] = importance(research_count)
+    return universities[UNIVERSITY_COLUMNS], edge_list(matrix, min_weight)
+
+
+def export(universities, references, universities_path=UNIVERSITIES_PATH, references_path=REFERENCES_PATH):
+    universities[UNIVERSITY_COLUMNS].to_csv(universities_path, index=False, encoding="utf-8")
+    references[REFERENCE_COLUMNS].to_csv(references_path, index=False, encoding="utf-8")
+
+
+#   python coauthorship.py papers.csv
+#   python coauthorship.py papers.csv --column Affiliations --locations colab_count.csv --min-weight 2
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the co-authorship network for app.py from paper-level affiliation lists")
+    parser.add_argument("papers")
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--paper-column", default=PAPER_COLUMN)
+    parser.add_argument("--column", default=AFFILIATION_COLUMN)
+    parser.add_argument("--sep", default=SEPARATOR)
+    parser.add_argument("--locations", default="colab_count.csv")
+    parser.add_argument("--min-weight", type=int, default=1)
+    parser.add_argument("--universities", default=UNIVERSITIES_PATH)
+    parser.add_argument("--references", default=REFERENCES_PATH)
+    args = parser.parse_args()
+
+    papers = pd.read_csv(args.papers, encoding=args.encoding, usecols=[args.paper_column, args.column])
+    pairs = paper_affiliations(papers, args.paper_column, args.column, args.sep)
+    locations = pd.read_csv(args.locations, encoding="utf-8-sig") if args.locations else None
+    universities, references = build_network(pairs, locations, args.min_weight)
+    export(universities, references, args.universities, args.references)
+    print(
+        f"{len(pairs)} paper-affiliation pairs -> {len(universities)} universities, {len(references)} edges"
+        f" ({universities['latitude'].isna().sum()} universities without coordinates, not shown on the maps)",
+        file=sys.stderr,
+    )
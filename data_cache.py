@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# โฟลเดอร์เก็บไฟล์ Arrow ที่แปลงจาก CSV แล้ว
+CACHE_DIR = ".cache"
+# เปลี่ยนเลขนี้เมื่อแก้ SCHEMAS เพื่อบังคับให้แปลงไฟล์ใหม่
+SCHEMA_VERSION = 2
+
+# Schema ของไฟล์ต้นทางแต่ละไฟล์
+# - dtype / parse_dates: ใช้ตอนอ่าน CSV
+# - compact: dtype ที่เก็บจริงใน cache ("integer" = int ที่เล็กที่สุดที่พอสำหรับข้อมูลชุดนั้น)
+#   string ที่ซ้ำกันมากเป็น category; Affiliation แทบไม่ซ้ำกันจึงคงเป็น object
+# - encoding: ค่าเริ่มต้นของ report ใน __main__
+SCHEMAS = {
+    "colab_count.csv": {
+        "encoding": "utf-8-sig",
+        "dtype": {
+            "Affiliation": "object",
+            "Country": "object",
+            "count": "float64",
+            "latitude": "float64",
+            "longitude": "float64",
+        },
+        "parse_dates": [],
+        "compact": {
+            "Country": "category",
+            "count": "float32",
+            "latitude": "float32",
+            "longitude": "float32",
+        },
+    },
+    "Cited.csv": {
+        "encoding": "latin1",
+        "dtype": {
+            "Id": "int64",
+            "Author_amount": "int64",
+            "Domestic_org_amount": "int64",
+            "International_org_amount": "int64",
+            "Ref_amount": "int64",
+            "Date_sort": "object",
+            "Subject_area_code": "int64",
+            "Cited": "int64",
+            "Subject_area_name": "object",
+            "Subject_area_abbrev": "object",
+        },
+        "parse_dates": ["Date_sort"],
+        "compact": {
+            "Id": "integer",
+            "Author_amount": "integer",
+            "Domestic_org_amount": "integer",
+            "International_org_amount": "integer",
+            "Ref_amount": "integer",
+            "Date_sort": "datetime64[ns]",
+            "Subject_area_code": "integer",
+            "Cited": "integer",
+            "Subject_area_name": "category",
+            "Subject_area_abbrev": "category",
+        },
+    },
+}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_paths(path):
+    name = os.path.basename(path)
+    return (
+        os.path.join(CACHE_DIR, f"{name}.arrow"),
+        os.path.join(CACHE_DIR, f"{name}.meta.json"),
+    )
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# เขียนลงไฟล์ชั่วคราวชื่อไม่ซ้ำในโฟลเดอร์เดียวกัน แล้ว os.replace (ผู้อ่านเห็นแค่ไฟล์เก่าหรือไฟล์ที่เขียนเสร็จแล้ว)
+def _write_atomic(path, write):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_meta(meta_path, meta):
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    _write_atomic(meta_path, write)
+
+
+# lock ต่อไฟล์ต้นทาง: หลาย session ที่เริ่มพร้อมกันแปลงไฟล์เดียวกันแค่ครั้งเดียว
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _path_lock(path):
+    key = os.path.abspath(path)
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+# ตรวจว่าไฟล์ Arrow ยังตรงกับ CSV ต้นทางหรือไม่
+# เช็ค mtime/size ก่อน ถ้าไม่ตรงค่อยเทียบ hash ของเนื้อไฟล์
+def _is_fresh(path, encoding, arrow_path, meta_path):
+    meta = _read_meta(meta_path)
+    if (
+        meta is None
+        or meta.get("schema_version") != SCHEMA_VERSION
+        or meta.get("encoding") != encoding
+        or not os.path.exists(arrow_path)
+    ):
+        return False, None
+    st = os.stat(path)
+    if meta["mtime_ns"] == st.st_mtime_ns and meta["size"] == st.st_size:
+        return True, meta
+    digest = file_hash(path)
+    if digest != meta["sha1"]:
+        return False, None
+    # แค่ touch ไฟล์ เนื้อหาเหมือนเดิม -> อัปเดต mtime แล้วใช้ cache ต่อ
+    meta.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+    _write_meta(meta_path, meta)
+    return True, meta
+
+
+# แปลงคอลัมน์ตาม plan (dict ชื่อคอลัมน์ -> dtype) คอลัมน์ที่ไม่มีใน df ถูกข้าม
+def compact(df, plan):
+    df = df.copy()
+    for column, dtype in plan.items():
+        if column not in df:
+            continue
+        if dtype == "integer":
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def _read_csv_typed(path, encoding, compact_types=True):
+    schema = SCHEMAS.get(os.path.basename(path), {})
+    df = pd.read_csv(
+        path,
+        encoding=encoding,
+        dtype=schema.get("dtype"),
+        parse_dates=schema.get("parse_dates") or False,
+    )
+    # BOM ที่ค้างอยู่ในชื่อคอลัมน์แรก
+    df.columns = [c.lstrip("\ufeff") for c in df.columns]
+    if compact_types:
+        df = compact(df, schema.get("compact", {}))
+    return df
+
+
+# เทียบขนาดในหน่วยความจำของแต่ละคอลัมน์ ก่อน (dtype ตอนอ่าน CSV) และหลังใช้ compact plan
+def memory_report(path, encoding="utf-8"):
+    before = _read_csv_typed(path, encoding, compact_types=False)
+    after = compact(before, SCHEMAS.get(os.path.basename(path), {}).get("compact", {}))
+    report = pd.DataFrame({
+        "before_dtype": before.dtypes.astype(str),
+        "before_bytes": before.memory_usage(index=False, deep=True),
+        "after_dtype": after.dtypes.astype(str),
+        "after_bytes": after.memory_usage(index=False, deep=True),
+    })
+    report.loc["total"] = ["", report["before_bytes"].sum(), "", report["after_bytes"].sum()]
+    report["ratio"] = (report["after_bytes"] / report["before_bytes"]).round(3)
+    return report
+
+
+# แปลง CSV เป็น Arrow IPC (ไม่บีบอัด เพื่อให้ memory-map ได้)
+def build_columnar(path, encoding="utf-8"):
+    with _path_lock(path):
+        return _build_columnar(path, encoding)
+
+
+def _build_columnar(path, encoding):
+    arrow_path, meta_path = _cache_paths(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    st = os.stat(path)
+    digest = file_hash(path)
+    df = _read_csv_typed(path, encoding)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    _write_atomic(arrow_path, lambda tmp: feather.write_feather(table, tmp, compression="uncompressed"))
+    meta = {
+        "source": os.path.basename(path),
+        "encoding": encoding,
+        "schema_version": SCHEMA_VERSION,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha1": digest,
+        "rows": table.num_rows,
+    }
+    _write_meta(meta_path, meta)
+    return meta
+
+
+# แปลงใหม่เฉพาะเมื่อ CSV เปลี่ยน แล้วคืน metadata ของ cache
+# ถ้าไม่ fresh ให้รอ lock ของไฟล์นั้นแล้วเช็คใหม่ (อีก thread อาจแปลงเสร็จไปแล้ว)
+def ensure_columnar(path, encoding="utf-8"):
+    arrow_path, meta_path = _cache_paths(path)
+    fresh, meta = _is_fresh(path, encoding, arrow_path, meta_path)
+    if fresh:
+        return meta
+    with _path_lock(path):
+        fresh, meta = _is_fresh(path, encoding, arrow_path, meta_path)
+        if not fresh:
+            meta = _build_columnar(path, encoding)
+    return meta
+
+
+# คืน Arrow table ที่ memory-map จากไฟล์ cache
+def load_table(path, encoding="utf-8"):
+    meta = ensure_columnar(path, encoding)
+    arrow_path, _ = _cache_paths(path)
+    return feather.read_table(arrow_path, memory_map=True), meta
+
+
+# shared=True: คอลัมน์ตัวเลขที่ไม่มีค่าว่างชี้ตรงไปที่ buffer ของไฟล์ที่ memory-map ไว้ (ไม่ copy, อ่านอย่างเดียว)
+# ใช้กับ DataFrame ที่เก็บไว้ใน st.cache_resource แล้วให้แต่ละ session ใช้ผ่าน session_view()
+def load_frame(path, encoding="utf-8", shared=False):
+    table, _ = load_table(path, encoding)
+    if shared:
+        return table.to_pandas(split_blocks=True)
+    return table.to_pandas()
+
+
+# view ของข้อมูลที่แชร์ร่วมกันทุก session (ต้องเปิด pandas copy-on-write)
+# shallow copy ไม่ copy ข้อมูลจริง แต่ session จะเพิ่ม/แก้คอลัมน์ได้โดยไม่กระทบของที่แชร์ (copy เฉพาะส่วนที่แก้)
+def session_view(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.copy(deep=False)
+    if isinstance(obj, dict):
+        return {k: session_view(v) for k, v in obj.items()}
+    return obj
+
+
+def _buffers(df):
+    for _, column in df.items():
+        values = column.array
+        for arr in (getattr(values, "_ndarray", None), getattr(values, "_codes", None), getattr(values, "_data", None)):
+            if isinstance(arr, np.ndarray):
+                yield arr
+
+
+# จำนวน byte ของคอลัมน์ใน view ที่ไม่ได้ชี้ไปที่ buffer เดียวกับ base (คือส่วนที่ session นั้นจ่ายเพิ่มเอง)
+def private_bytes(view, base):
+    shared = list(_buffers(base))
+    return sum(
+        arr.nbytes for arr in _buffers(view)
+        if not any(np.shares_memory(arr, other) for other in shared)
+    )
+
+
+# version ของ dataset (hash ของ CSV ต้นทาง) ใช้เป็น key ของ cache อื่น ๆ
+def dataset_version(path, encoding="utf-8"):
+    return ensure_columnar(path, encoding)["sha1"]
+
+
+#   python data_cache.py colab_count.csv Cited.csv
+if __name__ == "__main__":
+    import sys
+
+    for path in sys.argv[1:] or list(SCHEMAS):
+        encoding = SCHEMAS.get(os.path.basename(path), {}).get("encoding", "utf-8")
+        print(f"== {path} ({encoding})")
+        print(memory_report(path, encoding).to_string())
@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+import palette
+
+# ระดับรายละเอียด (level of detail) ของเส้น ArcLayer เรียงจาก zoom น้อยไปมาก
+# - cell_size=None: รวมทั้งประเทศเป็นเส้นเดียว
+# - cell_size>0: รวมตามช่อง grid (องศา) + ประเทศ ยกเว้นช่องที่มีไม่เกิน SPARSE_CELL แถวจะแสดงรายตัว
+# - cell_size=0: แสดงทุก affiliation
+EDGE_LEVELS = [
+    {"name": "country", "min_zoom": 0, "cell_size": None},
+    {"name": "region", "min_zoom": 3, "cell_size": 5.0},
+    {"name": "city", "min_zoom": 5, "cell_size": 1.0},
+    {"name": "affiliation", "min_zoom": 7, "cell_size": 0},
+]
+SPARSE_CELL = 3
+
+EDGE_COLUMNS = ["Affiliation", "Country", "count", "latitude", "longitude", "Color"]
+
+# ระดับของ heatmap: ช่อง grid (องศา) ที่เล็กลงตาม zoom
+# ส่งเฉพาะช่องที่มี count จำนวนช่องต่อระดับจึงไม่เกิน (180 / cell_size) * (360 / cell_size)
+# ไม่ว่าจะมี affiliation กี่แถว (ระดับ world มีได้ไม่เกิน 16,200 ช่อง)
+HEATMAP_LEVELS = [
+    {"name": "world", "min_zoom": 0, "cell_size": 2.0},
+    {"name": "region", "min_zoom": 3, "cell_size": 0.5},
+    {"name": "city", "min_zoom": 5, "cell_size": 0.1},
+    {"name": "local", "min_zoom": 8, "cell_size": 0.01},
+]
+
+# ทศนิยมของพิกัดที่ส่งไป browser (5 ตำแหน่ง ~ 1 เมตร)
+COORD_DECIMALS = 5
+
+
+# รวมแถวตาม keys: count รวมกัน, พิกัดเฉลี่ยถ่วงน้ำหนักด้วย count
+def _aggregate(df, keys):
+    weight = df["count"].fillna(0).clip(lower=0)
+    work = pd.DataFrame({
+        "count": df["count"],
+        "weight": weight,
+        "w_lat": df["latitude"] * weight,
+        "w_lon": df["longitude"] * weight,
+        "latitude": df["latitude"],
+        "longitude": df["longitude"],
+        "Country": df["Country"],
+    })
+    grouped = work.groupby([df[k] for k in keys], dropna=False, sort=False, observed=True)
+    sums = grouped[["count", "weight", "w_lat", "w_lon"]].sum()
+    means = grouped[["latitude", "longitude"]].mean()
+    size = grouped.size()
+    has_weight = sums["weight"] > 0
+    out = pd.DataFrame({
+        "Country": grouped["Country"].first().astype(object),
+        "count": sums["count"],
+        "latitude": np.where(has_weight, sums["w_lat"] / sums["weight"].where(has_weight), means["latitude"]),
+        "longitude": np.where(has_weight, sums["w_lon"] / sums["weight"].where(has_weight), means["longitude"]),
+    }).reset_index(drop=True)
+    size = size.to_numpy()
+    out["Affiliation"] = [f"{c} ({n} affiliations)" for c, n in zip(out["Country"].fillna("Unknown"), size)]
+    out["Color"] = palette.country_colors(out["Country"])
+    return out[EDGE_COLUMNS]
+
+
+def aggregate_edges(df, cell_size):
+    df = df[EDGE_COLUMNS]
+    if cell_size == 0:
+        return df.reset_index(drop=True)
+    if cell_size is None:
+        return _aggregate(df, ["Country"])
+    cell = (
+        np.floor(df["latitude"] / cell_size).astype("Int64").astype(str)
+        + ":"
+        + np.floor(df["longitude"] / cell_size).astype("Int64").astype(str)
+    )
+    keyed = df.assign(_cell=cell.to_numpy())
+    size = keyed.groupby(["_cell", "Country"], dropna=False, sort=False, observed=True)["count"].transform("size")
+    sparse = (size <= SPARSE_CELL).to_numpy()
+    dense = _aggregate(keyed[~sparse], ["_cell", "Country"])
+    return pd.concat([df[sparse], dense], ignore_index=True)
+
+
+# ขนาดโดยประมาณของข้อมูลที่ส่งไป browser (JSON records)
+def payload_bytes(df):
+    return len(df.to_json(orient="records").encode("utf-8"))
+
+
+# ข้อมูลสำหรับ pdk.Layer: เก็บเฉพาะคอลัมน์ที่ accessor/tooltip ใช้
+# พิกัดรวมเป็นคอลัมน์ "position" = [lon, lat] ที่ปัดทศนิยมแล้ว และ count เป็น int
+def layer_data(df, columns=()):
+    out = pd.DataFrame(index=df.index)
+    for column in columns:
+        out[column] = df[column]
+    lon = df["longitude"].round(COORD_DECIMALS).to_numpy()
+    lat = df["latitude"].round(COORD_DECIMALS).to_numpy()
+    out["position"] = np.column_stack([lon, lat]).tolist()
+    if "count" in out and out["count"].notna().all():
+        out["count"] = out["count"].astype(np.int64)
+    return out.reset_index(drop=True)
+
+
+# แยกข้อมูลเส้น (เฉพาะ position + Color) กับข้อมูลจุด (ชื่อ, count สำหรับ tooltip)
+# ชื่อ affiliation ถูกส่งครั้งเดียวใน layer ของจุด แทนที่จะส่งซ้ำทั้งสอง layer
+def edge_layer_data(df):
+    edges = layer_data(df, ["Color"])
+    nodes = layer_data(df, ["Affiliation", "count"])
+    nodes = nodes[~nodes[["Affiliation", "count"]].assign(p=nodes["position"].map(tuple)).duplicated()]
+    return edges, nodes.reset_index(drop=True)
+
+
+# สร้าง pyramid ทุกระดับไว้ล่วงหน้า พร้อมขนาด payload ของแต่ละระดับ
+def build_edge_pyramid(df, levels=EDGE_LEVELS):
+    pyramid = []
+    for level in levels:
+        edges, nodes = edge_layer_data(aggregate_edges(df, level["cell_size"]))
+        pyramid.append({
+            "name": level["name"],
+            "min_zoom": level["min_zoom"],
+            "edges": edges,
+            "nodes": nodes,
+            "rows": len(edges),
+            "bytes": payload_bytes(edges) + payload_bytes(nodes),
+        })
+    return pyramid
+
+
+# เลือกระดับที่ละเอียดที่สุดที่ zoom ปัจจุบันถึงแล้ว
+def pick_level(pyramid, zoom):
+    chosen = pyramid[0]
+    for level in pyramid:
+        if zoom >= level["min_zoom"]:
+            chosen = level
+    return chosen
+
+
+# เส้นของหน้าจอปัจจุบัน: แถวในหน้าจอ (inside = ตำแหน่งแถว เช่นจาก SpatialIndex.query_viewport) ใช้ระดับตาม zoom
+# แถวนอกหน้าจอรวมเป็นเส้นต่อประเทศ (ระดับแรก) ส่งเส้นรายตัวเฉพาะที่มองเห็น
+def viewport_level(df, inside, zoom, levels=EDGE_LEVELS):
+    level = pick_level(levels, zoom)
+    mask = np.zeros(len(df), dtype=bool)
+    mask[inside] = True
+    if level["cell_size"] == levels[0]["cell_size"]:
+        mask[:] = True
+    detail = aggregate_edges(df[mask], level["cell_size"])
+    outside = aggregate_edges(df[~mask], levels[0]["cell_size"])
+    combined = detail if outside.empty else pd.concat([detail, outside], ignore_index=True)
+    edges, nodes = edge_layer_data(combined)
+    return {
+        "name": level["name"],
+        "min_zoom": level["min_zoom"],
+        "edges": edges,
+        "nodes": nodes,
+        "rows": len(edges),
+        "inside": len(detail),
+        "outside": len(outside),
+        "bytes": payload_bytes(edges) + payload_bytes(nodes),
+    }
+
+
+# รวมจุดเป็นช่อง grid ขนาด cell_size องศา: weight = ผลรวม count ในช่อง
+# ตำแหน่งของช่องคือจุดเฉลี่ยถ่วงน้ำหนักด้วย count (ช่องที่มีจุดเดียวจึงอยู่ที่เดิม)
+# ช่องที่ไม่มี count (ผลรวมเป็น 0) ไม่ถูกส่ง
+def bin_points(df, cell_size):
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    weight = df["count"].to_numpy(dtype=np.float64, na_value=0)
+    keep = np.isfinite(lat) & np.isfinite(lon) & (weight > 0)
+    lat, lon, weight = lat[keep], lon[keep], weight[keep]
+
+    columns = int(np.ceil(360 / cell_size))
+    rows = int(np.ceil(180 / cell_size))
+    x = np.clip(np.floor((lon + 180) / cell_size).astype(np.int64), 0, columns - 1)
+    y = np.clip(np.floor((lat + 90) / cell_size).astype(np.int64), 0, rows - 1)
+    cells, inverse = np.unique(y * columns + x, return_inverse=True)
+
+    total = np.bincount(inverse, weights=weight, minlength=len(cells))
+    out = pd.DataFrame({
+        "latitude": np.bincount(inverse, weights=lat * weight, minlength=len(cells)) / total,
+        "longitude": np.bincount(inverse, weights=lon * weight, minlength=len(cells)) / total,
+        "weight": total.round().astype(np.int64),
+    })
+    return layer_data(out, ["weight"])
+
+
+# pyramid ของ heatmap ทุกระดับ พร้อมจำนวนช่องและขนาด payload (ใช้ pick_level เลือกระดับ)
+def build_heatmap_pyramid(df, levels=HEATMAP_LEVELS):
+    pyramid = []
+    for level in levels:
+        bins = bin_points(df, level["cell_size"])
+        pyramid.append({
+            "name": level["name"],
+            "min_zoom": level["min_zoom"],
+            "bins": bins,
+            "rows": len(bins),
+            "bytes": payload_bytes(bins),
+        })
+    return pyramid
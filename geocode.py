@@ -0,0 +1,247 @@
+import importlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from affiliations import tokenize
+
+# cache พิกัดของ affiliation ที่ resolve ใหม่ (เก็บใน repo เพราะเป็นผลจากการค้นหาที่ใช้เวลา)
+CACHE_PATH = os.path.join("raw_data", "geocode_cache.csv")
+# gazetteer แบบ offline: ชื่อประเทศ/เมือง -> พิกัดศูนย์กลาง
+GAZETTEER_PATH = os.path.join("raw_data", "gazetteer.csv")
+# resolver ภายนอก (ถ้ามี) กำหนดเป็น "module:function" เช่น GEOCODE_RESOLVER=my_geocoder:lookup
+RESOLVER_ENV = "GEOCODE_RESOLVER"
+
+CACHE_COLUMNS = ["key", "affiliation", "latitude", "longitude", "source"]
+# source ที่ cache เก็บเอง; พิกัดจาก seed (ไฟล์ที่มีพิกัดอยู่แล้ว) อ่านจากไฟล์นั้นทุกครั้ง
+RESOLVED_SOURCES = ["resolver", "gazetteer"]
+
+# พิกัดเดียวกันที่ชื่อตั้งแต่จำนวนนี้ขึ้นไปใช้ร่วมกัน ถือเป็นค่าประมาณ
+# (geocoder เดิมคืนศูนย์กลางประเทศเมื่อหาชื่อไม่เจอ เช่น 39.78,-100.45 ของสหรัฐฯ)
+CENTROID_MIN_NAMES = 10
+# เมืองใน gazetteer ต้องมี affiliation ที่รู้พิกัดอย่างน้อยเท่านี้ (ดู build_city_gazetteer)
+CITY_MIN_NAMES = 3
+
+
+# key ของ cache: ชื่อที่ตัดเครื่องหมายวรรคตอนและตัวพิมพ์ออก
+def name_key(name):
+    return " ".join(tokenize(name)).casefold()
+
+
+def name_keys(names):
+    unique = pd.unique(names.dropna())
+    keys = pd.Series([name_key(n) for n in unique], index=unique, dtype=object)
+    return names.map(keys)
+
+
+# resolver คือ callable ที่รับ DataFrame (affiliation, Country) ของชื่อที่ยังไม่รู้พิกัด
+# แล้วคืน DataFrame (affiliation, latitude, longitude) เฉพาะชื่อที่หาเจอ
+def load_resolver():
+    spec = os.environ.get(RESOLVER_ENV)
+    if not spec:
+        return None
+    module, _, func = spec.partition(":")
+    return getattr(importlib.import_module(module), func)
+
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    gazetteer = pd.read_csv(path, encoding="utf-8")
+    gazetteer["key"] = name_keys(gazetteer["name"])
+    return gazetteer
+
+
+# True สำหรับแถวที่พิกัดถูกใช้ร่วมกันโดยชื่อตั้งแต่ CENTROID_MIN_NAMES ชื่อ
+def shared_points(table, name="key"):
+    point = table["latitude"].round(5).astype(str) + "," + table["longitude"].round(5).astype(str)
+    return (table.groupby(point)[name].transform("nunique") >= CENTROID_MIN_NAMES).to_numpy()
+
+
+# สร้าง gazetteer ระดับประเทศจากพิกัดที่มีอยู่แล้ว (median ต่อประเทศ ทนต่อพิกัดที่ผิดบางแถว)
+def build_country_gazetteer(located):
+    centroids = (
+        located.dropna(subset=["Country", "latitude", "longitude"])
+        .groupby("Country")[["latitude", "longitude"]]
+        .median()
+        .round(6)
+        .reset_index()
+        .rename(columns={"Country": "name"})
+    )
+    centroids.insert(1, "kind", "country")
+    centroids["country"] = centroids["name"]
+    return centroids
+
+
+# สร้าง gazetteer ระดับเมือง: cities คือ DataFrame (name, country) ของชื่อเมือง
+# พิกัดคือ median ของ affiliation ที่มีชื่อเมืองนั้นในชื่อและอยู่ในประเทศเดียวกัน
+# (ไม่นับพิกัดที่เป็นศูนย์กลางประเทศ) เก็บเฉพาะเมืองที่มีอย่างน้อย CITY_MIN_NAMES ชื่อ
+def build_city_gazetteer(located, cities):
+    located = located.dropna(subset=["Affiliation", "Country", "latitude", "longitude"])
+    located = located[~shared_points(located, "Affiliation")]
+    cities = cities.reset_index(drop=True)
+    matched = match_cities(name_keys(located["Affiliation"]), located["Country"], cities)
+    hits = located.assign(city=matched)[matched >= 0]
+    grouped = hits.groupby("city")
+    support = grouped["Affiliation"].nunique()
+    centroids = grouped[["latitude", "longitude"]].median().round(6)[support >= CITY_MIN_NAMES]
+    out = cities.loc[centroids.index, ["name", "country"]].assign(kind="city")
+    out[["latitude", "longitude"]] = centroids.to_numpy()
+    return out[["name", "kind", "latitude", "longitude", "country"]].reset_index(drop=True)
+
+
+# ตำแหน่งของเมือง (แถวใน cities) ที่ปรากฏเป็นคำหรือคำติดกันใน key ของแต่ละชื่อ และอยู่ในประเทศเดียวกัน
+# แตกคำแล้วจับคู่ n-gram กับ dict "เมือง|ประเทศ" ด้วย isin + map (วนตามจำนวนคำของชื่อเมือง ไม่ใช่ตามเมือง)
+# เจอหลายเมืองใช้ชื่อที่ยาวที่สุด เท่ากันใช้เมืองที่อยู่ก่อน; ไม่เจอได้ -1
+def match_cities(keys, countries, cities):
+    result = np.full(len(keys), -1, dtype=np.int64)
+    if len(keys) == 0 or len(cities) == 0:
+        return result
+    city_keys = name_keys(cities["name"].astype(object))
+    lookup = pd.Series(np.arange(len(cities)), index=city_keys + "|" + name_keys(cities["country"].astype(object)))
+    lookup = lookup[lookup.index.notna() & ~lookup.index.duplicated()]
+
+    country_keys = np.asarray(name_keys(pd.Series(np.asarray(countries, dtype=object))), dtype=object)
+
+    # แตกคำด้วย Arrow (string ของ Arrow ต่อกัน/เทียบได้เร็วกว่า object)
+    tokens = pc.split_pattern(pa.array(np.asarray(keys, dtype=object), type=pa.string(), from_pandas=True), " ")
+    row = pc.list_parent_indices(tokens).to_numpy()
+    words = pd.Series(pc.list_flatten(tokens), dtype=pd.ArrowDtype(pa.string()))
+
+    gram = words
+    for n in range(1, int(city_keys.str.count(" ").max()) + 2):
+        if n > 1:
+            gram = gram + " " + words.shift(-(n - 1))
+            same = np.append(row[n - 1:] == row[:len(row) - n + 1], np.zeros(n - 1, dtype=bool))
+        else:
+            same = np.ones(len(row), dtype=bool)
+        # เทียบกับชื่อเมืองก่อน แล้วค่อยต่อประเทศเฉพาะคำที่เป็นชื่อเมือง
+        at = np.flatnonzero(same & gram.isin(city_keys).to_numpy(dtype=bool, na_value=False))
+        found = (gram.iloc[at].astype(object) + "|" + country_keys[row[at]]).map(lookup).to_numpy(dtype=np.float64)
+        hit = ~np.isnan(found)
+        first = pd.DataFrame({"row": row[at][hit], "city": found[hit]}).drop_duplicates("row")
+        result[first["row"].to_numpy()] = first["city"].to_numpy(dtype=np.int64)
+    return result
+
+
+# seed ของ cache: ไฟล์ที่มีคอลัมน์ affiliation/Affiliation + latitude + longitude
+# (raw_data/affiliation_location.csv, raw_data/affiliation_location_manual.csv)
+def read_seed(path):
+    seed = pd.read_csv(path, encoding="utf-8-sig", float_precision="round_trip")
+    name = "affiliation" if "affiliation" in seed else "Affiliation"
+    return pd.DataFrame({
+        "key": name_keys(seed[name]),
+        "affiliation": seed[name],
+        "latitude": seed["latitude"],
+        "longitude": seed["longitude"],
+        "source": "manual",
+    })
+
+
+# แถวของ key ใน found แทนที่แถวเดิมของ key นั้น
+def _replace_keys(table, found):
+    kept = table[~table["key"].isin(found["key"])]
+    return pd.concat([kept, found], ignore_index=True) if not kept.empty else found.reset_index(drop=True)
+
+
+# Cache พิกัดแบบถาวร
+# - seed_paths: ไฟล์ที่มีพิกัดอยู่แล้ว เรียงตามความสำคัญ ชื่อหนึ่งใช้พิกัดจากไฟล์แรกที่มีชื่อนั้น
+#   (ทุกแถวของชื่อนั้นในไฟล์นั้น เหมือน merge ตามชื่อแบบเดิม)
+# - path: เก็บเฉพาะผลที่ resolve ใหม่ ผลจาก resolver มาก่อน seed ส่วนผลจาก gazetteer ใช้เมื่อ seed ไม่มี
+class GeocodeCache:
+    def __init__(self, path=CACHE_PATH, seed_paths=()):
+        self.path = path
+        if os.path.exists(path):
+            resolved = pd.read_csv(path, encoding="utf-8")
+        else:
+            resolved = pd.DataFrame(columns=CACHE_COLUMNS)
+        self.resolved = resolved[resolved["source"].isin(RESOLVED_SOURCES)][CACHE_COLUMNS].reset_index(drop=True)
+        # ชื่อที่ได้พิกัดจาก gazetteer (ค่าประมาณ) ถ้ามี resolver จะถูกส่งให้ resolver ลองใหม่
+        self.approximate = set(self.resolved.loc[self.resolved["source"] == "gazetteer", "key"])
+
+        parts = [
+            self.resolved[self.resolved["source"] == "resolver"],
+            *[read_seed(p) for p in seed_paths if os.path.exists(p)],
+            self.resolved[self.resolved["source"] == "gazetteer"],
+        ]
+        parts = [p.assign(_rank=i) for i, p in enumerate(parts) if not p.empty]
+        table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=[*CACHE_COLUMNS, "_rank"])
+        table = table.dropna(subset=["key", "latitude", "longitude"])
+        table = table[table["_rank"] == table.groupby("affiliation")["_rank"].transform("min")]
+        self.table = table.drop_duplicates(["affiliation", "latitude", "longitude"]).drop(columns="_rank").reset_index(drop=True)
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        self.resolved[CACHE_COLUMNS].to_csv(tmp, index=False, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _add(self, found, source):
+        if found.empty:
+            return
+        found = found.assign(source=source)[CACHE_COLUMNS]
+        self.resolved = _replace_keys(self.resolved, found)
+        self.table = _replace_keys(self.table, found)
+
+    # พิกัดเดียวต่อ key เมื่อหลายชื่อ (ต่างกันแค่ตัวพิมพ์/วรรคตอน) มีพิกัดขัดกัน:
+    # 1) พิกัดที่ไม่ใช่ค่าประมาณ (ไม่ได้มาจาก gazetteer และไม่ใช่พิกัดที่ชื่อจำนวนมากใช้ร่วมกัน)
+    # 2) พิกัดที่มีหลายชื่อที่สุด  3) แถวที่อยู่ก่อน
+    def _preferred(self):
+        table = self.table
+        point = table["latitude"].round(5).astype(str) + "," + table["longitude"].round(5).astype(str)
+        ranked = table.assign(
+            _approx=shared_points(table) | (table["source"] == "gazetteer").to_numpy(),
+            _votes=table.groupby([table["key"], point])["key"].transform("size"),
+            _order=np.arange(len(table)),
+        )
+        ranked = ranked.sort_values(["_approx", "_votes", "_order"], ascending=[True, False, True])
+        return ranked.drop_duplicates("key")[["key", "latitude", "longitude"]]
+
+    # หาพิกัดของทุกแถว: ชื่อที่มีใน cache ตรงทุกตัวอักษร -> key ใน cache -> resolver (ถ้ามี)
+    # -> gazetteer (เมืองในชื่อ แล้วค่อยศูนย์กลางประเทศ); ชื่อใหม่แต่ละชื่อถูก resolve ครั้งเดียวแล้วเก็บลง cache
+    # คืน DataFrame (latitude, longitude) ที่ index เป็นของแถวต้นทาง แถวที่ชื่อมีหลายพิกัดใน seed จะซ้ำตามจำนวนพิกัด
+    def resolve(self, affiliations, countries, gazetteer=None, resolver=None):
+        rows = pd.DataFrame({"affiliation": affiliations, "Country": countries})
+        rows["key"] = name_keys(rows["affiliation"])
+        rows["_row"] = np.arange(len(rows))
+        retry = self.approximate if resolver is not None else set()
+
+        known = self.table[~self.table["key"].isin(retry)][["affiliation", "latitude", "longitude"]]
+        exact = rows[["_row", "affiliation"]].merge(known, on="affiliation")
+        rest = rows[~rows["_row"].isin(exact["_row"])]
+
+        names = rest.dropna(subset=["key"]).drop_duplicates("key")
+        missing = names[~names["key"].isin(self.table["key"]) | names["key"].isin(retry)]
+
+        if resolver is not None and not missing.empty:
+            found = resolver(missing[["affiliation", "Country"]].reset_index(drop=True))
+            found = found.dropna(subset=["latitude", "longitude"])
+            found = found.assign(key=name_keys(found["affiliation"]))
+            self._add(found, "resolver")
+            missing = missing[~missing["key"].isin(found["key"])]
+
+        if gazetteer is not None and not missing.empty:
+            self._add(self._from_gazetteer(missing, gazetteer), "gazetteer")
+
+        keyed = rest[["_row", "key"]].merge(self._preferred(), on="key")
+        located = pd.concat([exact, keyed], ignore_index=True)[["_row", "latitude", "longitude"]]
+        out = rows[["_row"]].merge(located, on="_row", how="left").sort_values("_row", kind="stable")
+        return out[["latitude", "longitude"]].set_index(rows.index[out["_row"].to_numpy()])
+
+    @staticmethod
+    def _from_gazetteer(missing, gazetteer):
+        cities = gazetteer[gazetteer["kind"] == "city"].reset_index(drop=True)
+        countries = gazetteer[gazetteer["kind"] == "country"].drop_duplicates("key").set_index("key")
+        # เมืองที่ปรากฏเป็นคำในชื่อ affiliation
+        # (-1 = ไม่เจอ ชี้ไปที่ NaN ท้าย array)
+        city = match_cities(missing["key"], missing["Country"], cities)
+        lat = np.append(cities["latitude"].to_numpy(dtype=np.float64), np.nan)[city]
+        lon = np.append(cities["longitude"].to_numpy(dtype=np.float64), np.nan)[city]
+        # ศูนย์กลางประเทศ
+        country_keys = name_keys(missing["Country"])
+        fallback = countries.reindex(country_keys)
+        todo = np.isnan(lat)
+        lat[todo] = fallback["latitude"].to_numpy()[todo]
+        lon[todo] = fallback["longitude"].to_numpy()[todo]
+        found = missing.assign(latitude=lat, longitude=lon)
+        return found.dropna(subset=["latitude", "longitude"])
@@ -0,0 +1,259 @@
+import hashlib
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+NODE_ATTRIBUTES = ["name", "latitude", "longitude", "research_count", "importance"]
+
+# กราฟที่เล็กกว่านี้คำนวณใน process เดียว (ค่า overhead ของ process pool ไม่คุ้ม)
+PARALLEL_MIN_NODES = 2000
+# จำนวน node ต่องานที่ส่งให้ worker
+CHUNK_SIZE = 256
+
+
+# hash ของกราฟจาก edge list + node attributes ใช้เป็น key ของ cache
+def graph_hash(universities, references):
+    h = hashlib.sha1()
+    for df in (references[["source_id", "target_id", "weight"]], universities):
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+# สร้างกราฟแล้วใส่ node attributes ทีเดียวทั้งตาราง (แทน set_node_attributes ทีละแถว)
+def build_graph(universities, references):
+    G = nx.from_pandas_edgelist(
+        references,
+        source="source_id",
+        target="target_id",
+        edge_attr="weight"
+    )
+    attributes = universities.drop_duplicates("id").set_index("id")[NODE_ATTRIBUTES]
+    nx.set_node_attributes(G, attributes[attributes.index.isin(G.nodes)].to_dict("index"))
+    return G
+
+
+# ---------- งานที่รันใน worker process (กราฟส่งไปครั้งเดียวตอนเริ่ม worker) ----------
+_worker_graph = None
+
+
+def _init_worker(G):
+    global _worker_graph
+    _worker_graph = G
+
+
+# betweenness แบบยังไม่ normalize จาก source บางส่วน (ผลรวมของทุก chunk = ค่าจากทุก source)
+def _betweenness_chunk(sources):
+    return nx.betweenness_centrality_subset(
+        _worker_graph, sources=sources, targets=list(_worker_graph), normalized=False
+    )
+
+
+def _closeness_chunk(nodes):
+    return {u: nx.closeness_centrality(_worker_graph, u=u) for u in nodes}
+
+
+# ผลรวมระยะทาง (จำนวน hop) และจำนวน source ที่ไปถึงแต่ละ node จาก source บางส่วน
+def _distance_chunk(sources):
+    distance, hits = {}, {}
+    for source in sources:
+        for node, d in nx.single_source_shortest_path_length(_worker_graph, source).items():
+            if node != source:
+                distance[node] = distance.get(node, 0) + d
+                hits[node] = hits.get(node, 0) + 1
+    return distance, hits
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# รันงานทีละ chunk (ขนานด้วย process pool ถ้ามี executor) พร้อมรายงานความคืบหน้า
+def _run_chunks(func, chunks, executor, progress, label, merge):
+    results = executor.map(func, chunks) if executor else map(func, chunks)
+    for i, result in enumerate(results, 1):
+        merge(result)
+        if progress:
+            progress(i / len(chunks), f"{label} {i}/{len(chunks)}")
+
+
+# Betweenness centrality แบบสุ่ม k source (k=None = ทุก node, ได้ค่าเท่ากับ nx.betweenness_centrality)
+def betweenness_centrality(G, k=None, seed=0, executor=None, progress=None):
+    n = len(G)
+    nodes = list(G)
+    sources = nodes if k is None or k >= n else random.Random(seed).sample(nodes, k)
+    total = dict.fromkeys(nodes, 0.0)
+
+    def merge(partial):
+        for node, value in partial.items():
+            total[node] += value
+
+    if executor is None:
+        _init_worker(G)
+    _run_chunks(_betweenness_chunk, _chunks(sources), executor, progress, "Betweenness", merge)
+    if n <= 2 or not sources:
+        return total
+    # subset หารด้วย 2 ให้แล้วสำหรับกราฟ undirected -> คูณกลับ แล้ว normalize ด้วยจำนวนคู่ (s, t)
+    # เหมือน networkx: node ที่เป็น source เองมีคู่ที่นับได้น้อยกว่า 1 source
+    correction = 1.0 if G.is_directed() else 2.0
+    k = len(sources)
+    if k == n:
+        scale = {node: correction / ((n - 1) * (n - 2)) for node in nodes}
+    else:
+        sampled = set(sources)
+        scale_nonsource = correction / (k * (n - 2))
+        scale_source = correction / ((k - 1) * (n - 2)) if k > 1 else 0.0
+        scale = {node: scale_source if node in sampled else scale_nonsource for node in nodes}
+    return {node: value * scale[node] for node, value in total.items()}
+
+
+# Closeness centrality แบบสุ่ม k source (k=None = ทุก node, ได้ค่าเท่ากับ nx.closeness_centrality)
+# ระยะเฉลี่ยของ node ประมาณจากระยะไปยัง source ที่สุ่ม (กราฟ undirected: d(s, v) = d(v, s))
+# แล้วคูณด้วยสัดส่วนขนาด component แบบเดียวกับ networkx (wf_improved)
+# node ที่ไม่มี source อื่นใน component เดียวกัน (component เล็ก) คำนวณค่าจริงทีละ node
+def closeness_centrality(G, k=None, seed=0, executor=None, progress=None):
+    n = len(G)
+    nodes = list(G)
+    if executor is None:
+        _init_worker(G)
+    if k is None or k >= n or n <= 1:
+        total = {}
+        _run_chunks(_closeness_chunk, _chunks(nodes), executor, progress, "Closeness", total.update)
+        return total
+
+    distance = dict.fromkeys(nodes, 0)
+    hits = dict.fromkeys(nodes, 0)
+
+    def merge(partial):
+        for node, value in partial[0].items():
+            distance[node] += value
+        for node, value in partial[1].items():
+            hits[node] += value
+
+    sources = random.Random(seed).sample(nodes, k)
+    _run_chunks(_distance_chunk, _chunks(sources), executor, progress, "Closeness", merge)
+    size = {node: len(component) for component in nx.connected_components(G) for node in component}
+    result = {}
+    for node in nodes:
+        if hits[node]:
+            result[node] = (size[node] - 1) / (n - 1) * hits[node] / distance[node]
+        elif size[node] > 1:
+            result[node] = nx.closeness_centrality(G, u=node)
+        else:
+            result[node] = 0.0
+    return result
+
+
+# Network Analysis: betweenness / closeness ใช้ sampling (k source เดียวกัน) และงาน O(k·E) กระจายไปหลาย process สำหรับกราฟใหญ่
+def calculate_centralities(G, k=None, seed=0, workers=None, progress=None):
+    executor = None
+    if len(G) >= PARALLEL_MIN_NODES:
+        executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(G,))
+    try:
+        if progress:
+            progress(0.0, "Degree / PageRank")
+        result = {
+            "Degree Centrality": nx.degree_centrality(G),
+            "PageRank": nx.pagerank(G),
+        }
+        result["Betweenness Centrality"] = betweenness_centrality(
+            G, k=k, seed=seed, executor=executor,
+            progress=progress and (lambda f, msg: progress(0.1 + 0.6 * f, msg)),
+        )
+        result["Closeness Centrality"] = closeness_centrality(
+            G, k=k, seed=seed, executor=executor,
+            progress=progress and (lambda f, msg: progress(0.7 + 0.3 * f, msg)),
+        )
+    finally:
+        if executor:
+            executor.shutdown()
+    return {key: result[key] for key in ["Degree Centrality", "Betweenness Centrality", "Closeness Centrality", "PageRank"]}
+
+
+# ตารางของ centrality ทุกตัวต่อ node พร้อมชื่อ
+def centrality_table(G, centralities):
+    table = pd.DataFrame(centralities)
+    table.index.name = "id"
+    names = pd.Series(nx.get_node_attributes(G, "name"), dtype=object)
+    table.insert(0, "name", names.reindex(table.index))
+    return table.reset_index()
+
+
+# ---------- geometry ของเส้นเชื่อม (ใช้กับแผนที่ folium และ globe ของ Plotly) ----------
+# จำนวนกลุ่มของ weight สูงสุด (แต่ละกลุ่มเป็น 1 trace / 1 polyline)
+MAX_WEIGHT_BUCKETS = 8
+
+
+# universities ที่มีพิกัด (แผนที่ทุกแบบใช้เฉพาะแถวเหล่านี้; ตาราง analysis ยังมีครบทุกแถว)
+def located(universities):
+    keep = np.isfinite(universities["latitude"].to_numpy(dtype=np.float64)) & np.isfinite(
+        universities["longitude"].to_numpy(dtype=np.float64)
+    )
+    return universities[keep]
+
+
+# พิกัดต้นทาง/ปลายทางของทุก edge โดย join กับ universities ที่ index ด้วย id ครั้งเดียว
+# edge ที่ไม่มีพิกัดของปลายด้านใดด้านหนึ่งจะถูกตัดออก
+def edge_coordinates(universities, references):
+    coords = universities.drop_duplicates("id").set_index("id")[["latitude", "longitude"]]
+    source = coords.reindex(references["source_id"]).to_numpy()
+    target = coords.reindex(references["target_id"]).to_numpy()
+    edges = pd.DataFrame({
+        "source_lat": source[:, 0],
+        "source_lon": source[:, 1],
+        "target_lat": target[:, 0],
+        "target_lon": target[:, 1],
+        "weight": references["weight"].to_numpy(),
+    })
+    return edges.dropna().reset_index(drop=True)
+
+
+# กลุ่มของ weight: ถ้ามีค่าไม่เกิน max_buckets ค่าใช้ค่านั้นเลย ไม่งั้นแบ่งตาม quantile แล้วใช้ค่าเฉลี่ยของกลุ่ม
+def weight_buckets(weights, max_buckets=MAX_WEIGHT_BUCKETS):
+    if weights.nunique() <= max_buckets:
+        return weights
+    bins = pd.qcut(weights, max_buckets, duplicates="drop")
+    return weights.groupby(bins, observed=True).transform("mean")
+
+
+# เส้นทั้งหมดในแต่ละกลุ่ม weight รวมเป็น lat/lon ชุดเดียว คั่นแต่ละเส้นด้วย NaN (None ใน JSON)
+def edge_lines(edges, max_buckets=MAX_WEIGHT_BUCKETS):
+    lines = []
+    buckets = weight_buckets(edges["weight"], max_buckets)
+    for weight, group in edges.groupby(buckets, sort=True):
+        gap = np.full(len(group), np.nan)
+        lines.append({
+            "weight": weight,
+            "count": len(group),
+            "lat": np.column_stack([group["source_lat"], group["target_lat"], gap]).ravel(),
+            "lon": np.column_stack([group["source_lon"], group["target_lon"], gap]).ravel(),
+            "segments": np.stack([
+                group[["source_lat", "source_lon"]].to_numpy(),
+                group[["target_lat", "target_lon"]].to_numpy(),
+            ], axis=1).tolist(),
+        })
+    return lines
+
+
+# universities เป็น GeoJSON FeatureCollection (ใส่ใน layer เดียวแทน marker ทีละจุด)
+# แถวที่ไม่มีพิกัดไม่ถูกใส่ (GeoJSON ไม่มีค่า NaN)
+def university_features(universities):
+    universities = located(universities)
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {"name": name, "research_count": count, "radius": importance * 5},
+        }
+        for lon, lat, name, count, importance in zip(
+            universities["longitude"].tolist(),
+            universities["latitude"].tolist(),
+            universities["name"].tolist(),
+            universities["research_count"].tolist(),
+            universities["importance"].tolist(),
+        )
+    ]
+    return {"type": "FeatureCollection", "features": features}
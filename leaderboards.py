@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+HOME_COUNTRY = "Thailand"
+
+# มหาวิทยาลัยระดับโลกที่แสดงในส่วน "World's Top 5 Universities"
+TOP_UNIVERSITIES = [
+    "University of Oxford",
+    "Stanford University",
+    "Massachusetts Institute of Technology",
+    "Harvard University",
+    "University of Cambridge",
+]
+
+
+# อันดับที่เรียงไว้แล้ว (count มากไปน้อย, ค่าเท่ากันคงลำดับเดิม เหมือน nlargest(keep="first"))
+# top-k คือการตัด k แถวแรก; แถวที่ count เป็น NaN ไม่ถูกจัดอันดับ
+# order: คอลัมน์ตัวเลขที่ใช้ตัดสินค่าเท่ากัน (None = ลำดับแถวของตารางที่ให้มา, key ใหม่ต่อท้าย)
+# เก็บลำดับเป็น array ของตำแหน่งแถว; table สร้างจาก array เมื่อถูกอ่านหลัง update
+class Ranking:
+    def __init__(self, table, key, value="count", order=None):
+        self.key = key
+        self.value = value
+        self.order = order
+        self._rows = table.dropna(subset=[value]).reset_index(drop=True)
+        self._values = self._rows[value].to_numpy().copy()
+        self._active = np.ones(len(self._rows), dtype=bool)
+        self._ties = np.arange(len(self._rows)) if order is None else self._rows[order].to_numpy()
+        self._ranked = np.lexsort((self._ties, -self._values))
+        self._sorted = -self._values[self._ranked]
+        self._sorted_ties = self._ties[self._ranked]
+        self._next = len(self._rows)
+        self._positions = None
+        self._table = None
+
+    def __len__(self):
+        return len(self._ranked)
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = self._materialize(self._ranked)
+        return self._table
+
+    def top(self, k=1):
+        return self.table.iloc[:k] if self._table is not None else self._materialize(self._ranked[:k])
+
+    def _materialize(self, ranked):
+        table = self._rows.iloc[ranked].reset_index(drop=True)
+        table[self.value] = self._values[ranked]
+        return table
+
+    # ตำแหน่งแถวของแต่ละ key จาก dict ที่สร้างครั้งแรกที่ถูกเรียก
+    def _position(self, key):
+        if self._positions is None:
+            self._positions = {k: i for i, k in enumerate(self._rows[self.key])}
+        return self._positions.get(key)
+
+    # count ของ key (None ถ้าไม่มีหรือไม่ถูกจัดอันดับ)
+    def get(self, key):
+        position = self._position(key)
+        if position is None or not self._active[position]:
+            return None
+        return self._values[position]
+
+    # ตำแหน่งในอันดับของ (value, tie) ด้วย binary search: หา count ก่อนแล้วหา tie ในกลุ่มค่าเท่ากัน
+    def _rank_of(self, value, tie):
+        low = np.searchsorted(self._sorted, -value, side="left")
+        high = np.searchsorted(self._sorted, -value, side="right")
+        return low + np.searchsorted(self._sorted_ties[low:high], tie)
+
+    # เปลี่ยนค่าของ key แล้วย้ายไปตำแหน่งใหม่ (ไม่ sort ใหม่ทั้งหมด) ได้ลำดับเดียวกับการสร้าง Ranking ใหม่
+    # ค่าถูก cast เป็น dtype ของคอลัมน์; ถ้ายังไม่มี key และให้ row มา จะเพิ่มเป็นแถวใหม่
+    # ค่า NaN คือเอาออกจากอันดับ
+    def update(self, key, value, row=None):
+        position = self._position(key)
+        if position is None and (row is None or pd.isna(value)):
+            return
+        self._table = None
+        if position is not None and self._active[position]:
+            at = self._rank_of(self._values[position], self._ties[position])
+            self._ranked = np.delete(self._ranked, at)
+            self._sorted = np.delete(self._sorted, at)
+            self._sorted_ties = np.delete(self._sorted_ties, at)
+            self._active[position] = False
+        if pd.isna(value):
+            return
+        value = self._values.dtype.type(value)
+        if position is None:
+            position = self._append({**row, self.key: key, self.value: value})
+        self._values[position] = value
+        self._active[position] = True
+        tie = self._ties[position]
+        at = self._rank_of(value, tie)
+        self._ranked = np.insert(self._ranked, at, position)
+        self._sorted = np.insert(self._sorted, at, -value)
+        self._sorted_ties = np.insert(self._sorted_ties, at, tie)
+
+    # เพิ่มแถวใหม่ท้าย _rows ให้ dtype ตรงกับตาราง (ค่า category ที่ยังไม่มีจะถูกเพิ่มเข้า categories)
+    def _append(self, row):
+        row = pd.DataFrame([row], columns=self._rows.columns)
+        for column, dtype in self._rows.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                new = row[column].dropna()
+                new = new[~new.isin(dtype.categories)].unique()
+                if len(new):
+                    self._rows[column] = self._rows[column].cat.add_categories(new)
+                    dtype = self._rows[column].dtype
+            row[column] = row[column].astype(dtype)
+        position = len(self._rows)
+        self._rows = pd.concat([self._rows, row], ignore_index=True)
+        self._values = np.append(self._values, row[self.value].to_numpy())
+        self._active = np.append(self._active, False)
+        if self.order is None:
+            tie, self._next = self._next, self._next + 1
+        else:
+            tie = row[self.order].iloc[0]
+        self._ties = np.append(self._ties, tie)
+        self._positions[row[self.key].iloc[0]] = position
+        return position
+
+
+# อันดับทั้งหมดของแท็บ Collab_Analysis สำหรับข้อมูลหนึ่งชุด (หลังกรอง internal collaboration แล้ว)
+# - countries: ผลรวม count ต่อประเทศ
+# - thai / overseas: affiliation ในประเทศ / ต่างประเทศ (key คือ row ของข้อมูลต้นทาง)
+# - top_universities: แถวของ TOP_UNIVERSITIES เรียงตาม count
+class LeaderboardStore:
+    def __init__(self, data, home_country=HOME_COUNTRY, universities=TOP_UNIVERSITIES):
+        self.home_country = home_country
+        self.data = data[["Affiliation", "Country", "count"]].reset_index(drop=True)
+        self.data["row"] = self.data.index
+
+        country_counts = self.data.groupby("Country", observed=True)["count"].sum().astype(int).reset_index()
+        self.countries = Ranking(country_counts, "Country")
+        home = (self.data["Country"] == home_country).to_numpy()
+        self.thai = Ranking(self.data[home], "row", order="row")
+        self.overseas = Ranking(self.data[~home], "row", order="row")
+
+        selected = data["Affiliation"].isin(universities).to_numpy()
+        self._universities = data[selected].assign(row=np.flatnonzero(selected))
+        self.top_universities = self._sorted_universities()
+
+        self.total_count = self.data["count"].fillna(0).sum()
+        self.total_countries = self.data["Country"].dropna().drop_duplicates().count()
+        self.total_affiliations = self.data["Affiliation"].dropna().drop_duplicates().count()
+
+    def _sorted_universities(self):
+        return self._universities.sort_values(by="count", ascending=False, kind="stable").drop(columns="row")
+
+    def affiliations(self, group):
+        return self.thai if group == "Thai" else self.overseas
+
+    # อัปเดต count ของบางแถว (changes: Series ที่ index เป็นตำแหน่งแถว, ค่าเป็น count ใหม่)
+    # ปรับเฉพาะอันดับที่เกี่ยวข้อง: affiliation ของแถวนั้น และผลรวมของประเทศนั้น
+    def update_counts(self, changes):
+        for row, new_count in changes.items():
+            new_count = self.data["count"].dtype.type(new_count)
+            old_count = self.data.at[row, "count"]
+            country = self.data.at[row, "Country"]
+            self.data.at[row, "count"] = new_count
+            delta = (0 if pd.isna(new_count) else new_count) - (0 if pd.isna(old_count) else old_count)
+            self.total_count += delta
+
+            ranking = self.thai if country == self.home_country else self.overseas
+            ranking.update(row, new_count, row=self.data.loc[row].to_dict())
+            if pd.notna(country):
+                current = self.countries.get(country) or 0
+                self.countries.update(country, int(current + delta), row={"Country": country})
+
+            hit = (self._universities["row"] == row).to_numpy()
+            if hit.any():
+                self._universities.loc[hit, "count"] = new_count
+                self.top_universities = self._sorted_universities()
@@ -1,12 +1,39 @@
-import random
-import pydeck as pdk
+import copy
+import functools
+import json
+import threading
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-import altair as alt
-from streamlit_extras.colored_header import colored_header
-from streamlit_extras.metric_cards import style_metric_cards
-from streamlit_extras.card import card
+import startup
+import data_cache
+import palette
+import citation
+import regions
+import deck_data
+import affiliations
+import profiling
+import leaderboards
+import search_index
+import prerender
+
+# library สำหรับกราฟ import ตอนใช้งานครั้งแรก (ถ้าทุกกราฟมาจาก artifact ของ prerender ก็ไม่ต้อง import เลย)
+pdk = startup.lazy_import("pydeck")
+px = startup.lazy_import("plotly.express")
+alt = startup.lazy_import("altair")
+_colored_header = startup.lazy_import("streamlit_extras.colored_header")
+_metric_cards = startup.lazy_import("streamlit_extras.metric_cards")
+
+def colored_header(**kwargs):
+    return _colored_header.colored_header(**kwargs)
+
+def style_metric_cards():
+    return _metric_cards.style_metric_cards()
+
+startup.checkpoint("imports")
+
+# ข้อมูลที่โหลดเก็บไว้ชุดเดียวใน st.cache_resource แชร์กันทุก session
+# copy-on-write ทำให้ view ของแต่ละ session ไม่ copy ข้อมูลจนกว่าจะมีการแก้ และแก้แล้วไม่กระทบของที่แชร์
+pd.set_option("mode.copy_on_write", True)
 
 # Main Streamlit
 st.set_page_config(page_title="CU Research", layout="wide")
@@ -31,43 +58,201 @@ st.markdown(
 )
 st.title("Chulalongkorn University Research Analysis")
 
-# ฟังก์ชันโหลดข้อมูล CSV
-@st.cache_data
+# profiling ต่อ section (เปิดด้วย ?profile=1 หรือ DASHBOARD_PROFILE=1; วัด memory และเขียน log เฉพาะ DASHBOARD_PROFILE=1)
+profiler = profiling.Profiler(profiling.is_enabled(st.query_params))
+
+# ช่องเก็บ frame ล่าสุดต่อ key (เช่น path + encoding) ใช้ร่วมกันทุก session
+@st.cache_resource
+def _latest_slots():
+    return {}, threading.Lock()
+
+# เก็บเฉพาะ version ล่าสุดของแต่ละ key: version ใหม่แทนที่ของเดิม ทำให้ frame (memory-map) ของ version เก่าถูกปล่อย
+# lock ต่อ key: โหลดหลายไฟล์พร้อมกันได้ แต่ key เดียวกันโหลดครั้งเดียว
+def _latest(key, version, load):
+    slots, lock = _latest_slots()
+    with lock:
+        slot = slots.setdefault(key, {"lock": threading.Lock(), "version": None, "value": None})
+    with slot["lock"]:
+        if slot["version"] != version:
+            slot["value"] = None
+            slot["value"] = load()
+            slot["version"] = version
+        return slot["value"]
+
+# ฟังก์ชันโหลดข้อมูล CSV (ผ่าน cache แบบ Arrow ใน data_cache.py)
+# version คือ hash ของ CSV ต้นทาง ใช้เป็น key ให้โหลดใหม่เมื่อไฟล์เปลี่ยน
+# ใช้ cache แบบ resource (ไม่ pickle/copy ต่อผู้เรียกเหมือน cache_data) แล้วคืน session_view ให้แต่ละ session
+def _load_columnar(path, encoding, version):
+    return _latest(("columnar", path, encoding), version, lambda: data_cache.load_frame(path, encoding, shared=True))
+
 def load_data_latin(path):
-    return pd.read_csv(path, encoding="latin1")
+    return data_cache.session_view(_load_columnar(path, "latin1", data_cache.dataset_version(path, "latin1")))
 
-@st.cache_data
 def load_data_utf8(path):
-    return pd.read_csv(path, encoding="utf-8")
+    return data_cache.session_view(_load_columnar(path, "utf-8-sig", data_cache.dataset_version(path, "utf-8-sig")))
+
+# Spatial index ของพิกัด affiliation สร้างครั้งเดียวต่อ version ของ dataset
+@st.cache_resource
+def _collab_index(path, version):
+    df = data_cache.load_frame(path, "utf-8-sig")
+    return regions.SpatialIndex(df["latitude"], df["longitude"])
+
+# Index ชื่อ affiliation (token -> ids, หน่วยย่อย -> สถาบันแม่) สร้างครั้งเดียวต่อ version ของ dataset
+@st.cache_resource
+def _affiliation_index(path, version):
+    df = data_cache.load_frame(path, "utf-8-sig")
+    return affiliations.AffiliationIndex(df["Affiliation"])
+
+# โหลดข้อมูล collab พร้อมคอลัมน์ Color และ id ของ affiliation (คำนวณครั้งเดียวต่อ version ของ dataset)
+def _load_collab(path, version):
+    def load():
+        df = data_cache.load_frame(path, "utf-8-sig", shared=True)
+        df["Color"] = palette.country_colors(df["Country"])
+        df["Affiliation_id"], df["Parent_id"] = _affiliation_index(path, version).canonical_columns(
+            affiliations.HOME_INSTITUTION, exclude=affiliations.HOME_EXCLUDE
+        )
+        return df
+    return _latest(("collab", path), version, load)
+
+# ตำแหน่งแถวของแต่ละ region
+@st.cache_resource
+def _region_rows(path, version):
+    return regions.region_rows(_load_collab(path, version), _collab_index(path, version))
+
+def load_collab_data(path):
+    version = data_cache.dataset_version(path, "utf-8-sig")
+    return data_cache.session_view(_load_collab(path, version)), _region_rows(path, version), version
+
+# ตารางที่ derive จาก Cited.csv คำนวณครั้งเดียวต่อ version ของ dataset
+@st.cache_resource
+def _citation_tables(path, version):
+    return citation.derive_citation_tables(load_data_latin(path))
+
+def load_citation_tables(path):
+    return data_cache.session_view(_citation_tables(path, data_cache.dataset_version(path, "latin1")))
+
+# Prefix sum รายเดือนต่อ subject สำหรับช่วงวันที่ที่เลือก สร้างครั้งเดียวต่อ version ของ dataset
+@st.cache_resource
+def _citation_windows(path, version):
+    return citation.MonthlyIndex(_citation_tables(path, version)["cited"])
+
+def load_citation_windows(path):
+    return _citation_windows(path, data_cache.dataset_version(path, "latin1"))
+
+# Plotly animation สร้างจากข้อมูลรายเดือน (หนึ่งจุดต่อ subject ต่อเดือน) แล้ว cache เป็น dict
+# dict นี้แชร์กันทุก session ห้ามแก้ตรง ๆ (ดู citation_animation)
+@st.cache_resource
+def _citation_animation_figure(path, version):
+    frames = citation.animation_frames(_citation_tables(path, version)["cited"])
+    fig = px.scatter(
+        frames,
+        x="ID_Cumsum",
+        y="Cited_Cumsum",
+        color="Subject_area_abbrev",
+        size=None,
+        animation_frame="Month-Year",
+        animation_group="Subject_area_abbrev",
+        hover_name="Subject_area_name",
+        title="Cumulative Citations vs IDs by Subject Area",
+        labels={
+            "ID_Cumsum": "Cumulative ID Count",
+            "Cited_Cumsum": "Cumulative Citation Count",
+        },
+        category_orders={"Subject_area_abbrev": sorted(frames["Subject_area_abbrev"].unique())},
+        color_discrete_sequence=px.colors.qualitative.Dark24,
+        range_x=[0, frames["ID_Cumsum"].max() + 10],
+        range_y=[0, frames["Cited_Cumsum"].max() + 50],
+        height=600
+    )
+    return fig.to_dict()
+
+def load_citation_animation_figure(path):
+    return _citation_animation_figure(path, data_cache.dataset_version(path, "latin1"))
+
+# Pyramid ของเส้นเชื่อมหลายระดับ (LOD) คำนวณครั้งเดียวต่อ dataset + ค่าตัวกรอง
+# _data ไม่ถูก hash (ใช้ version และค่าตัวกรองเป็น key แทน); ผลลัพธ์ใช้อ่านอย่างเดียว จึงแชร์ข้าม session ได้
+@st.cache_resource(max_entries=64)
+def edge_pyramid(version, show_overseas, min_count, max_count, _data):
+    return deck_data.build_edge_pyramid(_data)
+
+# Spatial index ของแถวที่ผ่านตัวกรอง (ตำแหน่งแถวตรงกับ _data) ใช้หาแถวที่อยู่ในหน้าจอ
+@st.cache_resource(max_entries=64)
+def edge_index(version, show_overseas, min_count, max_count, _data):
+    return regions.SpatialIndex(_data["latitude"], _data["longitude"])
+
+# เส้นของหน้าจอ (center + zoom): รายตัวเฉพาะในหน้าจอ นอกหน้าจอรวมต่อประเทศ
+@st.cache_resource(max_entries=64)
+def viewport_edges(version, show_overseas, min_count, max_count, latitude, longitude, zoom, _data):
+    inside = edge_index(version, show_overseas, min_count, max_count, _data).query_viewport(latitude, longitude, zoom)
+    return deck_data.viewport_level(_data, inside, zoom)
+
+# ช่อง grid ของ HeatmapLayer ทุกระดับ (count รวมต่อช่อง) คำนวณครั้งเดียวต่อ dataset + ค่าตัวกรอง
+@st.cache_resource(max_entries=64)
+def heatmap_pyramid(version, show_overseas, min_count, max_count, _data):
+    return deck_data.build_heatmap_pyramid(_data)
+
+# อันดับ (ประเทศ, affiliation ไทย/ต่างประเทศ, top 5 universities) เรียงไว้ครั้งเดียวต่อ dataset + ค่า exclude_cu
+# ใช้ร่วมกันทุก session (cache_resource) และ _data ไม่ถูก hash
+@st.cache_resource
+def leaderboard_store(version, exclude_cu, _data):
+    return leaderboards.LeaderboardStore(_data)
+
+# Index ค้นหาประเทศ / affiliation (prefix + trigram) สร้างครั้งเดียวต่อ dataset + ค่า exclude_cu
+@st.cache_resource
+def search_indexes(version, exclude_cu, _leaderboard):
+    return {
+        "countries": search_index.SearchIndex(_leaderboard.countries.table[["Country", "count"]], "Country"),
+        "affiliations": search_index.SearchIndex(_leaderboard.data[["Affiliation", "Country", "count"]], "Affiliation"),
+    }
+
+# artifact ที่ prerender ไว้ (python prerender.py) ของ dataset + โค้ดชุดปัจจุบัน
+@st.cache_resource
+def artifact_store(collab_version, cited_version, mode):
+    return prerender.ArtifactStore(prerender.artifact_version([collab_version, cited_version]), mode=mode)
+
+# Deck ที่ serialize เป็น JSON แบบไม่มีช่องว่าง (pydeck ใช้ indent=2 ซึ่งทำให้ payload ใหญ่ขึ้นหลายเท่า)
+# สร้าง class ตอนใช้ครั้งแรก เพื่อไม่ต้อง import pydeck ตอนเริ่ม script
+@functools.cache
+def _compact_deck_class():
+    from pydeck.bindings.json_tools import default_serialize
+
+    class CompactDeck(pdk.Deck):
+        def to_json(self):
+            return json.dumps(self, sort_keys=True, default=default_serialize, separators=(",", ":"))
+
+    return CompactDeck
+
+def CompactDeck(**kwargs):
+    return _compact_deck_class()(**kwargs)
 
 # ฟังก์ชันสร้าง ViewState
 def update_view_state(lat, lon, zoom, pitch):
     return pdk.ViewState(latitude=lat, longitude=lon, zoom=zoom, pitch=pitch)
 
 # ฟังก์ชันสร้าง Layer สำหรับเส้นเชื่อม (Edges)
+# data มีแค่ position + Color (tooltip อยู่ที่ layer ของจุดแทน ไม่ต้องส่งชื่อซ้ำ)
 def create_edge_layer(data, source_lon, source_lat, edge_width):
   
     return pdk.Layer(
         "ArcLayer",
         data=data,
         get_source_position=[source_lon, source_lat],
-        get_target_position=["longitude", "latitude"],
+        get_target_position="position",
         get_width=edge_width,
-        auto_highlight=True,
-        pickable=True,
         get_source_color="Color",
         get_target_color="Color"
     )
 
-# ฟังก์ชันสร้าง Layer สำหรับจุด (Nodes)
+# ฟังก์ชันสร้าง Layer สำหรับจุด (Nodes) จากข้อมูลที่ตัดคอลัมน์และ drop ซ้ำไว้แล้ว
 def create_node_layer(data, node_size, node_color):
     return pdk.Layer(
         "ScatterplotLayer",
-        data=data[["Affiliation", "latitude", "longitude", "count"]].drop_duplicates(),
-        get_position=["longitude", "latitude"],
+        data=data,
+        get_position="position",
         get_radius=node_size,
         get_color=node_color,
         pickable=True,
+        auto_highlight=True,
     )
 
 # ฟังก์ชันปรับสี Node ตามธีมแผนที่
@@ -79,15 +264,43 @@ def get_node_color(map_style):
         "streets": [0, 204, 102, 200],  # เขียวสดใส
     }.get(map_style, [0, 102, 204, 200])  # ค่าเริ่มต้น
 
-# ฟังก์ชันแสดงแผนที่ด้วย Pydeck
-def display_map(data, view_state, edge_layer, node_layer, map_style):
-    st.pydeck_chart(
-        pdk.Deck(
-            layers=[edge_layer, node_layer],
-            initial_view_state=view_state,
-            map_style=f"mapbox://styles/mapbox/{map_style}-v9",
-            tooltip={"html": "<b>Target:</b> {Affiliation} <br><b>Count:</b> {count}", "style": {"color": "white"}},
-        )
+# ฟังก์ชันสร้างแผนที่ด้วย Pydeck จากเส้นของหน้าจอ (viewport_edges)
+def network_deck(level, view_state, map_style, edge_width, node_size, node_color):
+    edge_layer = create_edge_layer(level["edges"], default_lon, default_lat, edge_width)
+    node_layer = create_node_layer(level["nodes"], node_size, node_color)
+    return CompactDeck(
+        layers=[edge_layer, node_layer],
+        initial_view_state=view_state,
+        map_style=f"mapbox://styles/mapbox/{map_style}-v9",
+        tooltip={"html": "<b>Target:</b> {Affiliation} <br><b>Count:</b> {count}", "style": {"color": "white"}},
+    )
+
+# คำอธิบายระดับ LOD ใต้แผนที่เครือข่าย: เส้นที่ส่งจริงของหน้าจอ + ขนาดของแต่ละระดับถ้าส่งทั้งโลก
+def lod_caption(level, pyramid):
+    return (
+        f"Level of detail in view: **{level['name']}** ({level['inside']:,} arcs) + "
+        f"{level['outside']:,} country arcs outside the view, {level['bytes'] / 1024:,.0f} KB · whole world: "
+        + " · ".join(f"{l['name']} (zoom ≥ {l['min_zoom']}): {l['rows']:,} arcs, {l['bytes'] / 1024:,.0f} KB" for l in pyramid)
+    )
+
+# heatmap ของระดับที่ตรงกับ zoom: ส่งเฉพาะช่องที่มี count (position + weight)
+def heatmap_deck(pyramid, view_state, map_style):
+    level = deck_data.pick_level(pyramid, view_state.zoom)
+    heatmap_layer = pdk.Layer(
+        "HeatmapLayer",
+        level["bins"],
+        get_position="position",
+        get_weight="weight",
+        opacity=0.5,
+        pickable=True
+    )
+    return CompactDeck(layers=[heatmap_layer], initial_view_state=view_state, map_style=f"mapbox://styles/mapbox/{map_style}-v9")
+
+def heatmap_caption(pyramid, zoom):
+    level = deck_data.pick_level(pyramid, zoom)
+    return (
+        f"Heatmap bins: **{level['name']}** · "
+        + " · ".join(f"{l['name']} (zoom ≥ {l['min_zoom']}): {l['rows']:,} bins, {l['bytes'] / 1024:,.0f} KB" for l in pyramid)
     )
 
 # สร้างฟังก์ชันสำหรับสร้างกราฟ Altair
@@ -118,139 +331,9 @@ def create_chart(column, data, color="steelblue"):
         .configure_title(fontSize=18, font="Arial", anchor="start")
     )
 
-
-
-# ค่าเริ่มต้น
-path1 = "colab_count.csv"
-path2 = "Cited.csv"
-edges_with_coords = load_data_utf8(path1)
-cited = load_data_latin(path2)
-
-# Assign color to countries
-def gen_random_color(text):
-    # randomly generate bright colors using country name as seed
-    random.seed(text)
-    return [random.randint(128, 255) for _ in range(3)]
-
-edges_with_coords['Color'] = edges_with_coords.apply(lambda row:  gen_random_color(row['Country']), axis=1)
-
-default_lat = 13.74310735  # Chulalongkorn University
-default_lon = 100.5328837
-default_zoom = 7
-default_pitch = 50
-default_edge_width = 3
-
-# กรองจุฬาลงกรณ์มหาวิทยาลัยออก
-edges_with_coords_without_chula = edges_with_coords[edges_with_coords["Affiliation"] != "Chulalongkorn University"]
-
-st.sidebar.header("Visualization Settings")
-exclude_cu = st.sidebar.checkbox("Exclude Internal Collaborations", value=True)
-show_overseas = st.sidebar.radio(
-    "Universities",
-    ["All", "Thailand", "Overseas"],
-    captions=["All Universities", "Thailand Universities Only", "Overseas Universities Only"],
-)
-
-if exclude_cu:
-    edges_with_coords_without_chula = edges_with_coords_without_chula[~edges_with_coords_without_chula["Affiliation"].fillna('').str.contains("Chulalongkorn")]
-
-thailand_boundary = {
-    "min_lat": 5.612851,
-    "max_lat": 20.353827,
-    "min_lon": 97.343807,
-    "max_lon": 105.636044,
-}
-
-if show_overseas == "Thailand":
-    # Filter out overseas universities by country
-    edges_with_coords = edges_with_coords[edges_with_coords['Country'] == 'Thailand']
-    # Filter out by coordinates
-
-    edges_with_coords = edges_with_coords[
-        (edges_with_coords["latitude"] >= thailand_boundary["min_lat"]) &
-        (edges_with_coords["latitude"] <= thailand_boundary["max_lat"]) &
-        (edges_with_coords["longitude"] >= thailand_boundary["min_lon"]) &
-        (edges_with_coords["longitude"] <= thailand_boundary["max_lon"])
-]
-
-if show_overseas == "Overseas":
-    # Filter out overseas universities by country
-    edges_with_coords = edges_with_coords[edges_with_coords['Country'] != 'Thailand']
-    # Filter out by coordinates
-    edges_with_coords = edges_with_coords[
-        (edges_with_coords["latitude"] < thailand_boundary["min_lat"]) |
-        (edges_with_coords["latitude"] > thailand_boundary["max_lat"]) |
-        (edges_with_coords["longitude"] < thailand_boundary["min_lon"]) |
-        (edges_with_coords["longitude"] > thailand_boundary["max_lon"])
-]
-
-# เลือกธีมแผนที่
-map_style = st.sidebar.selectbox("Select Map Style", ["light", "dark", "satellite", "streets"], index=1)
-
-
-Collab_Analysis, Citation_Analysis = st.tabs(["Collab_Analysis", "Citation_Analysis"])
-
-with Collab_Analysis:
-    #sidebar
-    st.sidebar.subheader("Collab Analysis")
-    # เลือกรูปแบบ Node Size
-    node_size_option = st.sidebar.radio("Select Node Size", ["Small", "Medium", "Big"], index=1)
-    node_size = {"Small": 100, "Medium": 5000, "Big": 200000}[node_size_option]
-    # แสดงมหาวิทยาลัยต่างช่าติ
-    
-
-    # ปรับขนาด Edge ผ่าน Slider
-    edge_width = st.sidebar.slider("Edge Size", 1, 20, default_edge_width, step=1)
-
-    # Extract unique counts
-    unique_counts = edges_with_coords["count"].dropna().drop_duplicates().sort_values()
-    # ปรับ count ขั้นต่ำและสูงสุด
-    min_count, max_count = st.sidebar.select_slider(
-        "Count Range",
-        options = unique_counts,
-        value = (unique_counts.min(), unique_counts.max())
-    )
-
-    # กรองข้อมูลด้วย min_count และ max_count
-    edges_with_coords = edges_with_coords[
-        (edges_with_coords["count"] >= min_count) & 
-        (edges_with_coords["count"] <= max_count)
-    ]
-
-    # Top University
-    selected_affiliations = [
-        "University of Oxford",
-        "Stanford University",
-        "Massachusetts Institute of Technology",
-        "Harvard University",
-        "University of Cambridge",
-    ]
-
-    # กรองเฉพาะมหาวิทยาลัยที่ต้องการ
-    top_university = edges_with_coords_without_chula[edges_with_coords_without_chula["Affiliation"].isin(selected_affiliations)]
-    top_university = top_university.sort_values(by="count", ascending=False)
-    # Title and description
-    colored_header(
-        label="🌍 University Collaboration Dashboard",
-        description="An interactive visualization of collaboration counts across top universities.",
-        color_name="blue-70",
-    )
-
-    st.write("### World's Top 5 Universities' Collaboration Data")
-    st.write("This section visualizes the collaboration data of the world's top 5 universities.")
-    style_metric_cards()
-
-
-    # Metric Cards for Highlights
-    st.metric(label="Top 5's most collab with Chula", value=top_university.iloc[0]["Affiliation"])
-    col1, col2 = st.columns(2)
-    with col1:
-        st.metric(label="Number of Collaborations", value=top_university.iloc[0]["count"].astype(int))
-    with col2:
-        st.metric(label="Country", value=top_university.iloc[0]["Country"])
-
-    # Create Altair chart
-    bar_chart = (
+# กราฟแท่งของมหาวิทยาลัย top 5
+def top_universities_chart(top_university):
+    return (
         alt.Chart(top_university)
         .mark_bar(cornerRadiusTopLeft=10, cornerRadiusTopRight=10)
         .encode(
@@ -273,24 +356,24 @@ with Collab_Analysis:
         .configure_legend(titleFontSize=12, labelFontSize=10)
     )
 
-    # Render the chart in Streamlit
-    st.altair_chart(bar_chart, use_container_width=True)
+# Define color schemes based on map style
+TOP_UNIVERSITY_COLORS = {
+    "University of Oxford": [255, 0, 0],  # Red
+    "Stanford University": [0, 255, 0],  # Green
+    "Massachusetts Institute of Technology": [0, 0, 255],  # Blue
+    "Harvard University": [255, 255, 0],  # Yellow
+    "University of Cambridge": [255, 0, 255],  # Magenta
+}
 
-    # Define color schemes based on map style
-    affiliation_colors = {
-        "University of Oxford": [255, 0, 0],  # Red
-        "Stanford University": [0, 255, 0],  # Green
-        "Massachusetts Institute of Technology": [0, 0, 255],  # Blue
-        "Harvard University": [255, 255, 0],  # Yellow
-        "University of Cambridge": [255, 0, 255],  # Magenta
-    }
-    top_university["Color"] = top_university["Affiliation"].map(affiliation_colors)
+# แผนที่ 3D แท่งของมหาวิทยาลัย top 5
+def top_universities_deck(top_university, map_style):
+    top_university = top_university.assign(Color=top_university["Affiliation"].map(TOP_UNIVERSITY_COLORS))
 
     # Pydeck 3D Bar Layer
     bar_layer = pdk.Layer(
         "ColumnLayer",
-        data=top_university,
-        get_position="[longitude, latitude]",
+        data=deck_data.layer_data(top_university, ["Affiliation", "count", "Color"]),
+        get_position="position",
         get_elevation="count * 5000",  # Scale the height of bars
         elevation_scale=1,
         radius=100000,  # Radius of each bar
@@ -307,68 +390,118 @@ with Collab_Analysis:
         pitch=45,
     )
 
-    # Render the map
-    st.pydeck_chart(
-        pdk.Deck(
-            layers=[bar_layer],
-            initial_view_state=view_state,
-            map_style=f"mapbox://styles/mapbox/{map_style}-v9",
-            tooltip={"html": "<b>University:</b> {Affiliation}<br><b>Collab Count:</b> {count}"},
-        )
+    return CompactDeck(
+        layers=[bar_layer],
+        initial_view_state=view_state,
+        map_style=f"mapbox://styles/mapbox/{map_style}-v9",
+        tooltip={"html": "<b>University:</b> {Affiliation}<br><b>Collab Count:</b> {count}"},
     )
 
+# กราฟแท่ง subject area อันดับหนึ่งของแต่ละปี (subject: คอลัมน์ชื่อ subject, count: คอลัมน์ค่า)
+def top_subject_per_year_chart(data, subject, count, count_title, title):
+    return alt.Chart(data).mark_bar().encode(
+        x=alt.X("Year:O", title="Year", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y(f"{count}:Q", title=count_title),
+        color=alt.Color(f"{subject}:N", title="Subject Area"),
+        tooltip=["Year", subject, "Subject_area_abbrev", count]
+    ).properties(
+        title=title,
+        width=600,
+        height=400
+    ).configure_title(fontSize=18, font="Arial", anchor="start").configure_axis(labelFontSize=12, titleFontSize=14)
+
+# กราฟแท่ง subject area อันดับต้นของช่วงเดือน
+def window_top_chart(top, by, title, start, end):
+    return alt.Chart(top).mark_bar().encode(
+        x=alt.X("Subject_area_abbrev:N", sort="-y", title="Subject Area", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y(f"{by}:Q", title=f"{by} ({start} to {end})"),
+        color=alt.Color("Subject_area_abbrev:N", legend=None),
+        tooltip=["Subject_area_abbrev", "Papers", "Cited"],
+    ).properties(title=title, height=400)
+
 
-    # Section 1: Total Count Excluding Chulalongkorn University
-    colored_header(
-        label="🤝 Total Collaboration",
-        description="Collaboration with Chulalongkorn University",
-        color_name="blue-60",
-    )
-    total_count_excluding_cu = edges_with_coords_without_chula["count"].fillna(0).sum()
-    total_country_excluding_cu = edges_with_coords_without_chula["Country"].dropna().drop_duplicates().count()
-    total_affiliation_excluding_cu = edges_with_coords_without_chula["Affiliation"].dropna().drop_duplicates().count()
-    col1, col2,col3 = st.columns(3)
-    with col1:
-        st.metric(label="Total Affiliation", value=total_affiliation_excluding_cu.astype(int))
-    with col2:
-        st.metric(label="Total Count", value=total_count_excluding_cu.astype(int))
-    with col3:
-        st.metric(label="Total Country", value=total_country_excluding_cu.astype(int))
 
-    dynamic_view_state = update_view_state(default_lat, default_lon, default_zoom, default_pitch)
+# ---------- Fragments: แต่ละส่วนที่มี widget ของตัวเอง rerun เฉพาะส่วนนั้น ----------
+# input ของแต่ละ fragment ส่งผ่าน argument ชัดเจน (ค่าจาก full rerun ล่าสุด)
 
-    # สร้าง Layer
+# แผนที่เครือข่าย + heatmap พร้อมตัวปรับของแผนที่ (ขนาด node/edge, zoom, ช่วง count)
+# กราฟถูกดึงจาก artifact ของ state (ตัวกรองหลัก + ค่าของ fragment) ถ้า prerender ไว้
+@st.fragment
+def collab_map_section(edges_with_coords, version, show_overseas, map_style, artifacts, filter_state):
     st.subheader("Network of Collaboration Affiliation")
     st.write("This section visualizes the collaboration network between Chula and other institutions.")
-    node_color = get_node_color(map_style)
-    edge_layer = create_edge_layer(edges_with_coords, default_lon, default_lat, edge_width)
-    node_layer = create_node_layer(edges_with_coords, node_size, node_color)
 
-    # แสดงแผนที่
-    display_map(edges_with_coords, dynamic_view_state, edge_layer, node_layer, map_style)
-    st.subheader("Density of Collaboration Affiliation")
-    st.write("This section visualizes the density of collaboration between Chula and other institutions.")
-    # heatmap
-    heatmap_layer = pdk.Layer(
-        "HeatmapLayer",
-        edges_with_coords,
-        get_position="[longitude, latitude]",
-        opacity=0.5,
-        pickable=True
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        # เลือกรูปแบบ Node Size
+        node_size_option = st.radio("Select Node Size", ["Small", "Medium", "Big"], index=1, horizontal=True)
+        node_size = {"Small": 100, "Medium": 5000, "Big": 200000}[node_size_option]
+    with col2:
+        # ปรับขนาด Edge ผ่าน Slider
+        edge_width = st.slider("Edge Size", 1, 20, default_edge_width, step=1)
+    with col3:
+        # zoom ของแผนที่เครือข่าย (zoom น้อย = รวมเส้นตามประเทศ/พื้นที่)
+        map_zoom = st.slider("Network Map Zoom", 1, 12, default_zoom, step=1)
+
+    # Extract unique counts
+    unique_counts = edges_with_coords["count"].dropna().drop_duplicates().sort_values()
+    # ปรับ count ขั้นต่ำและสูงสุด
+    min_count, max_count = st.select_slider(
+        "Count Range",
+        options = unique_counts,
+        value = (unique_counts.min(), unique_counts.max())
     )
 
-    view_state = update_view_state(0,0,1,0)
-    map = pdk.Deck(layers=[heatmap_layer], initial_view_state=view_state, map_style=f"mapbox://styles/mapbox/{map_style}-v9")
-    st.pydeck_chart(map)
+    # กรองข้อมูลด้วย min_count และ max_count
+    edges_with_coords = edges_with_coords[
+        (edges_with_coords["count"] >= min_count) & 
+        (edges_with_coords["count"] <= max_count)
+    ]
 
-    # Section 2: Country with Highest Total Count
-    colored_header(
-        label="🗺️ Countries with Highest Collaboration",
-        description="You can search your country in the right box",
-        color_name="blue-50",
+    state = {
+        **filter_state,
+        "node_size": node_size,
+        "edge_width": edge_width,
+        "map_zoom": map_zoom,
+        "count_range": [min_count, max_count],
+    }
+    pyramid = lambda: edge_pyramid(version, show_overseas, min_count, max_count, edges_with_coords)
+    level = lambda: viewport_edges(
+        version, show_overseas, min_count, max_count, default_lat, default_lon, map_zoom, edges_with_coords
     )
-    country_counts = edges_with_coords_without_chula.groupby("Country")["count"].sum().astype(int).reset_index()
-    top_country_row = country_counts.loc[country_counts["count"].idxmax()]
+
+    with profiler.section("network_map"):
+        node_color = get_node_color(map_style)
+
+        # แสดงแผนที่
+        prerender.pydeck_chart(
+            artifacts, state, "network_map",
+            lambda: network_deck(
+                level(), update_view_state(default_lat, default_lon, map_zoom, default_pitch),
+                map_style, edge_width, node_size, node_color,
+            ),
+        )
+        st.caption(prerender.value(artifacts, state, "network_caption", lambda: lod_caption(level(), pyramid())))
+    st.subheader("Density of Collaboration Affiliation")
+    st.write("This section visualizes the density of collaboration between Chula and other institutions.")
+    # zoom ของ heatmap (zoom มาก = ช่องเล็กลง); zoom 1 แสดงทั้งโลก นอกนั้นอยู่ที่ Chula
+    heatmap_zoom = st.slider("Heatmap Zoom", 1, 12, 1, step=1)
+    heatmap_state = {**state, "heatmap_zoom": heatmap_zoom}
+    heatmap_center = (0, 0) if heatmap_zoom == 1 else (default_lat, default_lon)
+    bins = lambda: heatmap_pyramid(version, show_overseas, min_count, max_count, edges_with_coords)
+
+    with profiler.section("heatmap"):
+        # heatmap
+        prerender.pydeck_chart(
+            artifacts, heatmap_state, "heatmap",
+            lambda: heatmap_deck(bins(), update_view_state(*heatmap_center, heatmap_zoom, 0), map_style),
+        )
+        st.caption(prerender.value(artifacts, heatmap_state, "heatmap_caption", lambda: heatmap_caption(bins(), heatmap_zoom)))
+
+# ประเทศที่มี collaboration สูงสุด + ช่องค้นหา + ปุ่ม Top 5
+@st.fragment
+def country_section(countries, index):
+    top_country_row = countries.top(1).iloc[0]
     top_country = top_country_row["Country"]
     top_country_count = top_country_row["count"].astype(int)
 
@@ -380,14 +513,17 @@ with Collab_Analysis:
     with col2:
         search_country = st.text_input("Search Country")
         if search_country:
-            found = country_counts[country_counts["Country"] == search_country]
-            if not found.empty:
-                st.metric(label="Country", value=f"{search_country} : {found.iloc[0]["count"]}")
+            found = index.get(search_country)
+            if found is not None:
+                st.metric(label="Country", value=f"{found['Country']} : {found['count']}")
             else:
                 st.error("Country not found.")
+                suggestions = index.suggest(search_country, limit=5)
+                if not suggestions.empty:
+                    st.caption("Did you mean: " + ", ".join(f"{c} ({n:,})" for c, n in zip(suggestions["Country"], suggestions["count"])))
     if st.button("Show Top 5 Countries", key="top_countries"):
         chart = (
-            alt.Chart(country_counts.nlargest(5, "count"))
+            alt.Chart(countries.top(5))
             .mark_bar()
             .encode(
                 x=alt.X("Country:N", title="Country",sort="-y", axis=alt.Axis(labelAngle=0)),
@@ -397,85 +533,248 @@ with Collab_Analysis:
             )
             .properties(title="Top 5 Countries")
         )
-        st.altair_chart(chart, use_container_width=True)    
-
-    
+        st.altair_chart(chart, use_container_width=True)
 
-    # Section 3: Top Affiliation (Country != Thailand)
-    colored_header(
-        label="✈️ Universities with Highest Collaboration",
-        description="Overseas Affiliation",
-        color_name="blue-40",
-    )
-    non_thailand_df = edges_with_coords_without_chula[edges_with_coords_without_chula["Country"] != "Thailand"]
-    top_affiliation_non_thailand = non_thailand_df.nlargest(1, "count")
-    top_affiliation_non_thailand['count'] = top_affiliation_non_thailand['count'].astype(int)
+# affiliation อันดับหนึ่ง + ปุ่ม Top 5 (ใช้ทั้ง Thai และ Non-Thai)
+@st.fragment
+def top_affiliation_section(ranking, group, key, scheme):
+    top_affiliation = ranking.top(1).copy()
+    top_affiliation['count'] = top_affiliation['count'].astype(int)
     st.metric(
-        label="Top Non-Thai Affiliation",
-        value=f"{top_affiliation_non_thailand.iloc[0]['Affiliation']} : {top_affiliation_non_thailand.iloc[0]['count']}",
+        label=f"Top {group} Affiliation",
+        value=f"{top_affiliation.iloc[0]['Affiliation']} : {top_affiliation.iloc[0]['count']}",
     )
 
-    if st.button("Show Top 5 Non-Thai Affiliations", key="non_thai_affiliations"):
+    if st.button(f"Show Top 5 {group} Affiliations", key=key):
         chart = (
-            alt.Chart(non_thailand_df.nlargest(5, "count"))
+            alt.Chart(ranking.top(5)[["Affiliation", "count"]])
             .mark_bar()
             .encode(
                 x=alt.X("Affiliation:N", title="Affiliation",sort="-y", axis=alt.Axis(labelAngle=0)),
                 y=alt.Y("count:Q", title="Count"),
-                color=alt.Color("Affiliation:N", scale=alt.Scale(scheme="tableau20"), legend=None),
+                color=alt.Color("Affiliation:N", scale=alt.Scale(scheme=scheme), legend=None),
                 tooltip=["Affiliation", "count"],
             )
-            .properties(title="Top 5 Non-Thai Affiliations")
+            .properties(title=f"Top 5 {group} Affiliations")
         )
         st.altair_chart(chart, use_container_width=True)
 
+# ค้นหา affiliation ด้วยคำขึ้นต้น (เช่น "univ tok") หรือสะกดใกล้เคียง (เช่น "harvrd")
+@st.fragment
+def affiliation_search_section(index):
+    query = st.text_input("Search Affiliation", placeholder="e.g. Mahidol, univ tokyo")
+    if not query:
+        return
+    found = index.get(query)
+    if found is not None:
+        st.metric(label=f"Affiliation ({found['Country']})", value=f"{found['Affiliation']} : {int(found['count'])}")
+    suggestions = index.suggest(query)
+    if suggestions.empty:
+        if found is None:
+            st.error("Affiliation not found.")
+        return
+    st.dataframe(
+        suggestions[["Affiliation", "Country", "count"]].astype({"count": int}),
+        hide_index=True,
+        use_container_width=True,
+    )
+
+# Animation ของ Cited สะสม vs ID สะสม (slider ความเร็วอยู่ใน fragment นี้)
+# figure ถูก cache ไว้แล้ว (แชร์ทุก session) เปลี่ยนความเร็วโดย copy เฉพาะ layout ของ session นี้แล้วแก้ updatemenus
+@st.fragment
+def citation_animation(figure):
+    # UI สำหรับปรับความเร็ว Animation
+    speed = st.slider("Select Animation Speed (ms per frame)", min_value=100, max_value=2000, value=500, step=100)
+
+    # อัปเดตความเร็ว Animation
+    figure = {**figure, "layout": copy.deepcopy(figure["layout"])}
+    figure["layout"]["updatemenus"][0]["buttons"][0]["args"][1]["frame"]["duration"] = speed
+
+    # แสดงกราฟ
+    st.plotly_chart(figure, use_container_width=True)
+
+
+# Subject area อันดับต้นในช่วงเดือนที่เลือก (ใช้ prefix sum จึงไม่ต้องกรอง/groupby cited ใหม่)
+@st.fragment
+def citation_window_section(index, artifacts):
+    start, end = st.select_slider(
+        "Select date range",
+        options=index.labels,
+        value=(index.labels[0], index.labels[-1]),
+    )
+    state = {"date_range": [start, end]}
+    col1, col2 = st.columns(2)
+    for col, by, title in ((col1, "Cited", "Top Subject Areas by Citation Count"), (col2, "Papers", "Top Subject Areas by ID Count")):
+        with col:
+            prerender.altair_chart(
+                artifacts, state, f"window_top_{by.lower()}",
+                lambda: window_top_chart(index.top(start, end, by=by, k=10), by, title, start, end),
+                use_container_width=True,
+            )
+
+
+# ค่าเริ่มต้น
+path1 = "colab_count.csv"
+path2 = "Cited.csv"
+# สอง dataset ไม่ขึ้นต่อกัน โหลดพร้อมกันบน thread pool
+with profiler.section("load"):
+    (edges_with_coords, region_rows, collab_version), citation_tables = startup.run_concurrently(
+        lambda: load_collab_data(path1),
+        lambda: load_citation_tables(path2),
+    )
+startup.checkpoint("data_load")
+
+default_lat = 13.74310735  # Chulalongkorn University
+default_lon = 100.5328837
+default_zoom = 7
+default_pitch = 50
+default_edge_width = 3
+
+# id ของจุฬาฯ และ id ของกลุ่มหน่วยงานในจุฬาฯ ทั้งหมด (คณะ, โรงพยาบาล ฯลฯ)
+affiliation_index = _affiliation_index(path1, collab_version)
+home_id = affiliation_index.id_of(affiliations.HOME_INSTITUTION)
+home_parent_id = affiliation_index.home_parent_id(affiliations.HOME_INSTITUTION, exclude=affiliations.HOME_EXCLUDE)
+
+with profiler.section("filters"):
+    # กรองจุฬาลงกรณ์มหาวิทยาลัยออก
+    edges_with_coords_without_chula = edges_with_coords[edges_with_coords["Affiliation_id"] != home_id]
+
+    st.sidebar.header("Visualization Settings")
+    exclude_cu = st.sidebar.checkbox("Exclude Internal Collaborations", value=True)
+    show_overseas = st.sidebar.radio(
+        "Universities",
+        ["All", "Thailand", "Overseas"],
+        captions=["All Universities", "Thailand Universities Only", "Overseas Universities Only"],
+    )
+
+    if exclude_cu:
+        edges_with_coords_without_chula = edges_with_coords_without_chula[edges_with_coords_without_chula["Parent_id"] != home_parent_id]
+
+    if show_overseas != "All":
+        # ดึงแถวของ region ที่จัดกลุ่มไว้ล่วงหน้า (Thailand / Overseas) แทนการ scan ทุกคอลัมน์
+        edges_with_coords = edges_with_coords.iloc[region_rows.get(show_overseas, [])]
+
+with profiler.section("leaderboards"):
+    # อันดับทั้งหมดของข้อมูลที่กรองแล้ว (ส่วนต่าง ๆ ด้านล่างแค่ตัด top-k)
+    leaderboard = leaderboard_store(collab_version, exclude_cu, edges_with_coords_without_chula)
+    indexes = search_indexes(collab_version, exclude_cu, leaderboard)
+
+# เลือกธีมแผนที่
+map_style = st.sidebar.selectbox("Select Map Style", ["light", "dark", "satellite", "streets"], index=1)
+
+# state ของตัวกรองหลัก ใช้เลือก artifact ที่ prerender ไว้
+artifacts = artifact_store(collab_version, data_cache.dataset_version(path2, "latin1"), prerender.mode())
+filter_state = {"exclude_cu": exclude_cu, "universities": show_overseas, "map_style": map_style}
+
+
+startup.checkpoint("filters")
+
+Collab_Analysis, Citation_Analysis = st.tabs(["Collab_Analysis", "Citation_Analysis"])
+
+with Collab_Analysis:
+    with profiler.section("top5_metrics"):
+        # Top University (leaderboards.TOP_UNIVERSITIES เรียงตาม count แล้ว)
+        top_university = leaderboard.top_universities
+        # Title and description
+        colored_header(
+            label="🌍 University Collaboration Dashboard",
+            description="An interactive visualization of collaboration counts across top universities.",
+            color_name="blue-70",
+        )
+
+        st.write("### World's Top 5 Universities' Collaboration Data")
+        st.write("This section visualizes the collaboration data of the world's top 5 universities.")
+        style_metric_cards()
+
+
+        # Metric Cards for Highlights
+        top5 = prerender.value(artifacts, filter_state, "top5_metrics", lambda: {
+            "affiliation": top_university.iloc[0]["Affiliation"],
+            "count": int(top_university.iloc[0]["count"]),
+            "country": top_university.iloc[0]["Country"],
+        })
+        st.metric(label="Top 5's most collab with Chula", value=top5["affiliation"])
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric(label="Number of Collaborations", value=top5["count"])
+        with col2:
+            st.metric(label="Country", value=top5["country"])
+
+        # Render the chart in Streamlit
+        prerender.altair_chart(
+            artifacts, filter_state, "top5_chart", lambda: top_universities_chart(top_university), use_container_width=True
+        )
+
+        # Render the map
+        prerender.pydeck_chart(artifacts, filter_state, "top5_map", lambda: top_universities_deck(top_university, map_style))
+
+
+    # Section 1: Total Count Excluding Chulalongkorn University
+    colored_header(
+        label="🤝 Total Collaboration",
+        description="Collaboration with Chulalongkorn University",
+        color_name="blue-60",
+    )
+    with profiler.section("total_metrics"):
+        totals = prerender.value(artifacts, filter_state, "total_metrics", lambda: {
+            "count": int(leaderboard.total_count),
+            "countries": int(leaderboard.total_countries),
+            "affiliations": int(leaderboard.total_affiliations),
+        })
+        col1, col2,col3 = st.columns(3)
+        with col1:
+            st.metric(label="Total Affiliation", value=totals["affiliations"])
+        with col2:
+            st.metric(label="Total Count", value=totals["count"])
+        with col3:
+            st.metric(label="Total Country", value=totals["countries"])
+
+    collab_map_section(edges_with_coords, collab_version, show_overseas, map_style, artifacts, filter_state)
+
+    # Section 2: Country with Highest Total Count
+    colored_header(
+        label="🗺️ Countries with Highest Collaboration",
+        description="You can search your country in the right box",
+        color_name="blue-50",
+    )
+    with profiler.section("leaderboard_country"):
+        country_section(leaderboard.countries, indexes["countries"])
+
+    # Section 3: Top Affiliation (Country != Thailand)
+    colored_header(
+        label="✈️ Universities with Highest Collaboration",
+        description="Overseas Affiliation",
+        color_name="blue-40",
+    )
+    with profiler.section("leaderboard_overseas"):
+        top_affiliation_section(leaderboard.overseas, "Non-Thai", "non_thai_affiliations", "tableau20")
+
     # Section 4: Top Affiliation (Country == Thailand)
     colored_header(
         label="🌟 Top Local Affiliation",
         description="Affiliation in Thailand",
         color_name="blue-30",
     )
-    thailand_df = edges_with_coords_without_chula[edges_with_coords_without_chula["Country"] == "Thailand"]
-    top_affiliation_thailand = thailand_df.nlargest(1, "count")
-    top_affiliation_thailand['count'] = top_affiliation_thailand['count'].astype(int)
-    st.metric(
-        label="Top Thai Affiliation",
-        value=f"{top_affiliation_thailand.iloc[0]['Affiliation']} : {top_affiliation_thailand.iloc[0]['count']}",
+    with profiler.section("leaderboard_thai"):
+        top_affiliation_section(leaderboard.thai, "Thai", "thai_affiliations", "category20b")
+
+    # Section 5: Search Affiliation
+    colored_header(
+        label="🔎 Search Affiliation",
+        description="Find any collaborating affiliation by name",
+        color_name="blue-20",
     )
+    with profiler.section("affiliation_search"):
+        affiliation_search_section(indexes["affiliations"])
 
-    if st.button("Show Top 5 Thai Affiliations", key="thai_affiliations"):
-        chart = (
-            alt.Chart(thailand_df.nlargest(5, "count"))
-            .mark_bar()
-            .encode(
-                x=alt.X("Affiliation:N", title="Affiliation",sort="-y", axis=alt.Axis(labelAngle=0)),
-                y=alt.Y("count:Q", title="Count"),
-                color=alt.Color("Affiliation:N", scale=alt.Scale(scheme="category20b"), legend=None),
-                tooltip=["Affiliation", "count"],
-            )
-            .properties(title="Top 5 Thai Affiliations")
-        )
-        st.altair_chart(chart, use_container_width=True)
-    
 
+startup.checkpoint("collab_tab")
 
 with Citation_Analysis:
-    # แปลง Date_sort ให้เป็น datetime
-    cited["Date_sort"] = pd.to_datetime(cited["Date_sort"])
-
-    # จัดเรียงข้อมูลตามวันที่และ Subject_area_abbrev
-    cited = cited.sort_values(by=["Subject_area_abbrev", "Date_sort"])
-
-    # คำนวณค่าที่สะสม
-    cited["Cited_Cumsum"] = cited.groupby("Subject_area_abbrev")["Cited"].cumsum()  # Cited สะสม
-    cited["ID_Cumsum"] = cited.groupby("Subject_area_abbrev").cumcount() + 1         # ID สะสม
-
-    # เพิ่มคอลัมน์ Month-Year
-    cited["Month-Year"] = cited["Date_sort"].dt.to_period("M").astype(str)
-
-    # กำหนดขอบเขตของแกน X และ Y
-    max_id = cited["ID_Cumsum"].max()
-    max_cited = cited["Cited_Cumsum"].max()
+    # ตารางที่คำนวณไว้แล้ว (cached) ไม่ต้องคำนวณใหม่ทุก rerun
+    cited = citation_tables["cited"]
+    max_id_per_year = citation_tables["max_id_per_year"]
+    max_cited_per_year = citation_tables["max_cited_per_year"]
 
     # main tab2
     colored_header(
@@ -487,85 +786,30 @@ with Citation_Analysis:
     columns_to_plot = ["Subject_area_abbrev","Author_amount"]
     columns_to_plot2 = ["International_org_amount","Domestic_org_amount"]
     # เพิ่มเลย์เอาท์ด้วย Card
-    st.subheader("Comparison Charts")
-    col1, col2 = st.columns(2)  # แยกคอลัมน์
+    with profiler.section("citation_charts"):
+        st.subheader("Comparison Charts")
+        col1, col2 = st.columns(2)  # แยกคอลัมน์
 
-    with col1:
-        chart1 = create_chart("Subject_area_abbrev", cited)
-        st.altair_chart(chart1, use_container_width=True)
+        with col1:
+            prerender.altair_chart(artifacts, {}, "chart1", lambda: create_chart("Subject_area_abbrev", cited), use_container_width=True)
 
-    with col2:
-        chart2 = create_chart("Author_amount", cited)
-        st.altair_chart(chart2, use_container_width=True)
+        with col2:
+            prerender.altair_chart(artifacts, {}, "chart2", lambda: create_chart("Author_amount", cited), use_container_width=True)
 
-    # การวิเคราะห์ชุดที่ 2
-    st.subheader("Organization Analysis")
-    col3, col4 = st.columns(2)  # แยกคอลัมน์
+        # การวิเคราะห์ชุดที่ 2
+        st.subheader("Organization Analysis")
+        col3, col4 = st.columns(2)  # แยกคอลัมน์
 
-    with col3:
-        chart3 = create_chart("International_org_amount", cited)
-        st.altair_chart(chart3, use_container_width=True)
+        with col3:
+            prerender.altair_chart(artifacts, {}, "chart3", lambda: create_chart("International_org_amount", cited), use_container_width=True)
 
-    with col4:
-        chart4 = create_chart("Domestic_org_amount", cited)
-        st.altair_chart(chart4, use_container_width=True)
+        with col4:
+            prerender.altair_chart(artifacts, {}, "chart4", lambda: create_chart("Domestic_org_amount", cited), use_container_width=True)
 
     st.write("### Visualizing the cumulative citations vs cumulative IDs by subject area over time")
 
-    # UI สำหรับปรับความเร็ว Animation
-    speed = st.slider("Select Animation Speed (ms per frame)", min_value=100, max_value=2000, value=500, step=100)
-
-    # Plot animation using Scatter Plot
-    fig = px.scatter(
-        cited,
-        x="ID_Cumsum",
-        y="Cited_Cumsum",
-        color="Subject_area_abbrev",
-        size=None,
-        animation_frame="Month-Year",
-        animation_group="Subject_area_abbrev",
-        hover_name="Subject_area_name",
-        title="Cumulative Citations vs IDs by Subject Area",
-        labels={
-            "ID_Cumsum": "Cumulative ID Count",
-            "Cited_Cumsum": "Cumulative Citation Count",
-        },
-        color_discrete_sequence=px.colors.qualitative.Dark24,
-        range_x=[0, cited["ID_Cumsum"].max() + 10],
-        range_y=[0, cited["Cited_Cumsum"].max() + 50],
-        height=600
-    )
-
-    # อัปเดตความเร็ว Animation
-    fig.layout.updatemenus[0].buttons[0].args[1]["frame"]["duration"] = speed
-
-    # แสดงกราฟ
-    st.plotly_chart(fig, use_container_width=True)
-
-
-    # แปลง Date_sort เป็น datetime และเพิ่ม Year
-    cited["Date_sort"] = pd.to_datetime(cited["Date_sort"])
-    cited["Year"] = cited["Date_sort"].dt.year
-
-    # คำนวณ Subject_area_name ที่มีจำนวน ID มากที่สุดในแต่ละปี
-    max_id_per_year = (
-        cited.groupby(["Year", "Subject_area_name", "Subject_area_abbrev"])["Id"]
-        .count()
-        .reset_index(name="ID_Count")
-        .sort_values(by=["Year", "ID_Count"], ascending=[True, False])
-        .drop_duplicates(subset=["Year"])
-        .rename(columns={"Subject_area_name": "Subject_area_name_ID"})
-    )
-
-    # คำนวณ Subject_area_name ที่มีจำนวน Cited มากที่สุดในแต่ละปี
-    max_cited_per_year = (
-        cited.groupby(["Year", "Subject_area_name", "Subject_area_abbrev"])["Cited"]
-        .sum()
-        .reset_index()
-        .sort_values(by=["Year", "Cited"], ascending=[True, False])
-        .drop_duplicates(subset=["Year"])
-        .rename(columns={"Subject_area_name": "Subject_area_name_Cited", "Cited": "Cited_Count"})
-    )
+    with profiler.section("animation"):
+        citation_animation(prerender.value(artifacts, {}, "citation_animation", lambda: load_citation_animation_figure(path2)))
 
     # Streamlit application
     colored_header(
@@ -574,31 +818,31 @@ with Citation_Analysis:
         color_name="green-50", 
     )
     # Visualization for max ID count using Altair
-    chart_id = alt.Chart(max_id_per_year).mark_bar().encode(
-        x=alt.X("Year:O", title="Year", axis=alt.Axis(labelAngle=0)),
-        y=alt.Y("ID_Count:Q", title="ID Count"),
-        color=alt.Color("Subject_area_name_ID:N", title="Subject Area"),
-        tooltip=["Year", "Subject_area_name_ID","Subject_area_abbrev", "ID_Count"]
-    ).properties(
-        title="Top Subject Areas by ID Count",
-        width=600,
-        height=400
-    ).configure_title(fontSize=18, font="Arial", anchor="start").configure_axis(labelFontSize=12, titleFontSize=14)
+    with profiler.section("citation_year_charts"):
+        prerender.altair_chart(
+            artifacts, {}, "chart_id",
+            lambda: top_subject_per_year_chart(max_id_per_year, "Subject_area_name_ID", "ID_Count", "ID Count", "Top Subject Areas by ID Count"),
+            use_container_width=True,
+        )
+
+        # Visualization for max Cited count using Altair
+        prerender.altair_chart(
+            artifacts, {}, "chart_cited",
+            lambda: top_subject_per_year_chart(max_cited_per_year, "Subject_area_name_Cited", "Cited_Count", "Cited Count", "Top Subject Areas by Citation Count"),
+            use_container_width=True,
+        )
 
-    st.altair_chart(chart_id, use_container_width=True)
+    colored_header(
+        label=" 🗓️ Subject Areas in a Date Range",
+        description="Top subject areas by citations and IDs for any range of months",
+        color_name="green-30",
+    )
+    with profiler.section("citation_window"):
+        citation_window_section(load_citation_windows(path2), artifacts)
 
-    # Visualization for max Cited count using Altair
-    chart_cited = alt.Chart(max_cited_per_year).mark_bar().encode(
-        x=alt.X("Year:O", title="Year", axis=alt.Axis(labelAngle=0)),
-        y=alt.Y("Cited_Count:Q", title="Cited Count"),
-        color=alt.Color("Subject_area_name_Cited:N", title="Subject Area"),
-        tooltip=["Year", "Subject_area_name_Cited","Subject_area_abbrev", "Cited_Count"]
-    ).properties(
-        title="Top Subject Areas by Citation Count",
-        width=600,
-        height=400
-    ).configure_title(fontSize=18, font="Arial", anchor="start").configure_axis(labelFontSize=12, titleFontSize=14)
+    
 
-    st.altair_chart(chart_cited, use_container_width=True)
+startup.checkpoint("citation_tab")
+startup.report("main.py")
 
-    
\ No newline at end of file
+profiler.render()
@@ -0,0 +1,26 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+# สีสำหรับแถวที่ไม่มีชื่อประเทศ
+MISSING_COLOR = [128, 128, 128]
+
+
+# randomly generate bright colors using country name as seed
+def gen_random_color(text):
+    random.seed(text)
+    return [random.randint(128, 255) for _ in range(3)]
+
+
+# สร้างตารางสีครั้งเดียวต่อประเทศ แล้วกระจายสีให้ทุกแถวด้วย category codes
+# สีที่ได้เหมือนกับ gen_random_color ทุกประการ (seed จากชื่อประเทศ)
+def country_colors(countries):
+    categorical = countries.astype("category")
+    table = np.array(
+        [gen_random_color(c) for c in categorical.cat.categories] + [MISSING_COLOR],
+        dtype=np.uint8,
+    )
+    # code -1 (NaN) จะชี้ไปที่แถวสุดท้ายคือ MISSING_COLOR
+    rgb = table[categorical.cat.codes.to_numpy()]
+    return pd.Series(rgb.tolist(), index=countries.index)
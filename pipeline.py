@@ -0,0 +1,248 @@
+import functools
+import json
+import os
+import sys
+
+import pandas as pd
+
+import geocode
+from affiliations import HOME_EXCLUDE, AffiliationIndex
+from data_cache import file_hash
+
+# โฟลเดอร์เก็บไฟล์ระหว่างทางและสถานะ (hash) ของแต่ละ stage
+BUILD_DIR = os.path.join(".cache", "pipeline")
+STATE_PATH = os.path.join(BUILD_DIR, "state.json")
+
+# Chula sub-unit ที่ count น้อยกว่านี้จะถูกรวมเข้ากับ "Chulalongkorn University"
+CHULA_NAME = "Chulalongkorn University"
+SUBUNIT_MAX_COUNT = 100
+CHULA_MIN_COUNT = 10000
+
+# ไฟล์ระหว่างทาง
+FOLDED_AFFILIATIONS = os.path.join(BUILD_DIR, "affiliation_folded.csv")
+SUBJECT_EXPLODED = os.path.join(BUILD_DIR, "subject_exploded.csv")
+
+# ลำดับคอลัมน์ของ Cited.csv
+CITED_COLUMNS = [
+    "Id",
+    "Author_amount",
+    "Domestic_org_amount",
+    "International_org_amount",
+    "Ref_amount",
+    "Date_sort",
+    "Subject_area_code",
+    "Cited",
+    "Subject_area_name",
+    "Subject_area_abbrev",
+]
+
+
+# แต่ละ stage ประกาศ inputs/outputs ไว้ชัดเจน เพื่อให้ runner เทียบ hash ได้
+class Stage:
+    def __init__(self, name, inputs, outputs, func):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.func = func
+
+
+# รวม count ของ Chula sub-unit เล็ก ๆ เข้ากับ "Chulalongkorn University" แล้วลบแถวนั้นทิ้ง
+def fold_chula_subunits(affiliation_path, output_path):
+    x = pd.read_csv(affiliation_path, encoding="utf-8")
+    index = AffiliationIndex(x["Affiliation"])
+    affiliation_id, parent_id = index.canonical_columns(CHULA_NAME, exclude=HOME_EXCLUDE)
+    subunit = (parent_id == index.home_parent_id(CHULA_NAME, exclude=HOME_EXCLUDE)) & (x["count"] < SUBUNIT_MAX_COUNT).to_numpy()
+    total_count_to_add = x.loc[subunit, "count"].sum()
+    x.loc[(affiliation_id == index.id_of(CHULA_NAME)) & (x["count"] > CHULA_MIN_COUNT), "count"] += total_count_to_add
+    x[~subunit].to_csv(output_path, index=False, encoding="utf-8")
+
+
+# บวก CollabCount จาก affiliation_count(extra).csv โดยจับคู่ Affiliation กับ Organization
+def merge_extra_counts(folded_path, extra_path, output_path):
+    x = pd.read_csv(folded_path, encoding="utf-8")
+    y = pd.read_csv(extra_path, encoding="utf-8")
+    merged = x.merge(y, left_on="Affiliation", right_on="Organization", how="left")
+    merged["count"] = (merged["count"] + merged["CollabCount"].fillna(0)).astype(int)
+    merged[["Affiliation", "Country", "count"]].to_csv(output_path, index=False, encoding="utf-8")
+
+
+# พิกัดที่แก้ด้วยมือ (ชื่อที่ไม่มีใน affiliation_location.csv) มาก่อน affiliation_location.csv
+MANUAL_LOCATIONS = os.path.join("raw_data", "affiliation_location_manual.csv")
+
+
+# เติมพิกัดให้ทุก affiliation จาก geocode cache (ชื่อใหม่จะถูก resolve ครั้งเดียวแล้วบันทึกลง cache)
+# ได้เป็น colab_count.csv ที่ main.py ใช้ เรียงตามแถวของ counts และ count เป็น int ตาม input
+# อ่านเฉพาะ input ที่ประกาศไว้ (ไม่อ่าน colab_count.csv เดิม) รันซ้ำจึงได้ไฟล์เดิมทุก byte
+def geocode_affiliations(counts_path, locations_path, manual_path, gazetteer_path, output_path, cache_path=geocode.CACHE_PATH):
+    counts = pd.read_csv(counts_path, encoding="utf-8")
+    cache = geocode.GeocodeCache(cache_path, seed_paths=[manual_path, locations_path])
+    coords = cache.resolve(
+        counts["Affiliation"],
+        counts["Country"],
+        gazetteer=geocode.load_gazetteer(gazetteer_path),
+        resolver=geocode.load_resolver(),
+    )
+    cache.save()
+    located = counts.join(coords)
+    located.to_csv(output_path, index=False, encoding="utf-8-sig")
+
+
+# แตก Subject_area_code ("2305#2736#") เป็นแถวละรหัส แล้วเติมชื่อ/ตัวย่อจาก subject_area.csv
+def explode_subject_codes(papers, subjects):
+    papers = papers.drop(columns=["Subject_area_abbrev"])
+    papers["Subject_area_code"] = papers["Subject_area_code"].str.rstrip("#").str.split("#")
+    expanded = papers.explode("Subject_area_code")
+    subjects = subjects.assign(Subject_area_code=subjects["Subject_area_code"].astype(str))
+    return expanded.merge(subjects, how="left", on="Subject_area_code")
+
+
+def explode_subjects(papers_path, subjects_path, output_path):
+    papers = pd.read_csv(papers_path, encoding="latin1", index_col=0)
+    subjects = pd.read_csv(subjects_path, encoding="latin1", index_col=0)
+    explode_subject_codes(papers, subjects).to_csv(output_path, index=False, encoding="utf-8")
+
+
+# เติมจำนวน Cited จาก Cited_by.csv ด้วย Id
+def join_citation_counts(exploded, cited_by):
+    cited_by = cited_by.rename(columns={"paperID": "Id"})
+    final = exploded.merge(cited_by, on="Id", how="left")
+    final["Ref_amount"] = final["Ref_amount"].fillna(0).astype(int)
+    final["Cited"] = final["Cited"].fillna(0).astype(int)
+    return final[CITED_COLUMNS]
+
+
+def join_citations(exploded_path, cited_by_path, output_path):
+    exploded = pd.read_csv(exploded_path, encoding="utf-8", dtype={"Subject_area_code": str})
+    cited_by = pd.read_csv(cited_by_path, encoding="latin1", index_col=0)
+    join_citation_counts(exploded, cited_by).to_csv(output_path, index=False, encoding="utf-8")
+
+
+# โหมด streaming: อ่าน aiml_data ทีละ chunk แล้ว explode/join กับตาราง lookup ที่อยู่ในหน่วยความจำ
+# เขียนต่อท้ายไฟล์ทีละ chunk ทำให้ peak memory ขึ้นกับ chunksize ไม่ใช่ขนาดข้อมูลทั้งหมด
+def stream_citations(papers_path, subjects_path, cited_by_path, output_path, chunksize=50000):
+    subjects = pd.read_csv(subjects_path, encoding="latin1", index_col=0)
+    cited_by = pd.read_csv(cited_by_path, encoding="latin1", index_col=0)
+    tmp = f"{output_path}.tmp"
+    header = True
+    for chunk in pd.read_csv(papers_path, encoding="latin1", index_col=0, chunksize=chunksize):
+        final = join_citation_counts(explode_subject_codes(chunk, subjects), cited_by)
+        final.to_csv(tmp, mode="w" if header else "a", header=header, index=False, encoding="utf-8")
+        header = False
+    if header:
+        pd.DataFrame(columns=CITED_COLUMNS).to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, output_path)
+
+
+# stage ที่สร้าง Cited.csv: ถ้าระบุ chunksize จะใช้ stage เดียวแบบ streaming
+def citation_stages(chunksize=None):
+    if chunksize:
+        return [
+            Stage(
+                "stream_citations",
+                ["aiml_data.csv", "subject_area.csv", "Cited_by.csv"],
+                ["Cited.csv"],
+                functools.partial(stream_citations, chunksize=chunksize),
+            ),
+        ]
+    return [
+        Stage(
+            "explode_subjects",
+            ["aiml_data.csv", "subject_area.csv"],
+            [SUBJECT_EXPLODED],
+            explode_subjects,
+        ),
+        Stage(
+            "join_citations",
+            [SUBJECT_EXPLODED, "Cited_by.csv"],
+            ["Cited.csv"],
+            join_citations,
+        ),
+    ]
+
+
+AFFILIATION_STAGES = [
+    Stage(
+        "fold_chula_subunits",
+        ["raw_data/affiliation_count.csv"],
+        [FOLDED_AFFILIATIONS],
+        fold_chula_subunits,
+    ),
+    Stage(
+        "merge_extra_counts",
+        [FOLDED_AFFILIATIONS, "raw_data/affiliation_count(extra).csv"],
+        ["updated_affiliation_count.csv"],
+        merge_extra_counts,
+    ),
+    Stage(
+        "geocode_affiliations",
+        ["updated_affiliation_count.csv", "raw_data/affiliation_location.csv", MANUAL_LOCATIONS, geocode.GAZETTEER_PATH],
+        ["colab_count.csv", geocode.CACHE_PATH],
+        geocode_affiliations,
+    ),
+]
+
+STAGES = AFFILIATION_STAGES + citation_stages()
+
+
+def load_state():
+    try:
+        with open(STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    tmp = f"{STATE_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_PATH)
+
+
+def _hashes(paths):
+    return {p: file_hash(p) for p in paths if os.path.exists(p)}
+
+
+# stage ต้องรันใหม่ถ้า hash ของ input เปลี่ยน หรือ output หาย/ถูกแก้จากที่บันทึกไว้
+def is_stale(stage, record):
+    if record is None:
+        return True
+    if record.get("inputs") != _hashes(stage.inputs):
+        return True
+    return record.get("outputs") != _hashes(stage.outputs)
+
+
+# รันเฉพาะ stage ที่ stale ตามลำดับใน STAGES (stage ถัดไปจะเห็น output ใหม่เอง)
+# คืนรายชื่อ stage ที่ถูกรันจริง
+def run(targets=None, force=False, stages=STAGES, log=print):
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    state = load_state()
+    executed = []
+    for stage in stages:
+        if targets and stage.name not in targets:
+            continue
+        if not force and not is_stale(stage, state.get(stage.name)):
+            log(f"[skip] {stage.name}")
+            continue
+        log(f"[run]  {stage.name}")
+        stage.func(*stage.inputs, *stage.outputs)
+        state[stage.name] = {"inputs": _hashes(stage.inputs), "outputs": _hashes(stage.outputs)}
+        save_state(state)
+        executed.append(stage.name)
+    return executed
+
+
+# python pipeline.py [--force] [--chunksize N] [stage ...]
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    force = "--force" in args
+    chunksize = None
+    if "--chunksize" in args:
+        i = args.index("--chunksize")
+        chunksize = int(args[i + 1])
+        del args[i:i + 2]
+    run(
+        targets=[a for a in args if a != "--force"] or None,
+        force=force,
+        stages=AFFILIATION_STAGES + citation_stages(chunksize),
+    )
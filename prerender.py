@@ -0,0 +1,286 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import streamlit as st
+
+from data_cache import file_hash
+
+# DASHBOARD_PRERENDER=record: build ทุกอย่างแล้วเขียน artifact (ใช้ตอน prerender)
+# DASHBOARD_PRERENDER=off: ไม่อ่าน/ไม่เขียน artifact
+# ไม่ตั้งค่า: ถ้ามี artifact ของ state นั้นให้ใช้เลย ไม่ต้อง build ใหม่
+PRERENDER_ENV = "DASHBOARD_PRERENDER"
+ARTIFACT_DIR = os.path.join(".cache", "prerender")
+
+# ไฟล์โค้ด (และ gazetteer ที่ affiliations ใช้) ที่มีผลกับหน้าตากราฟ แก้ไฟล์ไหนก็ได้ version ใหม่ (artifact เก่าจะไม่ถูกใช้)
+SOURCES = [
+    "main.py",
+    "citation.py",
+    "deck_data.py",
+    "leaderboards.py",
+    "palette.py",
+    "regions.py",
+    "affiliations.py",
+    "data_cache.py",
+    "prerender.py",
+    "raw_data/gazetteer.csv",
+]
+
+# ชุดตัวกรองที่ prerender เมื่อไม่ได้ระบุ (sidebar ของ main.py)
+DEFAULT_EXCLUDE_CU = [True, False]
+DEFAULT_UNIVERSITIES = ["All", "Thailand", "Overseas"]
+DEFAULT_MAP_STYLES = ["dark"]
+
+
+def mode():
+    value = os.environ.get(PRERENDER_ENV, "")
+    return value if value in ("record", "off") else "serve"
+
+
+def _json_default(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def _dumps(obj):
+    return json.dumps(obj, sort_keys=True, default=_json_default, separators=(",", ":"))
+
+
+# version ของ artifact = hash ของ version dataset ทุกไฟล์ + เนื้อไฟล์โค้ดใน SOURCES
+def artifact_version(dataset_versions, sources=SOURCES):
+    h = hashlib.sha1(_dumps(list(dataset_versions)).encode("utf-8"))
+    for path in sources:
+        if os.path.exists(path):
+            h.update(file_hash(path).encode("ascii"))
+    return h.hexdigest()[:16]
+
+
+def state_key(state):
+    return hashlib.sha1(_dumps(state).encode("utf-8")).hexdigest()[:16]
+
+
+# เขียนไฟล์ชั่วคราวชื่อไม่ซ้ำในโฟลเดอร์เดียวกันแล้ว os.replace (หลาย process record พร้อมกันได้)
+def _write_atomic(path, write):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_text(path, text):
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+    _write_atomic(path, write)
+
+
+# artifact ของหนึ่ง version: <root>/<version>/<state_key>/<name>.json (+ ไฟล์ .arrow ของข้อมูลกราฟ Altair)
+# ที่อ่านแล้วเก็บไว้ใน memory ตาม mtime ของไฟล์ ใช้ร่วมกันทุก session (ห้ามแก้ object ที่ได้จาก get)
+# เมื่อ record version ใหม่ โฟลเดอร์ของ version อื่นใน root จะถูกลบ
+class ArtifactStore:
+    def __init__(self, version, root=ARTIFACT_DIR, mode="serve"):
+        self.version = version
+        self.root = root
+        self.directory = os.path.join(root, version)
+        self.mode = mode
+        self._memo = {}
+        self._recorded = set()
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    def _path(self, state, name):
+        return os.path.join(self.directory, state_key(state), name)
+
+    def get(self, state, name):
+        if self.mode != "serve":
+            return None
+        path = self._path(state, f"{name}.json")
+        # จำผลไว้คู่กับ mtime ของไฟล์ JSON: ไฟล์ที่ถูก prerender / เขียนทับหลัง server เริ่มจะถูกอ่านใหม่
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        cached = self._memo.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = self._memo[path] = (mtime, None if mtime is None else self._read(state, path))
+        return cached[1]
+
+    # artifact จากไฟล์ หรือ None ถ้าไฟล์ JSON / Arrow หายหรืออ่านไม่ได้ (หน้าเว็บจะ build เองแทน)
+    def _read(self, state, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                artifact = json.load(f)
+            # ข้อมูลของกราฟ Altair อ่านจาก Arrow (memory-map) เป็น DataFrame
+            datasets = artifact.get("dataset_files")
+            if datasets:
+                artifact["datasets"] = {
+                    dataset: feather.read_table(self._path(state, file), memory_map=True).to_pandas()
+                    for dataset, file in datasets.items()
+                }
+        except (OSError, ValueError, pa.ArrowException):
+            return None
+        return artifact
+
+    def put(self, state, name, artifact, datasets=None):
+        if not self.recording:
+            return
+        if datasets:
+            files = {}
+            for i, (dataset, records) in enumerate(datasets.items()):
+                file = f"{name}.{i}.arrow"
+                table = pa.Table.from_pylist(records)
+                _write_atomic(self._path(state, file), lambda tmp: feather.write_feather(table, tmp, compression="uncompressed"))
+                files[dataset] = file
+            artifact = {**artifact, "dataset_files": files}
+        self._record_state(state)
+        _write_text(self._path(state, f"{name}.json"), _dumps(artifact))
+
+    # โฟลเดอร์ของ version อื่นใน root (artifact ของโค้ด / dataset ชุดเก่าที่ไม่มีทางถูกใช้อีก)
+    def _prune(self):
+        try:
+            entries = os.listdir(self.root)
+        except OSError:
+            return
+        for entry in entries:
+            path = os.path.join(self.root, entry)
+            if entry != self.version and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    # manifest.json ของ version นี้: state ทั้งหมดที่มี artifact
+    def _record_state(self, state):
+        key = state_key(state)
+        if key in self._recorded:
+            return
+        if not self._recorded:
+            self._prune()
+        self._recorded.add(key)
+        _write_text(self._path(state, "state.json"), _dumps(state))
+        path = os.path.join(self.directory, "manifest.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {"version": self.version, "states": {}}
+        manifest["states"][key] = state
+        manifest["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        _write_text(path, json.dumps(manifest, indent=2, sort_keys=True, default=_json_default))
+
+
+# Deck ที่ serialize ไว้แล้ว (st.pydeck_chart ใช้แค่ to_json / _tooltip / mapbox_key)
+class StoredDeck:
+    mapbox_key = None
+
+    def __init__(self, artifact):
+        self._json = artifact["json"]
+        self._tooltip = artifact.get("tooltip")
+
+    def to_json(self):
+        return self._json
+
+
+# ---------- แสดงผลจาก artifact ถ้ามี ไม่มีก็ build (และเขียน artifact ถ้าอยู่ในโหมด record) ----------
+def altair_chart(store, state, name, build, **kwargs):
+    artifact = store.get(state, name)
+    if artifact is not None:
+        # vega_lite_chart ย้าย datasets ออกจาก spec ที่ส่งเข้าไป จึงส่งสำเนาระดับบนสุด
+        spec = {k: copy.deepcopy(v) for k, v in artifact["spec"].items()}
+        spec["datasets"] = dict(artifact.get("datasets", {}))
+        st.vega_lite_chart(spec, **kwargs)
+        return
+    chart = build()
+    if store.recording:
+        import altair as alt
+
+        with alt.data_transformers.disable_max_rows():
+            spec = chart.to_dict()
+        datasets = spec.pop("datasets", {})
+        store.put(state, name, {"spec": spec}, datasets)
+    st.altair_chart(chart, **kwargs)
+
+
+def pydeck_chart(store, state, name, build, **kwargs):
+    artifact = store.get(state, name)
+    if artifact is None:
+        deck = build()
+        tooltip = getattr(deck, "_tooltip", None)
+        artifact = {"json": deck.to_json(), "tooltip": tooltip if isinstance(tooltip, dict) else None}
+        store.put(state, name, artifact)
+    st.pydeck_chart(StoredDeck(artifact), **kwargs)
+
+
+# ค่าที่ serialize เป็น JSON ได้ (ค่า metric, dict ของ Plotly figure)
+def value(store, state, name, compute):
+    artifact = store.get(state, name)
+    if artifact is not None:
+        return artifact["value"]
+    result = compute()
+    store.put(state, name, {"value": result})
+    return result
+
+
+# ---------- headless prerender ----------
+def _widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise KeyError(f"widget not found: {label}")
+
+
+# รัน main.py แบบ headless (AppTest) ทุกชุดตัวกรองในโหมด record (artifact และ manifest เขียนโดย ArtifactStore)
+def prerender(script="main.py", exclude_cu=DEFAULT_EXCLUDE_CU, universities=DEFAULT_UNIVERSITIES,
+              map_styles=DEFAULT_MAP_STYLES, timeout=600):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ[PRERENDER_ENV] = "record"
+    app = AppTest.from_file(os.path.abspath(script), default_timeout=timeout).run()
+    states = []
+    for exclude in exclude_cu:
+        for group in universities:
+            for style in map_styles:
+                start = time.perf_counter()
+                _widget(app.sidebar.checkbox, "Exclude Internal Collaborations").set_value(exclude)
+                _widget(app.sidebar.radio, "Universities").set_value(group)
+                _widget(app.sidebar.selectbox, "Select Map Style").set_value(style)
+                app.run()
+                if app.exception:
+                    raise RuntimeError(f"{script} failed for {exclude}, {group}, {style}: {app.exception[0].message}")
+                state = {"exclude_cu": exclude, "universities": group, "map_style": style}
+                states.append(state)
+                print(f"{_dumps(state)} {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return states
+
+
+def _bool(text):
+    return text.lower() in ("1", "true", "yes", "on")
+
+
+#   python prerender.py
+#   python prerender.py --universities All --map-styles dark light
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render dashboard states ahead of time into versioned artifacts")
+    parser.add_argument("--script", default="main.py")
+    parser.add_argument("--exclude-cu", type=_bool, nargs="+", default=DEFAULT_EXCLUDE_CU)
+    parser.add_argument("--universities", nargs="+", choices=DEFAULT_UNIVERSITIES, default=DEFAULT_UNIVERSITIES)
+    parser.add_argument("--map-styles", nargs="+", choices=["light", "dark", "satellite", "streets"], default=DEFAULT_MAP_STYLES)
+    args = parser.parse_args()
+
+    states = prerender(args.script, args.exclude_cu, args.universities, args.map_styles)
+    print(f"rendered {len(states)} filter states into {ARTIFACT_DIR}", file=sys.stderr)
@@ -0,0 +1,145 @@
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+import uuid
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import startup
+
+# เปิดด้วย environment variable DASHBOARD_PROFILE=1 หรือ query parameter ?profile=1
+# tracemalloc (วัด memory) และ log ลงไฟล์เปิดได้จาก environment variable เท่านั้น เพราะมีผลกับทั้ง server
+# (ทุก session ช้าลง / ใครก็เขียนไฟล์ได้จาก URL) ?profile=1 วัดแค่เวลาและขนาด output แล้วแสดงใน sidebar
+PROFILE_ENV = "DASHBOARD_PROFILE"
+PROFILE_QUERY = "profile"
+# log ของทุก rerun (หนึ่งบรรทัดต่อ section); เกิน LOG_MAX_BYTES ย้ายไปเป็น <LOG_PATH>.1 (เก็บไว้ชุดเดียว)
+LOG_PATH = os.path.join(".cache", "profile.jsonl")
+LOG_MAX_BYTES = 10 * 2**20
+
+
+def _env_enabled():
+    return os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+def is_enabled(query_params=None):
+    if _env_enabled():
+        return True
+    return query_params is not None and query_params.get(PROFILE_QUERY) not in (None, "", "0")
+
+
+# นับขนาด ForwardMsg ที่ส่งไป browser ระหว่าง section (ห่อ enqueue ของ ScriptRunContext ชั่วคราว)
+@contextlib.contextmanager
+def _count_output_bytes(counter):
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        yield
+        return
+    enqueue = ctx._enqueue
+
+    def counting_enqueue(msg):
+        counter[0] += msg.ByteSize()
+        enqueue(msg)
+
+    ctx._enqueue = counting_enqueue
+    try:
+        yield
+    finally:
+        ctx._enqueue = enqueue
+
+
+# วัดเวลา, peak allocation (tracemalloc) และขนาด output ของแต่ละ section ใน rerun เดียว
+# ถ้าไม่ได้เปิด section() ไม่ทำอะไรเลย
+# peak ของ tracemalloc เป็นค่าของทั้ง process: รวม allocation ของ session อื่นที่รันพร้อมกันด้วย
+# (ค่าที่ได้จึงเป็น "process peak ระหว่าง section" ไม่ใช่ของ section นั้นอย่างเดียว)
+# section ใน @st.fragment ที่ rerun เฉพาะ fragment ถูกวัดด้วย Profiler ของ rerun เต็มครั้งก่อน แต่ panel ไม่ถูกวาดใหม่
+# จึงเขียนลง log (ติด "fragment": true) อย่างเดียว ไม่เก็บใน records
+class Profiler:
+    def __init__(self, enabled=False, log_path=LOG_PATH, trace_memory=None, write_log=None):
+        self.enabled = enabled
+        self.log_path = log_path if enabled and (_env_enabled() if write_log is None else write_log) else None
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self.rendered = False
+        self.trace_memory = enabled and (_env_enabled() if trace_memory is None else trace_memory)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+        output_bytes = [0]
+        if self.trace_memory:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            with _count_output_bytes(output_bytes):
+                yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - baseline if self.trace_memory else None
+            self._record({
+                "run_id": self.run_id,
+                "timestamp": time.time(),
+                "section": name,
+                "seconds": round(seconds, 6),
+                "process_peak_bytes": None if peak is None else max(0, peak),
+                "output_bytes": output_bytes[0],
+            })
+
+    def _record(self, record):
+        if self.rendered:
+            record["fragment"] = True
+        else:
+            self.records.append(record)
+        if self.log_path is None:
+            return
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        try:
+            if os.path.getsize(self.log_path) > LOG_MAX_BYTES:
+                os.replace(self.log_path, self.log_path + ".1")
+        except OSError:
+            pass
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def table(self):
+        df = pd.DataFrame(self.records, columns=["section", "seconds", "process_peak_bytes", "output_bytes"])
+        table = pd.DataFrame({
+            "section": df["section"],
+            "ms": (df["seconds"] * 1000).round(1),
+            "process peak MB": (df["process_peak_bytes"].astype(float) / 2**20).round(2),
+            "output KB": (df["output_bytes"] / 1024).round(1),
+        })
+        return table if self.trace_memory else table.drop(columns="process peak MB")
+
+    # panel ใน sidebar แสดงผลของ rerun ล่าสุด
+    def render(self):
+        if not self.enabled:
+            return
+        self.rendered = True
+        with st.sidebar.expander("Profiling", expanded=False):
+            table = self.table()
+            log = self.log_path or f"off (set {PROFILE_ENV}=1 on the server)"
+            st.caption(f"run {self.run_id} · {table['ms'].sum():,.0f} ms total · log: {log}")
+            st.caption("sections inside fragments show the last full rerun; fragment-only reruns are not shown here")
+            if self.trace_memory:
+                st.caption("process peak MB: peak of the whole server process during the section, including other sessions")
+            else:
+                st.caption(f"memory tracing is off (set {PROFILE_ENV}=1 on the server to enable it)")
+            st.dataframe(table, hide_index=True, use_container_width=True)
+            # เวลาของ rerun แรกใน process นี้ (import, โหลดข้อมูล, แต่ละแท็บ)
+            phases = startup.phases()
+            if phases:
+                st.caption("startup (first run of this process)")
+                st.dataframe(
+                    pd.DataFrame({"phase": list(phases), "ms": [round(v * 1000, 1) for v in phases.values()]}),
+                    hide_index=True,
+                    use_container_width=True,
+                )
@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+
+# ขอบเขตของแต่ละ region (country + bounding box)
+# เพิ่ม region ใหม่ (เช่น จังหวัด/ทวีป) ได้ที่นี่ โดยใส่ "polygon" แทน "bbox" ก็ได้
+REGIONS = {
+    "Thailand": {
+        "country": "Thailand",
+        "bbox": {
+            "min_lat": 5.612851,
+            "max_lat": 20.353827,
+            "min_lon": 97.343807,
+            "max_lon": 105.636044,
+        },
+    },
+}
+
+# กลุ่มของแถวที่ไม่อยู่ใน region ใดเลย
+OVERSEAS = "Overseas"
+
+
+# Grid index ของพิกัด: แบ่งโลกเป็นช่องขนาด cell_size องศา
+# เก็บตำแหน่งแถว (position) เรียงตาม cell แบบ CSR (cell_ids + offsets)
+class SpatialIndex:
+    def __init__(self, latitude, longitude, cell_size=1.0):
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.cell_size = cell_size
+        self.n_cols = int(math.ceil(360 / cell_size))
+
+        valid = ~(np.isnan(self.latitude) | np.isnan(self.longitude))
+        positions = np.flatnonzero(valid)
+        cells = self._cell_of(self.latitude[positions], self.longitude[positions])
+        order = np.argsort(cells, kind="stable")
+        self.positions = positions[order]
+        self.cell_ids, starts = np.unique(cells[order], return_index=True)
+        self.offsets = np.append(starts, len(self.positions))
+
+    def _row_col(self, lat, lon):
+        row = np.floor((np.clip(lat, -90, 90) + 90) / self.cell_size).astype(np.int64)
+        col = np.floor((np.clip(lon, -180, 180) + 180) / self.cell_size).astype(np.int64)
+        return row, np.minimum(col, self.n_cols - 1)
+
+    def _cell_of(self, lat, lon):
+        row, col = self._row_col(lat, lon)
+        return row * self.n_cols + col
+
+    # ตำแหน่งแถวทั้งหมดใน cell ที่ทับกับ bounding box (ยังไม่กรองละเอียด)
+    def _candidates(self, min_lat, max_lat, min_lon, max_lon):
+        row0, col0 = self._row_col(min_lat, min_lon)
+        row1, col1 = self._row_col(max_lat, max_lon)
+        rows = np.arange(row0, row1 + 1)
+        cols = np.arange(col0, col1 + 1)
+        wanted = (rows[:, None] * self.n_cols + cols[None, :]).ravel()
+        hit = np.searchsorted(self.cell_ids, wanted)
+        found = hit < len(self.cell_ids)
+        found[found] = self.cell_ids[hit[found]] == wanted[found]
+        hit = hit[found]
+        if len(hit) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.positions[self.offsets[i]:self.offsets[i + 1]] for i in hit])
+
+    def query_bbox(self, min_lat, max_lat, min_lon, max_lon):
+        candidates = self._candidates(min_lat, max_lat, min_lon, max_lon)
+        lat = self.latitude[candidates]
+        lon = self.longitude[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(candidates[inside])
+
+    # polygon คือ list ของ (lat, lon) ตรวจด้วย ray casting เฉพาะแถวใน bbox ของ polygon
+    def query_polygon(self, polygon):
+        vertices = np.asarray(polygon, dtype=np.float64)
+        candidates = self.query_bbox(
+            vertices[:, 0].min(), vertices[:, 0].max(), vertices[:, 1].min(), vertices[:, 1].max()
+        )
+        lat = self.latitude[candidates]
+        lon = self.longitude[candidates]
+        inside = np.zeros(len(candidates), dtype=bool)
+        for (lat1, lon1), (lat2, lon2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            crosses = (lat1 > lat) != (lat2 > lat)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                lon_at = (lon2 - lon1) * (lat - lat1) / (lat2 - lat1) + lon1
+            inside ^= crosses & (lon < lon_at)
+        return candidates[inside]
+
+    # แถวที่อยู่ในหน้าจอแผนที่ ณ ViewState (Web Mercator, tile 256px)
+    def query_viewport(self, latitude, longitude, zoom, width=800, height=600):
+        world = 256 * 2 ** zoom
+        half_lon = 180 * width / world
+        y = math.log(math.tan(math.pi / 4 + math.radians(latitude) / 2))
+        half_y = math.pi * height / world
+        min_lat = math.degrees(2 * math.atan(math.exp(y - half_y)) - math.pi / 2)
+        max_lat = math.degrees(2 * math.atan(math.exp(y + half_y)) - math.pi / 2)
+        min_lon, max_lon = longitude - half_lon, longitude + half_lon
+        if half_lon >= 180:
+            return self.query_bbox(min_lat, max_lat, -180, 180)
+        if min_lon < -180 or max_lon > 180:
+            # viewport คร่อมเส้น antimeridian
+            left = self.query_bbox(min_lat, max_lat, ((min_lon + 180) % 360) - 180, 180)
+            right = self.query_bbox(min_lat, max_lat, -180, ((max_lon + 180) % 360) - 180)
+            return np.union1d(left, right)
+        return self.query_bbox(min_lat, max_lat, min_lon, max_lon)
+
+    def query_region(self, region):
+        if "polygon" in region:
+            return self.query_polygon(region["polygon"])
+        return self.query_bbox(**region["bbox"])
+
+
+# ตำแหน่งแถวของแต่ละ region (เรียงตามลำดับแถว ใช้ดึงด้วย iloc แทนการ scan ทั้งคอลัมน์)
+# - ชื่อ region: ประเทศตรงและพิกัดอยู่ในขอบเขต (region ซ้อนกันได้ แถวเดียวอยู่ได้หลาย region)
+# - OVERSEAS: ไม่อยู่ในประเทศ/ขอบเขตของ region ใดเลย
+# แถวที่ข้อมูลขัดกัน (เช่น ประเทศตรงแต่พิกัดอยู่นอกขอบเขต) หรือไม่มีพิกัด ไม่อยู่ในกลุ่มใด
+def region_rows(df, index, regions=REGIONS):
+    country = df["Country"].to_numpy()
+    overseas = ~(np.isnan(index.latitude) | np.isnan(index.longitude))
+    rows = {}
+    for name, region in regions.items():
+        inside = index.query_region(region)
+        in_country = country == region["country"]
+        rows[name] = inside[in_country[inside]]
+        overseas[inside] = False
+        overseas &= ~in_country
+    rows[OVERSEAS] = np.flatnonzero(overseas)
+    return rows
@@ -0,0 +1,130 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+_WORD = re.compile(r"\w+")
+
+# สัดส่วน trigram ของ query ที่ต้องพบในชื่อ จึงนับว่าใกล้เคียง
+MIN_FUZZY_SCORE = 0.5
+
+
+# ตัวพิมพ์เล็ก + ตัดเครื่องหมายกำกับ (é -> e) ให้ค้นหาได้โดยไม่ต้องพิมพ์ตรงทุกตัว
+def fold(text):
+    text = str(text).casefold()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _trigrams(folded):
+    padded = f"  {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigrams(text):
+    return _trigrams(fold(text))
+
+
+# posting list แบบ CSR จาก list ของ key ต่อชื่อ: keys เรียงแล้ว
+# ids ของ key ที่ i อยู่ใน ids[offsets[i]:offsets[i + 1]] (เรียงจากน้อยไปมาก)
+def _postings(keys_per_name):
+    sizes = np.fromiter((len(k) for k in keys_per_name), dtype=np.int64, count=len(keys_per_name))
+    ids = np.repeat(np.arange(len(keys_per_name), dtype=np.int64), sizes)
+    codes, keys = pd.factorize(pd.Series([k for ks in keys_per_name for k in ks], dtype=object), sort=True)
+    order = np.argsort(codes, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(keys)))])
+    return np.asarray(keys, dtype=object), ids[order], offsets
+
+
+# Index ค้นหาชื่อ (ประเทศ / affiliation) สร้างครั้งเดียวต่อ dataset
+# - prefix: ทุกคำใน query ต้องเป็นคำขึ้นต้นของคำใดคำหนึ่งในชื่อ (array ของคำที่เรียงแล้ว + binary search
+#   ทำหน้าที่เป็น prefix trie แบบกะทัดรัด)
+# - fuzzy: trigram ที่ซ้ำกับ query (พิมพ์ผิด/สะกดต่าง)
+# ผลลัพธ์เรียงตาม count มากไปน้อย
+class SearchIndex:
+    def __init__(self, table, name="name", value="count"):
+        table = table.dropna(subset=[name])
+        table = table.groupby(name, sort=False, as_index=False, observed=True).agg(
+            {value: "sum", **{c: "first" for c in table.columns if c not in (name, value)}}
+        )
+        self.name = name
+        self.value = value
+        self.table = table.reset_index(drop=True)
+        names = self.table[name].tolist()
+        self._exact = {n: i for i, n in enumerate(names)}
+        # ids เรียงตาม count ไว้แล้ว การจัดอันดับผลลัพธ์จึงเป็นแค่การเรียง id
+        self._rank = np.empty(len(names), dtype=np.int64)
+        self._rank[np.argsort(-self.table[value].fillna(0).to_numpy(), kind="stable")] = np.arange(len(names))
+
+        folded = [fold(n) for n in names]
+        self._folded = {}
+        for i, f in enumerate(folded):
+            self._folded.setdefault(f, i)
+        self.words, self.word_ids, self.word_offsets = _postings([set(_WORD.findall(f)) for f in folded])
+        self.grams, self.gram_ids, self.gram_offsets = _postings([_trigrams(f) for f in folded])
+
+    def __len__(self):
+        return len(self.table)
+
+    # ตรงทุกตัวอักษรก่อน ไม่เจอค่อยเทียบแบบไม่สนตัวพิมพ์/เครื่องหมายกำกับ
+    def get(self, query):
+        i = self._exact.get(query)
+        if i is None:
+            i = self._folded.get(fold(query))
+        return None if i is None else self.table.iloc[i]
+
+    def _ranked(self, ids, limit, scores=None):
+        ids = np.asarray(ids, dtype=np.int64)
+        if scores is None:
+            ids = ids[np.argsort(self._rank[ids], kind="stable")][:limit]
+            return self.table.iloc[ids].reset_index(drop=True)
+        order = np.lexsort((self._rank[ids], -scores))[:limit]
+        return self.table.iloc[ids[order]].assign(score=scores[order].round(3)).reset_index(drop=True)
+
+    # ids ของชื่อที่มีคำขึ้นต้นด้วย prefix
+    def _prefix_ids(self, prefix):
+        lo = np.searchsorted(self.words, prefix, side="left")
+        hi = np.searchsorted(self.words, prefix + "\U0010ffff", side="left")
+        if lo == hi:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(self.word_ids[self.word_offsets[lo]:self.word_offsets[hi]])
+
+    def prefix(self, query, limit=10):
+        ids = None
+        for word in _WORD.findall(fold(query)):
+            hits = self._prefix_ids(word)
+            ids = hits if ids is None else np.intersect1d(ids, hits, assume_unique=True)
+            if len(ids) == 0:
+                break
+        if ids is None:
+            ids = np.empty(0, dtype=np.int64)
+        return self._ranked(ids, limit)
+
+    # คะแนน = สัดส่วน trigram ของ query ที่พบในชื่อ (|q ∩ n| / |q|) นับจาก posting lists ด้วย bincount
+    # ไม่หารด้วยความยาวชื่อ ชื่อยาวที่มีคำที่พิมพ์ผิดอยู่จึงยังขึ้นมา (เช่น "harvrd" -> "Harvard University")
+    def fuzzy(self, query, limit=10, min_score=MIN_FUZZY_SCORE):
+        query_grams = sorted(trigrams(query))
+        at = np.searchsorted(self.grams, query_grams)
+        found = [i for i, g in zip(at, query_grams) if i < len(self.grams) and self.grams[i] == g]
+        if not found:
+            return self._ranked([], limit, np.empty(0))
+        hits = np.concatenate([self.gram_ids[self.gram_offsets[i]:self.gram_offsets[i + 1]] for i in found])
+        shared = np.bincount(hits, minlength=len(self.table))
+        ids = np.flatnonzero(shared)
+        scores = shared[ids] / len(query_grams)
+        keep = scores >= min_score
+        return self._ranked(ids[keep], limit, scores[keep])
+
+    # คำแนะนำสำหรับช่องค้นหา: ผลแบบ prefix ก่อน ถ้าไม่ครบ limit เติมด้วย fuzzy
+    def suggest(self, query, limit=10):
+        if not query.strip():
+            return self.table.iloc[:0]
+        result = self.prefix(query, limit)
+        if len(result) < limit:
+            fuzzy = self.fuzzy(query, limit).drop(columns="score")
+            fuzzy = fuzzy[~fuzzy[self.name].isin(result[self.name])]
+            result = pd.concat([result, fuzzy], ignore_index=True).iloc[:limit]
+        return result
@@ -0,0 +1,116 @@
+import concurrent.futures
+import contextlib
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# log เวลาเริ่มต้นของแต่ละ process (หนึ่งบรรทัดต่อ process: rerun แรกหลัง worker เริ่ม)
+LOG_PATH = os.path.join(".cache", "startup.jsonl")
+
+_lock = threading.Lock()
+_started = time.perf_counter()
+_last = _started
+_phases = {}
+_reported = False
+
+# pool สำหรับงานที่ไม่ขึ้นต่อกัน (เช่น โหลด dataset หลายไฟล์) ใช้ร่วมกันทุก session
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="startup")
+
+
+# บันทึกเวลาของ phase ครั้งแรกที่เกิดใน process นี้ (ครั้งต่อไปไม่วัดซ้ำ)
+def _record(name, seconds):
+    with _lock:
+        _phases.setdefault(name, round(seconds, 6))
+
+
+@contextlib.contextmanager
+def phase(name):
+    if name in _phases:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+# เวลาตั้งแต่ checkpoint ก่อนหน้า (หรือตั้งแต่ import โมดูลนี้) วัดเฉพาะ rerun แรกของ process
+def checkpoint(name):
+    global _last
+    now = time.perf_counter()
+    if not _reported:
+        _record(name, now - _last)
+    _last = now
+
+
+def phases():
+    with _lock:
+        return dict(_phases)
+
+
+# เขียนสรุปของ rerun แรกลง log (เรียกท้าย script; ครั้งต่อไปไม่ทำอะไร)
+def report(script, log_path=LOG_PATH):
+    global _reported
+    with _lock:
+        if _reported:
+            return None
+        _reported = True
+        record = {
+            "script": script,
+            "pid": os.getpid(),
+            "timestamp": time.time(),
+            "first_run_seconds": round(time.perf_counter() - _started, 6),
+            "phases": dict(_phases),
+        }
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(
+        f"startup {script}: {record['first_run_seconds']:.2f}s ("
+        + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in record["phases"].items())
+        + ")",
+        file=sys.stderr,
+    )
+    return record
+
+
+# รัน call ที่ไม่ขึ้นต่อกันพร้อมกันบน pool แล้วคืนผลตามลำดับ
+# thread ของ pool ได้ ScriptRunContext ของ session ที่เรียก (st.cache_* ใช้แสดง spinner)
+def run_concurrently(*calls):
+    ctx = get_script_run_ctx()
+
+    def run(call):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return call()
+
+    futures = [_pool.submit(run, call) for call in calls]
+    return [future.result() for future in futures]
+
+
+# โมดูลที่ import ครั้งแรกเมื่อมีการใช้ attribute (เช่น alt.Chart) ไม่ใช่ตอนเริ่ม script
+# เวลา import บันทึกเป็น phase "import <name>"
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                with phase(f"import {self._name}"):
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+
+import affiliations
+import pipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLACES = affiliations.place_tokens(os.path.join(ROOT, affiliations.PLACES_PATH))
+
+
+# สถาบันที่ชื่อมีแต่คำทั่วไป + ชื่อเมือง: สมาชิกต้องมีชื่อเต็มทั้งวลี ไม่ใช่แค่ "Tokyo" ในชื่อ
+def test_institution_members_ignore_shared_place_names():
+    index = affiliations.AffiliationIndex([
+        "University of Tokyo",
+        "Graduate School of Medicine, University of Tokyo",
+        "University of Tokyo Hospital",
+        "Tokyo Institute of Technology",
+        "Tokyo Medical and Dental University",
+        None,
+    ])
+    members = index.institution_members("University of Tokyo", places=PLACES)
+    assert index.names[members].tolist() == [
+        "University of Tokyo",
+        "Graduate School of Medicine, University of Tokyo",
+        "University of Tokyo Hospital",
+    ]
+
+
+# ชื่อที่สะกดต่าง / ตัวย่อ / หน่วยงานที่มีชื่อสถาบัน เป็นสมาชิกโดยไม่ต้องมีรายชื่อ; ชื่อใน exclude ไม่นับ
+def test_canonical_columns_map_variants_to_home():
+    names = [
+        "Chulalongkorn University",
+        "Faculty of Medicine, Chulalongkorn University",
+        "King Chulalongkorn Memorial Hospital",
+        "Chulalongkorn University Hospital",
+        "Chulalongkorn Univ.",
+        "Chulalongkorn Universitqy",
+        "Maha chulalongkorn rajavidhayalaya University",
+        "Mahachulalongkornrajavidyalaya University",
+        "Chulabhorn Royal Academy",
+        "Tokyo Institute of Technology",
+        None,
+    ]
+    index = affiliations.AffiliationIndex(names)
+    _, parents = index.canonical_columns(affiliations.HOME_INSTITUTION, exclude=affiliations.HOME_EXCLUDE, places=PLACES)
+    home = index.home_parent_id(affiliations.HOME_INSTITUTION, exclude=affiliations.HOME_EXCLUDE, places=PLACES)
+    assert (parents == home).tolist() == [True] * 6 + [False] * 5
+
+
+# stage fold_chula_subunits รวมชื่อที่สะกดต่างเข้ากับจุฬาฯ แต่ไม่รวมสถาบันอื่น
+def test_fold_chula_subunits_folds_unlisted_variant(tmp_path):
+    source = tmp_path / "affiliation_count.csv"
+    output = tmp_path / "folded.csv"
+    pd.DataFrame({
+        "Affiliation": ["Chulalongkorn University", "Chulalongkorn Univ.", "Tokyo Institute of Technology"],
+        "Country": ["Thailand", "Thailand", "Japan"],
+        "count": [20000, 5, 3],
+    }).to_csv(source, index=False)
+    pipeline.fold_chula_subunits(str(source), str(output))
+    folded = pd.read_csv(output)
+    assert folded["Affiliation"].tolist() == ["Chulalongkorn University", "Tokyo Institute of Technology"]
+    assert folded["count"].tolist() == [20005, 3]
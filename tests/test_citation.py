@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import citation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _cited():
+    return pd.read_csv(os.path.join(ROOT, "Cited.csv"), encoding="latin1")
+
+
+# ผลรวมจาก prefix sum ต้องเท่ากับ groupby ของแถวที่อยู่ในช่วงเดือนนั้นจริง (สุ่มช่วงเดือน)
+def test_monthly_window_matches_groupby():
+    cited = _cited()
+    index = citation.MonthlyIndex(cited)
+    months = pd.to_datetime(cited["Date_sort"]).dt.to_period("M")
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        lo, hi = sorted(rng.integers(0, len(index.months), 2))
+        start, end = index.months[lo], index.months[hi]
+        inside = cited[(months >= start) & (months <= end)]
+        expected = inside.groupby("Subject_area_abbrev").agg(Papers=("Id", "size"), Cited=("Cited", "sum"))
+        expected = expected.reindex(index.subjects, fill_value=0)
+        window = index.window(index.labels[lo], index.labels[hi]).set_index("Subject_area_abbrev")
+        np.testing.assert_array_equal(window["Papers"].to_numpy(), expected["Papers"].to_numpy())
+        np.testing.assert_array_equal(window["Cited"].to_numpy(), expected["Cited"].to_numpy())
+
+
+# ค่าของแต่ละ frame = ยอดสะสมของ subject ถึงสิ้นเดือนนั้น (รวมเดือนที่ไม่มี paper ใหม่)
+def test_animation_frames_are_running_totals():
+    tables = citation.derive_citation_tables(_cited())
+    frames = citation.animation_frames(tables["cited"])
+    cited = tables["cited"]
+    month = cited["Month-Year"].astype(str)
+    for subject in cited["Subject_area_abbrev"].drop_duplicates().sample(5, random_state=0):
+        rows = cited[cited["Subject_area_abbrev"] == subject]
+        got = frames[frames["Subject_area_abbrev"] == subject]
+        assert got["Month-Year"].astype(str).tolist() == sorted(m for m in month.unique() if m >= month[rows.index].min())
+        for m, papers, total in zip(got["Month-Year"].astype(str), got["ID_Cumsum"], got["Cited_Cumsum"]):
+            upto = rows[month[rows.index] <= m]
+            assert papers == len(upto) and total == upto["Cited"].sum()
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+import leaderboards
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _copy(tmp_path, monkeypatch, name):
+    monkeypatch.setattr(data_cache, "CACHE_DIR", str(tmp_path / ".cache"))
+    path = str(tmp_path / name)
+    shutil.copy(os.path.join(ROOT, name), path)
+    return path
+
+
+# touch ไฟล์ (mtime เปลี่ยน เนื้อหาเหมือนเดิม) ใช้ cache เดิม; เนื้อหาเปลี่ยนแปลงใหม่
+def test_touched_csv_is_not_rebuilt(tmp_path, monkeypatch):
+    path = _copy(tmp_path, monkeypatch, "colab_count.csv")
+    builds = []
+    build = data_cache._build_columnar
+    monkeypatch.setattr(data_cache, "_build_columnar", lambda *args: builds.append(args) or build(*args))
+
+    meta = data_cache.ensure_columnar(path, "utf-8-sig")
+    assert len(builds) == 1
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    touched = data_cache.ensure_columnar(path, "utf-8-sig")
+    assert len(builds) == 1
+    assert touched["sha1"] == meta["sha1"] and touched["mtime_ns"] == st.st_mtime_ns + 10**9
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("New Affiliation,Japan,3,35.0,139.0\n")
+    changed = data_cache.ensure_columnar(path, "utf-8-sig")
+    assert len(builds) == 2
+    assert changed["rows"] == meta["rows"] + 1
+
+
+# dtype ที่ย่อแล้ว (float32 / int ที่เล็กที่สุด / category) ได้ค่าเดียวกับการอ่าน CSV ตรง ๆ
+def test_compact_types_round_trip(tmp_path, monkeypatch):
+    path = _copy(tmp_path, monkeypatch, "Cited.csv")
+    raw = pd.read_csv(path, encoding="latin1", parse_dates=["Date_sort"])
+    cached = data_cache.load_frame(path, "latin1")
+    assert cached["Cited"].dtype.itemsize < 8 and isinstance(cached["Subject_area_abbrev"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(cached, raw, check_dtype=False, check_categorical=False)
+
+    path = _copy(tmp_path, monkeypatch, "colab_count.csv")
+    raw = pd.read_csv(path, encoding="utf-8-sig")
+    cached = data_cache.load_frame(path, "utf-8-sig")
+    assert cached["latitude"].dtype == np.float32
+    np.testing.assert_array_equal(cached["count"].to_numpy(np.float64), raw["count"].to_numpy(np.float64))
+    for column in ["latitude", "longitude"]:
+        np.testing.assert_allclose(cached[column], raw[column], rtol=1e-6, atol=1e-5)
+
+    # ค่าที่ dashboard แสดง (ผลรวม, จำนวนประเทศ/affiliation, อันดับประเทศ) ไม่เปลี่ยน
+    compact, full = leaderboards.LeaderboardStore(cached), leaderboards.LeaderboardStore(raw)
+    assert compact.total_count == full.total_count
+    assert compact.total_countries == full.total_countries and compact.total_affiliations == full.total_affiliations
+    assert compact.countries.table.astype({"Country": object}).equals(full.countries.table)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+import deck_data
+import palette
+import regions
+
+
+def _edges(n=500):
+    rng = np.random.default_rng(0)
+    countries = ["Thailand", "Japan", "United States", "Germany"]
+    data = pd.DataFrame({
+        "Affiliation": [f"Affiliation {i}" for i in range(n)],
+        "Country": rng.choice(countries, n),
+        "count": rng.integers(1, 50, n).astype(np.float32),
+        "latitude": rng.uniform(-60, 70, n),
+        "longitude": rng.uniform(-180, 180, n),
+    })
+    data.loc[:19, "latitude"] = rng.uniform(12, 15, 20)
+    data.loc[:19, "longitude"] = rng.uniform(99, 102, 20)
+    data.loc[[5, 9], "count"] = np.nan
+    data["Color"] = palette.country_colors(data["Country"])
+    return data
+
+
+# ทุกระดับของ pyramid ต้องมี count รวมและ count รวมต่อประเทศเท่ากับข้อมูลต้นทาง
+def test_aggregated_levels_keep_total_weight():
+    data = _edges()
+    expected = data.groupby("Country")["count"].sum()
+    for level in deck_data.EDGE_LEVELS:
+        edges = deck_data.aggregate_edges(data, level["cell_size"])
+        assert np.isclose(edges["count"].sum(), data["count"].sum())
+        pd.testing.assert_series_equal(edges.groupby("Country")["count"].sum(), expected, check_dtype=False)
+
+
+# viewport: แถวในหน้าจอตามระดับของ zoom แถวนอกหน้าจอรวมต่อประเทศ ทั้งสองส่วนรวมกันต้องครบทุก count
+def test_viewport_level_splits_inside_and_outside():
+    data = _edges()
+    index = regions.SpatialIndex(data["latitude"], data["longitude"])
+    inside = index.query_viewport(13.74, 100.53, 7)
+    level = deck_data.viewport_level(data, inside, 7)
+    assert level["name"] == "affiliation"
+    assert len(inside) >= 20 and level["inside"] == len(inside)
+    assert level["outside"] == data.drop(index=inside)["Country"].nunique()
+    assert level["rows"] == len(level["edges"]) == level["inside"] + level["outside"]
+
+    whole = deck_data.viewport_level(data, inside, 1)
+    assert whole["rows"] == data["Country"].nunique() and whole["outside"] == 0
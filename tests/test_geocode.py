@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+
+import geocode
+import pipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# รัน stage geocode_affiliations จาก input ที่ประกาศไว้ใน repo ต้องได้ colab_count.csv และ geocode cache
+# ที่ commit ไว้ทุก byte (ลำดับแถว, dtype ของ count, ทศนิยมของพิกัด) และรันซ้ำ (มี cache เดิมอยู่แล้ว) ก็ได้ไฟล์เดิม
+def test_geocode_stage_reproduces_committed_files(tmp_path, monkeypatch):
+    monkeypatch.delenv(geocode.RESOLVER_ENV, raising=False)
+    stage = next(s for s in pipeline.AFFILIATION_STAGES if s.name == "geocode_affiliations")
+    assert stage.outputs == ["colab_count.csv", geocode.CACHE_PATH]
+    output = tmp_path / "colab_count.csv"
+    cache_path = tmp_path / "geocode_cache.csv"
+
+    for _ in range(2):
+        stage.func(*[os.path.join(ROOT, p) for p in stage.inputs], str(output), str(cache_path))
+        with open(os.path.join(ROOT, "colab_count.csv"), "rb") as f:
+            assert output.read_bytes() == f.read()
+        with open(os.path.join(ROOT, geocode.CACHE_PATH), "rb") as f:
+            assert cache_path.read_bytes() == f.read()
+
+
+# ชื่อที่ key เดียวกันแต่พิกัดขัดกัน: ไม่ใช้พิกัดที่ชื่อจำนวนมากใช้ร่วมกัน (ศูนย์กลางประเทศ)
+def test_conflicting_seed_rows_prefer_non_centroid(tmp_path):
+    centroid = (39.7837304, -100.445882)
+    filler = [(f"Somewhere {i}", *centroid) for i in range(geocode.CENTROID_MIN_NAMES)]
+    rows = [("MD Anderson Cancer Center", *centroid), ("MD Anderson Cancer Center.", 29.70746, -95.395737), *filler]
+    seed = tmp_path / "seed.csv"
+    pd.DataFrame(rows, columns=["affiliation", "latitude", "longitude"]).to_csv(seed, index=False)
+
+    cache = geocode.GeocodeCache(str(tmp_path / "cache.csv"), seed_paths=[str(seed)])
+    coords = cache.resolve(pd.Series(["MD ANDERSON CANCER CENTER"]), pd.Series(["United States"]))
+    assert coords.iloc[0].tolist() == [29.70746, -95.395737]
+
+
+# เมืองในชื่อต้องอยู่ประเทศเดียวกัน และชื่อเมืองหลายคำชนะคำเดียว
+def test_match_cities():
+    cities = pd.DataFrame({
+        "name": ["Cambridge", "Ho Chi Minh City", "Ho"],
+        "country": ["United Kingdom", "Viet Nam", "Viet Nam"],
+    })
+    names = pd.Series(["University of Cambridge", "MIT, Cambridge", "Ho Chi Minh City University", None])
+    countries = pd.Series(["United Kingdom", "United States", "Viet Nam", None])
+    assert geocode.match_cities(geocode.name_keys(names), countries, cities).tolist() == [0, -1, 1, -1]
@@ -0,0 +1,22 @@
+import networkx as nx
+import numpy as np
+
+import graph_analysis
+
+
+def _graph():
+    G = nx.connected_watts_strogatz_graph(300, 6, 0.1, seed=1)
+    G.add_edges_from([(500, 501), (501, 502)])
+    G.add_node(600)
+    return G
+
+
+# k=None ได้ค่าเท่ากับ networkx; แบบ sampling ใกล้ค่าจริง และ node เดี่ยวได้ 0
+def test_closeness_sampling():
+    G = _graph()
+    exact = nx.closeness_centrality(G)
+    assert graph_analysis.closeness_centrality(G) == exact
+    sampled = graph_analysis.closeness_centrality(G, k=60)
+    error = np.array([abs(sampled[n] - exact[n]) / exact[n] for n in range(300)])
+    assert error.mean() < 0.05 and error.max() < 0.2
+    assert sampled[600] == 0.0
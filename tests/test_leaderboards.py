@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+import leaderboards
+
+
+def _data():
+    rng = np.random.default_rng(0)
+    countries = ["Thailand", "Japan", "United States", "Germany"]
+    names = [f"Affiliation {i}" for i in range(40)] + leaderboards.TOP_UNIVERSITIES
+    data = pd.DataFrame({
+        "Affiliation": names,
+        "Country": rng.choice(countries, len(names)),
+        "count": rng.integers(1, 6, len(names)).astype(np.float32),
+    })
+    data.loc[[3, 17], "count"] = np.nan
+    return data.astype({"Affiliation": "category", "Country": "category"})
+
+
+def _assert_same(store, rebuilt):
+    for name in ["countries", "thai", "overseas"]:
+        pd.testing.assert_frame_equal(getattr(store, name).table, getattr(rebuilt, name).table)
+    pd.testing.assert_frame_equal(store.top_universities, rebuilt.top_universities)
+    assert store.total_count == rebuilt.total_count
+
+
+# อัปเดตต้องได้ลำดับ (รวมค่าเท่ากัน) และ dtype เดียวกับการสร้าง Ranking ใหม่
+def test_ranking_update_matches_rebuild():
+    table = pd.DataFrame({"name": list("abcd"), "count": np.array([9, 5, 5, 1], dtype=np.float32)})
+    ranking = leaderboards.Ranking(table, "name")
+    ranking.update("a", 5)
+    rebuilt = leaderboards.Ranking(table.assign(count=np.array([5, 5, 5, 1], dtype=np.float32)), "name")
+    assert ranking.table["name"].tolist() == ["a", "b", "c", "d"]
+    pd.testing.assert_frame_equal(ranking.table, rebuilt.table)
+
+
+def test_store_update_counts_matches_rebuild():
+    data = _data()
+    store = leaderboards.LeaderboardStore(data)
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        rows = rng.choice(len(data), 3, replace=False)
+        values = rng.integers(1, 6, 3).astype(np.float32)
+        values[rng.random(3) < 0.2] = np.nan
+        changes = pd.Series(values, index=rows)
+        store.update_counts(changes)
+        data.loc[rows, "count"] = values
+        _assert_same(store, leaderboards.LeaderboardStore(data))
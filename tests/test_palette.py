@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+import palette
+
+
+# NaN ได้ MISSING_COLOR และสีของแต่ละประเทศตรงกับ gen_random_color
+def test_country_colors_match_seeded_colors():
+    countries = pd.Series(["Japan", None, "Thailand", "Japan", np.nan], index=[10, 11, 12, 13, 14])
+    colors = palette.country_colors(countries)
+    assert colors.index.tolist() == countries.index.tolist()
+    assert colors[11] == colors[14] == palette.MISSING_COLOR
+    assert colors[10] == colors[13] == palette.gen_random_color("Japan")
+    assert colors[12] == palette.gen_random_color("Thailand")
+
+
+# สีของประเทศไม่ขึ้นกับประเทศอื่นในชุดข้อมูล หรือลำดับ / จำนวนครั้งที่เรียก
+def test_country_colors_are_stable_across_calls():
+    first = palette.country_colors(pd.Series(["Japan", "Thailand", "Germany"]))
+    other = palette.country_colors(pd.Series(["Germany", "Brazil", "Japan", "Thailand"], dtype="category"))
+    assert first.tolist() == [other[2], other[3], other[0]]
+    assert palette.country_colors(pd.Series(["Japan", "Thailand", "Germany"])).tolist() == first.tolist()
@@ -0,0 +1,38 @@
+import os
+
+import prerender
+
+STATE = {"exclude_cu": True, "universities": "All", "map_style": "dark"}
+
+
+def _record(root, version):
+    store = prerender.ArtifactStore(version, root=str(root), mode="record")
+    store.put(STATE, "chart", {"spec": {"mark": "bar"}}, {"data": [{"x": 1}, {"x": 2}]})
+    return store
+
+
+# ไฟล์ Arrow ที่หายหรือถูกตัดไม่ทำให้หน้าเว็บพัง: get คืน None (แล้ว build เอง)
+def test_get_returns_none_for_broken_arrow(tmp_path):
+    store = _record(tmp_path, "v1")
+    arrow = os.path.join(store.directory, prerender.state_key(STATE), "chart.0.arrow")
+    with open(arrow, "r+b") as f:
+        f.truncate(10)
+    assert prerender.ArtifactStore("v1", root=str(tmp_path)).get(STATE, "chart") is None
+    os.remove(arrow)
+    assert prerender.ArtifactStore("v1", root=str(tmp_path)).get(STATE, "chart") is None
+
+
+# artifact ที่ prerender หลัง store ถูกสร้าง (เช่นหลัง server เริ่ม) ต้องถูกอ่านได้ ไม่ติดผล miss เดิม
+def test_get_serves_artifacts_recorded_later(tmp_path):
+    store = prerender.ArtifactStore("v1", root=str(tmp_path))
+    assert store.get(STATE, "chart") is None
+    _record(tmp_path, "v1")
+    assert store.get(STATE, "chart")["datasets"]["data"]["x"].tolist() == [1, 2]
+    assert store.get(STATE, "chart") is store.get(STATE, "chart")
+
+
+# record version ใหม่ลบโฟลเดอร์ของ version อื่น
+def test_record_prunes_other_versions(tmp_path):
+    _record(tmp_path, "v1")
+    _record(tmp_path, "v2")
+    assert os.listdir(tmp_path) == ["v2"]
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+import regions
+
+
+# พิกัด float32 แบบสุ่ม + จุดที่อยู่บนขอบของ bbox และขอบของ cell พอดี
+def _points():
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-90, 90, 5000).astype(np.float32)
+    lon = rng.uniform(-180, 180, 5000).astype(np.float32)
+    edges_lat = np.array([5.612851, 20.353827, 10.0, 5.612851, 20.353827, -90, 90], dtype=np.float32)
+    edges_lon = np.array([97.343807, 105.636044, 100.0, 105.636044, 97.343807, -180, 180], dtype=np.float32)
+    lat = np.concatenate([lat, edges_lat, [np.nan]]).astype(np.float32)
+    lon = np.concatenate([lon, edges_lon, [100.0]]).astype(np.float32)
+    return lat, lon
+
+
+def _brute_bbox(lat, lon, min_lat, max_lat, min_lon, max_lon):
+    lat = lat.astype(np.float64)
+    lon = lon.astype(np.float64)
+    return np.flatnonzero((lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon))
+
+
+def test_query_bbox_matches_brute_force():
+    lat, lon = _points()
+    index = regions.SpatialIndex(lat, lon)
+    # ขอบเขตที่ตรงกับพิกัด float32 ของจุดบนขอบพอดี ต้องนับจุดนั้นด้วย
+    boxes = [
+        (float(np.float32(5.612851)), float(np.float32(20.353827)), float(np.float32(97.343807)), float(np.float32(105.636044))),
+        (10.0, 10.0, 100.0, 100.0),
+        (-90, 90, -180, 180),
+        (-33.3, 12.7, -20.5, 60.25),
+    ]
+    for box in boxes:
+        np.testing.assert_array_equal(index.query_bbox(*box), _brute_bbox(lat, lon, *box))
+    assert len(index.query_bbox(*boxes[0])) >= 3
+    assert len(index.query_bbox(-90, 90, -180, 180)) == len(lat) - 1
+
+
+# ray casting กับทุกจุด (ไม่ตัดด้วย grid / bbox ก่อน)
+def _brute_polygon(lat, lon, polygon):
+    lat = lat.astype(np.float64)
+    lon = lon.astype(np.float64)
+    inside = np.zeros(len(lat), dtype=bool)
+    vertices = np.asarray(polygon, dtype=np.float64)
+    for (lat1, lon1), (lat2, lon2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        crosses = (lat1 > lat) != (lat2 > lat)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lon_at = (lon2 - lon1) * (lat - lat1) / (lat2 - lat1) + lon1
+        inside ^= crosses & (lon < lon_at)
+    return np.flatnonzero(inside)
+
+
+def test_query_polygon_matches_brute_force():
+    lat, lon = _points()
+    index = regions.SpatialIndex(lat, lon)
+    polygons = [
+        [(0, 90), (30, 95), (25, 120), (5, 110)],
+        [(-40, -70), (10, -80), (-5, -30), (-20, -50), (-45, -40)],
+    ]
+    for polygon in polygons:
+        np.testing.assert_array_equal(index.query_polygon(polygon), _brute_polygon(lat, lon, polygon))
+
+
+# region ที่ซ้อนกันได้แถวของทั้งสอง region (ไม่ทับกันเหมือนคอลัมน์ label เดียว)
+def test_region_rows_allows_overlapping_regions():
+    df = pd.DataFrame({
+        "Country": ["Thailand", "Thailand", "Thailand", "Japan", "Thailand"],
+        "latitude": [13.7, 18.8, 35.0, 35.7, np.nan],
+        "longitude": [100.5, 99.0, 139.0, 139.7, np.nan],
+    })
+    index = regions.SpatialIndex(df["latitude"], df["longitude"])
+    overlapping = {
+        **regions.REGIONS,
+        "Bangkok": {"country": "Thailand", "bbox": {"min_lat": 13.0, "max_lat": 14.5, "min_lon": 100.0, "max_lon": 101.0}},
+    }
+    rows = regions.region_rows(df, index, overlapping)
+    assert rows["Thailand"].tolist() == [0, 1]
+    assert rows["Bangkok"].tolist() == [0]
+    assert rows[regions.OVERSEAS].tolist() == [3]
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import search_index
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _index():
+    table = pd.read_csv(os.path.join(ROOT, "colab_count.csv"), encoding="utf-8-sig", usecols=["Affiliation", "Country", "count"])
+    return search_index.SearchIndex(table, "Affiliation")
+
+
+# ลำดับอ้างอิง: count มากไปน้อย ค่าเท่ากันตามลำดับแถว
+def _by_count(index, ids):
+    counts = -index.table["count"].fillna(0).to_numpy()[ids]
+    return [index.table["Affiliation"].iloc[i] for i in np.asarray(ids)[np.argsort(counts, kind="stable")]]
+
+
+# prefix ต้องได้ชื่อเดียวกัน (ลำดับเดียวกัน) กับการ scan ทุกชื่อว่าทุกคำใน query เป็นคำขึ้นต้นของคำในชื่อ
+def test_prefix_matches_naive_scan():
+    index = _index()
+    words = [set(search_index._WORD.findall(search_index.fold(n))) for n in index.table["Affiliation"]]
+    for query in ["chula", "univ tok", "Hosp", "inst tech", "medic", "ecole", "zzzz", "de la"]:
+        parts = search_index._WORD.findall(search_index.fold(query))
+        ids = [i for i, ws in enumerate(words) if all(any(w.startswith(p) for w in ws) for p in parts)]
+        assert index.prefix(query, limit=len(index))["Affiliation"].tolist() == _by_count(index, ids)
+
+
+# fuzzy ต้องได้คะแนนเดียวกับการนับ trigram ที่ซ้ำกันของทุกชื่อ
+def test_fuzzy_matches_naive_scan():
+    index = _index()
+    grams = [search_index.trigrams(n) for n in index.table["Affiliation"]]
+    for query in ["harvrd", "chulalongkorn univercity", "Tokio", "mahidol", "oxfrod"]:
+        query_grams = search_index.trigrams(query)
+        scores = np.array([len(query_grams & g) / len(query_grams) for g in grams])
+        ids = np.flatnonzero(scores >= search_index.MIN_FUZZY_SCORE)
+        result = index.fuzzy(query, limit=len(index))
+        expected = pd.DataFrame({"Affiliation": index.table["Affiliation"].to_numpy()[ids], "score": scores[ids].round(3)})
+        assert sorted(zip(result["Affiliation"], result["score"])) == sorted(zip(expected["Affiliation"], expected["score"]))
+        assert result["score"].is_monotonic_decreasing